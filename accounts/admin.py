@@ -1,3 +1,33 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
-# Register your models here.
+from socgpa.pagination import EstimatedCountPaginator
+from .models import User
+
+
+ACTION_CHUNK_SIZE = 500
+
+
+@admin.register(User)
+class UserAdmin(BaseUserAdmin):
+    fieldsets = BaseUserAdmin.fieldsets + (
+        ('SocGPA', {'fields': ('school_name', 'role', 'is_verified_by_school', 'soc_coins')}),
+    )
+    list_display = ('username', 'email', 'first_name', 'last_name', 'school_name', 'role', 'soc_coins')
+    # только индексированные колонки
+    list_filter = ('role',)
+    search_fields = ('^username', '=email', '^school_name')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 100
+    actions = ('mark_verified_by_school',)
+
+    @admin.action(description="Mark selected users as verified by school")
+    def mark_verified_by_school(self, request, queryset):
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+        updated = 0
+        for start in range(0, len(ids), ACTION_CHUNK_SIZE):
+            updated += User.objects.filter(pk__in=ids[start:start + ACTION_CHUNK_SIZE]).update(
+                is_verified_by_school=True
+            )
+        self.message_user(request, f"{updated} user(s) verified.", messages.SUCCESS)
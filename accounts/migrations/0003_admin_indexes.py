@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_soc_coins'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='role',
+            field=models.CharField(choices=[('student', 'Student'), ('teacher', 'Teacher'), ('school_admin', 'School Admin')], db_index=True, default='student', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='school_name',
+            field=models.CharField(blank=True, db_index=True, max_length=255),
+        ),
+    ]
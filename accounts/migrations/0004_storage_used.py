@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='storage_used',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -9,11 +9,13 @@ class User(AbstractUser):
         ('school_admin', 'School Admin'),
     ]
 
-    school_name = models.CharField(max_length=255, blank=True)
-    role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='student')
+    school_name = models.CharField(max_length=255, blank=True, db_index=True)
+    role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='student', db_index=True)
     is_verified_by_school = models.BooleanField(default=False)
 
     soc_coins = models.PositiveIntegerField(default=0)
+    # сумма proof_size всех ачивок - для квоты, ведётся сигналами (achievements/uploads.py)
+    storage_used = models.PositiveBigIntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"{self.get_full_name() or self.username} ({self.school_name})"
@@ -0,0 +1,128 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ActivityEvent
+from .versions import bump, get_versions
+
+
+# ---------- Лента активности школы ----------
+# Запись: по строке ActivityEvent на событие (fan-out-on-read - копий по ленте каждого
+# одноклассника нет). Чтение: keyset по индексу (school_name, created_at, id) от новых к
+# старым; первая страница каждой школы лежит в кэше под ключом с версией "activity:<школа>",
+# который сам устаревает при новой записи.
+
+FEED_PAGE_SIZE = 20
+FEED_CACHE_TIMEOUT = 300
+
+
+def activity_key(school_name):
+    # EntityVersion.key ограничен 64 символами, а school_name - нет
+    return "activity:" + hashlib.md5(school_name.encode()).hexdigest()[:16]
+
+
+def record(events):
+    events = [e for e in events if e.school_name]
+    if not events:
+        return []
+    ActivityEvent.objects.bulk_create(events)
+    bump(*(activity_key(e.school_name) for e in events))
+    return events
+
+
+def achievement_event(ach, user=None, when=None):
+    # when - время события; по умолчанию сейчас (момент одобрения, а не подачи)
+    user = user or ach.user
+    return ActivityEvent(
+        school_name=ach.school_name or user.school_name, user=user, kind='achievement',
+        title=ach.title[:255], amount=ach.total_points or 0, created_at=when or timezone.now(),
+    )
+
+
+def record_achievements(achievements, users=None):
+    # achievements - только что одобренные; users - {user_id: user}, чтобы не дёргать ach.user
+    users = users or {}
+    return record([
+        achievement_event(a, users.get(a.user_id)) for a in achievements if a.status == 'approved'
+    ])
+
+
+def record_quests(user, quests):
+    return record([
+        ActivityEvent(
+            school_name=user.school_name, user=user, kind='quest',
+            title=quest.title[:255], amount=quest.reward_coins,
+        )
+        for quest in quests
+    ])
+
+
+def record_purchase(purchase):
+    return record([
+        ActivityEvent(
+            school_name=purchase.user.school_name, user=purchase.user, kind='purchase',
+            title=purchase.item.name[:255], amount=purchase.item.price,
+        )
+    ])
+
+
+def serialize_event(event):
+    return {
+        "id": event.id,
+        "kind": event.kind,
+        "title": event.title,
+        "amount": event.amount,
+        "created_at": event.created_at.isoformat(),
+        "user": {
+            "id": event.user_id,
+            "username": event.user.username,
+            "full_name": event.user.get_full_name(),
+        },
+    }
+
+
+def _query_page(school_name, before, limit):
+    qs = (
+        ActivityEvent.objects.filter(school_name=school_name)
+        .select_related('user')
+        .only('id', 'kind', 'title', 'amount', 'created_at', 'user__username',
+              'user__first_name', 'user__last_name')
+    )
+    if before is not None:
+        created_at, event_id = before
+        qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=event_id))
+    rows = list(qs.order_by('-created_at', '-id')[:limit + 1])
+    items = [serialize_event(e) for e in rows[:limit]]
+    next_before = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_before = [last.created_at.isoformat(), last.id]
+    return items, next_before
+
+
+def cursor_position(values):
+    # [created_at ISO, id] из декодированного курсора -> (datetime, id) или None
+    try:
+        created_at, event_id = values
+        created_at = parse_datetime(created_at)
+        return (created_at, int(event_id)) if created_at else None
+    except (TypeError, ValueError):
+        return None
+
+
+def feed_page(school_name, before=None, limit=FEED_PAGE_SIZE):
+    # before - (created_at, id) последнего показанного события, None - начало.
+    # -> (items, next_before), next_before - [created_at ISO, id] для следующего курсора
+    if before is not None or limit != FEED_PAGE_SIZE:
+        return _query_page(school_name, before, limit)
+
+    version = get_versions(activity_key(school_name))[activity_key(school_name)][0]
+    key = f"activity-feed:{activity_key(school_name)}:{version}"
+    page = cache.get(key)
+    if page is None:
+        page = _query_page(school_name, None, limit)
+        cache.set(key, page, FEED_CACHE_TIMEOUT)
+    return page
@@ -1,3 +1,190 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.shortcuts import redirect, render
+from django.urls import path
 
-# Register your models here.
+from socgpa.pagination import EstimatedCountPaginator
+from .models import Achievement, Event, Quest, QuestCompletion, ShopItem, UserPurchase
+from .analyzers import analysis_item, analyze_items
+from .imports import Importer, open_text
+from .moderation import apply_decision
+from .rollups import achievement_contribution
+from .scoring import RESCORE_FIELDS, rescore_batch
+
+
+ACTION_CHUNK_SIZE = 500
+
+
+def chunked_ids(queryset, size=ACTION_CHUNK_SIZE):
+    # Выделение обрабатываем кусками по первичному ключу: одна транзакция на кусок
+    ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+class BigTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 100
+
+
+class ImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV with a header row or JSONL: username, title, category, subcategory, description, ...")
+    format = forms.ChoiceField(choices=[('csv', 'CSV'), ('jsonl', 'JSON lines')])
+    school_name = forms.CharField(required=False, help_text="Only accept students of this school")
+    status = forms.ChoiceField(choices=[('approved', 'Approved'), ('pending', 'Pending review')])
+    require_proof = forms.BooleanField(required=False, initial=True)
+    award_coins = forms.BooleanField(required=False, initial=True)
+
+
+IMPORT_ERRORS_SHOWN = 20
+
+
+@admin.register(Achievement)
+class AchievementAdmin(BigTableAdmin):
+    list_display = ('id', 'title', 'user', 'school_name', 'category', 'scale', 'status', 'total_points', 'created_at')
+    list_filter = ('status', 'category')
+    list_select_related = ('user',)
+    search_fields = ('=id', '^title', '=user__username')
+    raw_id_fields = ('user', 'reviewed_by')
+    readonly_fields = ('school_name', 'scoring_version', 'created_at', 'reviewed_at')
+    actions = ('approve_selected', 'reject_selected', 'rescore_selected', 'reanalyze_selected')
+    change_list_template = 'admin/achievements/achievement/change_list.html'
+
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name='achievements_achievement_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        # Файл разбирается потоково; очень большие файлы - командой import_achievements
+        form = ImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            errors = []
+            importer = Importer(
+                school_name=form.cleaned_data['school_name'] or None,
+                require_proof=form.cleaned_data['require_proof'],
+                award_coins=form.cleaned_data['award_coins'],
+                status=form.cleaned_data['status'],
+            )
+            importer.run(
+                open_text(form.cleaned_data['file']),
+                form.cleaned_data['format'],
+                on_error=lambda line_no, message, raw: errors.append((line_no, message)),
+            )
+            self.message_user(
+                request,
+                f"Imported {importer.imported} achievement(s) ({importer.flagged} near-duplicate(s) sent to review), "
+                f"{importer.failed} row(s) rejected.",
+                messages.SUCCESS if importer.imported else messages.WARNING,
+            )
+            for line_no, message in errors[:IMPORT_ERRORS_SHOWN]:
+                self.message_user(request, f"Line {line_no}: {message}", messages.ERROR)
+            return redirect('admin:achievements_achievement_changelist')
+
+        return render(request, 'admin/achievements/achievement/import.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'form': form,
+            'title': 'Import achievements',
+        })
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if request.resolver_match and request.resolver_match.url_name.endswith('_changelist'):
+            qs = qs.defer('ai_raw_response', 'description')
+        return qs
+
+    def _decide(self, request, queryset, decision):
+        done = 0
+        for ids in chunked_ids(queryset.filter(status='pending')):
+            done += len(apply_decision(Achievement.objects.filter(pk__in=ids), decision, request.user))
+        self.message_user(request, f"{done} achievement(s) {decision}.", messages.SUCCESS)
+
+    @admin.action(description="Approve selected pending achievements")
+    def approve_selected(self, request, queryset):
+        self._decide(request, queryset, 'approved')
+
+    @admin.action(description="Reject selected pending achievements")
+    def reject_selected(self, request, queryset):
+        self._decide(request, queryset, 'rejected')
+
+    @admin.action(description="Rescore selected with current weights")
+    def rescore_selected(self, request, queryset):
+        done = 0
+        for ids in chunked_ids(queryset):
+            batch = list(Achievement.objects.filter(pk__in=ids).only(*RESCORE_FIELDS))
+            rescore_batch(batch)
+            done += len(batch)
+        self.message_user(request, f"{done} achievement(s) rescored.", messages.SUCCESS)
+
+    @admin.action(description="Re-run AI analysis on selected")
+    def reanalyze_selected(self, request, queryset):
+        # Монеты не пересчитываются: меняются классификация и очки
+        done = 0
+        for ids in chunked_ids(queryset, size=50):
+            batch = list(Achievement.objects.filter(pk__in=ids).select_related('user'))
+            before = [achievement_contribution(ach) for ach in batch]
+            # Вся пачка - в analyze_items: к провайдеру уходят промпты по AI_BATCH_SIZE ачивок
+            results = analyze_items([
+                analysis_item(
+                    ach.user.get_full_name() or ach.user.username,
+                    ach.title,
+                    ach.category,
+                    ach.description,
+                    file_path=ach.proof_file.path if ach.proof_file else None,
+                )
+                for ach in batch
+            ])
+            for ach, ai_result in zip(batch, results):
+                ach.category = ai_result.get('category', ach.category)
+                ach.scale = ai_result.get('scale', ach.scale)
+                ach.role_type = ai_result.get('role_type', ach.role_type)
+                ach.duration_months = ai_result.get('duration_months', ach.duration_months)
+                ach.ai_raw_response = ai_result
+            rescore_batch(
+                batch,
+                extra_fields=('category', 'scale', 'role_type', 'duration_months', 'ai_raw_response'),
+                before=before,
+            )
+            done += len(batch)
+        self.message_user(request, f"{done} achievement(s) re-analyzed.", messages.SUCCESS)
+
+
+@admin.register(Event)
+class EventAdmin(BigTableAdmin):
+    list_display = ('title', 'organizer', 'category', 'location', 'starts_at', 'ends_at')
+    list_filter = ('category', 'location')
+    search_fields = ('^title', '^organizer')
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(ShopItem)
+class ShopItemAdmin(admin.ModelAdmin):
+    list_display = ('name', 'provider', 'price', 'discount_info')
+    search_fields = ('^name', '^provider')
+
+
+@admin.register(Quest)
+class QuestAdmin(admin.ModelAdmin):
+    list_display = ('title', 'reward_coins', 'rule_category', 'rule_min_scale', 'rule_min_count')
+    list_filter = ('rule_category',)
+    search_fields = ('^title',)
+
+
+@admin.register(QuestCompletion)
+class QuestCompletionAdmin(BigTableAdmin):
+    list_display = ('user', 'quest', 'completed_at')
+    list_select_related = ('user', 'quest')
+    list_filter = ('quest',)
+    raw_id_fields = ('user', 'quest')
+    search_fields = ('=user__username',)
+
+
+@admin.register(UserPurchase)
+class UserPurchaseAdmin(BigTableAdmin):
+    list_display = ('user', 'item', 'created_at')
+    list_select_related = ('user', 'item')
+    list_filter = ('item',)
+    raw_id_fields = ('user', 'item')
+    search_fields = ('=user__username',)
@@ -0,0 +1,166 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+
+# ---------- Контроль допуска к внешнему AI (общий для всех воркеров) ----------
+# Token bucket + глобальный семафор в маленьком SQLite-файле: BEGIN IMMEDIATE
+# сериализует воркеры gunicorn. Кто не прошёл - сразу уходит на локальный анализ
+# (или ждёт до AI_ADMISSION_MAX_WAIT секунд в очереди).
+
+AI_ADMISSION_DB = os.environ.get(
+    "AI_ADMISSION_DB", os.path.join(tempfile.gettempdir(), "socgpa_ai_admission.sqlite3")
+)
+AI_RATE_PER_MINUTE = float(os.environ.get("AI_RATE_PER_MINUTE", "30"))
+AI_BURST = float(os.environ.get("AI_BURST", "10"))
+AI_MAX_CONCURRENT = int(os.environ.get("AI_MAX_CONCURRENT", "4"))
+AI_ADMISSION_MAX_WAIT = float(os.environ.get("AI_ADMISSION_MAX_WAIT", "0"))
+# слот упавшего воркера освобождается сам (должно быть больше OPENROUTER_TIMEOUT)
+AI_SLOT_TTL = float(os.environ.get("AI_SLOT_TTL", "60"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bucket (id INTEGER PRIMARY KEY CHECK (id = 1), tokens REAL, updated_at REAL);
+CREATE TABLE IF NOT EXISTS slots (id INTEGER PRIMARY KEY AUTOINCREMENT, pid INTEGER, acquired_at REAL);
+CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL DEFAULT 0);
+"""
+
+COUNTERS = ("admitted", "rejected_rate", "rejected_concurrency", "waiting", "expired_slots")
+
+
+class AdmissionController:
+    def __init__(self, path, rate_per_minute, burst, max_concurrent, slot_ttl, max_wait=0.0):
+        self.path = path
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self.slot_ttl = slot_ttl
+        self.max_wait = max_wait
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _locked(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _incr(conn, name, delta=1):
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, delta),
+        )
+
+    def try_acquire(self, now=None):
+        # id слота или None; при отказе причина попадает в счётчики
+        now = now or time.time()
+        with self._locked() as conn:
+            expired = conn.execute("DELETE FROM slots WHERE acquired_at < ?", (now - self.slot_ttl,)).rowcount
+            if expired:
+                self._incr(conn, "expired_slots", expired)
+
+            (in_flight,) = conn.execute("SELECT COUNT(*) FROM slots").fetchone()
+            if in_flight >= self.max_concurrent:
+                self._incr(conn, "rejected_concurrency")
+                return None
+
+            row = conn.execute("SELECT tokens, updated_at FROM bucket WHERE id = 1").fetchone()
+            tokens = self.burst if row is None else min(self.burst, row[0] + (now - row[1]) * self.rate)
+            if tokens < 1:
+                conn.execute("INSERT OR REPLACE INTO bucket (id, tokens, updated_at) VALUES (1, ?, ?)", (tokens, now))
+                self._incr(conn, "rejected_rate")
+                return None
+
+            conn.execute("INSERT OR REPLACE INTO bucket (id, tokens, updated_at) VALUES (1, ?, ?)", (tokens - 1, now))
+            slot_id = conn.execute(
+                "INSERT INTO slots (pid, acquired_at) VALUES (?, ?)", (os.getpid(), now)
+            ).lastrowid
+            self._incr(conn, "admitted")
+            return slot_id
+
+    def release(self, slot_id):
+        with self._locked() as conn:
+            conn.execute("DELETE FROM slots WHERE id = ?", (slot_id,))
+
+    def acquire(self, max_wait=None):
+        max_wait = self.max_wait if max_wait is None else max_wait
+        slot_id = self.try_acquire()
+        if slot_id is not None or max_wait <= 0:
+            return slot_id
+
+        deadline = time.monotonic() + max_wait
+        with self._locked() as conn:
+            self._incr(conn, "waiting")
+        try:
+            while slot_id is None and time.monotonic() < deadline:
+                time.sleep(min(0.25, max(0.0, deadline - time.monotonic())))
+                slot_id = self.try_acquire()
+        finally:
+            with self._locked() as conn:
+                self._incr(conn, "waiting", -1)
+        return slot_id
+
+    @contextmanager
+    def admit(self, max_wait=None):
+        # with admission.admit() as admitted: ... - False = идём на локальный анализ
+        slot_id = self.acquire(max_wait)
+        try:
+            yield slot_id is not None
+        finally:
+            if slot_id is not None:
+                self.release(slot_id)
+
+    def stats(self):
+        conn = self._conn()
+        counters = dict.fromkeys(COUNTERS, 0)
+        counters.update(conn.execute("SELECT name, value FROM counters").fetchall())
+        (in_flight,) = conn.execute("SELECT COUNT(*) FROM slots").fetchone()
+        row = conn.execute("SELECT tokens, updated_at FROM bucket WHERE id = 1").fetchone()
+        tokens = self.burst if row is None else min(self.burst, row[0] + (time.time() - row[1]) * self.rate)
+        return {
+            "in_flight": in_flight,
+            "max_concurrent": self.max_concurrent,
+            "tokens": round(tokens, 2),
+            "queue_depth": counters.pop("waiting"),
+            **counters,
+        }
+
+    def reset(self):
+        with self._locked() as conn:
+            conn.execute("DELETE FROM bucket")
+            conn.execute("DELETE FROM slots")
+            conn.execute("DELETE FROM counters")
+
+
+_controller = None
+
+
+def ai_admission():
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController(
+            AI_ADMISSION_DB,
+            rate_per_minute=AI_RATE_PER_MINUTE,
+            burst=AI_BURST,
+            max_concurrent=AI_MAX_CONCURRENT,
+            slot_ttl=AI_SLOT_TTL,
+            max_wait=AI_ADMISSION_MAX_WAIT,
+        )
+    return _controller
@@ -0,0 +1,311 @@
+import json
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from .admission import ai_admission
+from .utils import encode_file_to_base64, local_fallback_analysis
+
+
+# ---------- Бэкенды анализа ----------
+# AI_PROVIDER выбирает бэкенд:
+#   LOCAL             - только локальные правила (по умолчанию)
+#   OPENROUTER        - openrouter.ai (нужен OPENROUTER_API_KEY)
+#   OPENAI_COMPATIBLE - любой сервер с /v1/chat/completions (AI_BASE_URL, AI_MODEL, AI_API_KEY)
+# Всё, что бэкенд не смог разобрать, считается локально - по каждой ачивке отдельно.
+
+AI_PROVIDER = os.environ.get("AI_PROVIDER", "LOCAL").upper()
+OPENROUTER_API_KEY = os.environ.get("OPENROUTER_API_KEY")
+
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+OPENROUTER_MODEL = "z-ai/glm-4.5-air:free"
+OPENROUTER_TIMEOUT = 40  # должно быть меньше gunicorn timeout
+
+AI_BASE_URL = os.environ.get("AI_BASE_URL", "http://127.0.0.1:8001/v1")
+AI_MODEL = os.environ.get("AI_MODEL", "local-model")
+AI_API_KEY = os.environ.get("AI_API_KEY", "")
+AI_TIMEOUT = float(os.environ.get("AI_TIMEOUT", str(OPENROUTER_TIMEOUT)))
+
+# Сколько ачивок в одном промпте и сколько ждать попутчиков для очереди заявок
+AI_BATCH_SIZE = int(os.environ.get("AI_BATCH_SIZE", "8"))
+AI_BATCH_WINDOW_MS = int(os.environ.get("AI_BATCH_WINDOW_MS", "0"))
+
+RESULT_DEFAULTS = {
+    "category": "other",
+    "scale": "school",
+    "role_type": "participant",
+    "duration_months": 0,
+    "scores": {
+        "category": 10,
+        "scale": 10,
+        "role": 10,
+        "duration": 10,
+    },
+    "total_score": 40,
+    "feedback": "Solid achievement.",
+    "missing_recommendations": [],
+}
+
+RESULT_KEYS = "{category, scale, role_type, duration_months, scores, total_score, feedback, missing_recommendations}"
+
+
+def analysis_item(user_full_name, title, category_hint, description, file_path=None, profile_summary=None):
+    return {
+        "user_full_name": user_full_name,
+        "title": title,
+        "category_hint": category_hint,
+        "description": description or "",
+        "file_path": file_path,
+        "profile_summary": profile_summary,
+    }
+
+
+def analyze_locally(item):
+    return local_fallback_analysis(
+        item["user_full_name"],
+        item["title"],
+        item["category_hint"],
+        item["description"],
+        item["profile_summary"],
+    )
+
+
+class AnalyzerBackend:
+    name = "base"
+    remote = False
+
+    def analyze(self, item):
+        raise NotImplementedError
+
+    def analyze_batch(self, items):
+        # [результат или None]; None -> локальный анализ для этой ачивки
+        results = []
+        for item in items:
+            try:
+                results.append(self.analyze(item))
+            except Exception:
+                results.append(None)
+        return results
+
+
+class LocalAnalyzer(AnalyzerBackend):
+    name = "local_fallback"
+
+    def analyze(self, item):
+        return analyze_locally(item)
+
+
+class ChatCompletionsAnalyzer(AnalyzerBackend):
+    # Любой OpenAI-совместимый /chat/completions
+    name = "openai_compatible"
+    remote = True
+
+    def __init__(self, url, model, api_key=None, timeout=AI_TIMEOUT, extra_headers=None):
+        self.url = url
+        self.model = model
+        self.api_key = api_key
+        self.timeout = timeout
+        self.extra_headers = extra_headers or {}
+
+    def _post(self, system_msg, user_payload, attachments):
+        data = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_msg},
+                {"role": "user", "content": json.dumps(user_payload)},
+            ],
+            "temperature": 0.2,
+            "response_format": {"type": "json_object"},
+        }
+        if attachments:
+            data["attachments"] = attachments
+
+        headers = {"Content-Type": "application/json", **self.extra_headers}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+
+        # requests (~80 мс на импорт) нужен только удалённым бэкендам - грузим при первом вызове
+        import requests
+
+        try:
+            resp = requests.post(self.url, headers=headers, json=data, timeout=self.timeout)
+            resp.raise_for_status()
+            content = resp.json()["choices"][0]["message"]["content"]
+            return json.loads(content)
+        except (requests.RequestException, KeyError, ValueError) as e:
+            # Любая проблема -> пусть выше решит уйти на fallback.
+            print(f"AI error ({self.name}), will use local fallback instead:", repr(e))
+            raise
+
+    @staticmethod
+    def _payload(item):
+        return {
+            "student_name": item["user_full_name"],
+            "title": item["title"],
+            "category_hint": item["category_hint"],
+            "description": item["description"],
+            "profile_summary": item["profile_summary"] or {},
+        }
+
+    @staticmethod
+    def _attachment(item, name=None):
+        file_b64 = encode_file_to_base64(item["file_path"]) if item["file_path"] else None
+        if not file_b64:
+            return None
+        attachment = {"type": "image", "data": file_b64, "mime_type": "image/png"}
+        if name:
+            attachment["name"] = name
+        return attachment
+
+    def _finish(self, result):
+        if not isinstance(result, dict):
+            raise ValueError("analysis result is not an object")
+        # Заполняем дефолты, чтобы не было KeyError
+        for k, v in RESULT_DEFAULTS.items():
+            result.setdefault(k, v)
+        result["provider"] = self.name
+        return result
+
+    def analyze(self, item):
+        system_msg = (
+            "You are SocGPA.AI, an expert evaluator for a student Social GPA platform.\n"
+            f"Return ONLY JSON with keys: {RESULT_KEYS}."
+        )
+        attachment = self._attachment(item)
+        result = self._post(system_msg, self._payload(item), [attachment] if attachment else None)
+        return self._finish(result)
+
+    def analyze_batch(self, items):
+        if len(items) == 1:
+            return super().analyze_batch(items)
+
+        # Один промпт на всю пачку; ответ сопоставляем по id
+        system_msg = (
+            "You are SocGPA.AI, an expert evaluator for a student Social GPA platform.\n"
+            "You receive several achievements in `items`, each with an `id`.\n"
+            'Return ONLY JSON {"results": [...]} with one object per item, each with keys: '
+            f"{{id, {RESULT_KEYS[1:]}."
+        )
+        payload = {"items": [{"id": i, **self._payload(item)} for i, item in enumerate(items)]}
+        attachments = [a for a in (self._attachment(item, f"item-{i}") for i, item in enumerate(items)) if a]
+        try:
+            response = self._post(system_msg, payload, attachments)
+        except Exception:
+            return [None] * len(items)
+
+        by_id = {}
+        raw = response.get("results") if isinstance(response, dict) else None
+        for entry in raw if isinstance(raw, list) else []:
+            if isinstance(entry, dict) and isinstance(entry.get("id"), int):
+                by_id[entry.pop("id")] = entry
+
+        results = []
+        for i in range(len(items)):
+            try:
+                results.append(self._finish(by_id[i]))
+            except (KeyError, ValueError):
+                results.append(None)
+        return results
+
+
+class OpenRouterAnalyzer(ChatCompletionsAnalyzer):
+    name = "openrouter"
+
+    def __init__(self):
+        if not OPENROUTER_API_KEY:
+            raise RuntimeError("No OPENROUTER_API_KEY")
+        super().__init__(
+            OPENROUTER_URL,
+            OPENROUTER_MODEL,
+            api_key=OPENROUTER_API_KEY,
+            timeout=OPENROUTER_TIMEOUT,
+            extra_headers={"Referer": "https://socgpa.ai", "X-Title": "SocGPA.AI"},
+        )
+
+
+def get_backend(provider=None):
+    provider = (provider or AI_PROVIDER).upper()
+    if provider == "OPENROUTER" and OPENROUTER_API_KEY:
+        return OpenRouterAnalyzer()
+    if provider == "OPENAI_COMPATIBLE":
+        return ChatCompletionsAnalyzer(AI_BASE_URL.rstrip("/") + "/chat/completions", AI_MODEL, api_key=AI_API_KEY)
+    return LocalAnalyzer()
+
+
+# ---------- Пакетный анализ ----------
+
+def analyze_items(items, backend=None, batch_size=None):
+    # Гарантированный результат на каждую ачивку, в том же порядке
+    backend = backend or get_backend()
+    batch_size = batch_size or AI_BATCH_SIZE
+    results = [None] * len(items)
+
+    if backend.remote:
+        for start in range(0, len(items), batch_size):
+            chunk = items[start:start + batch_size]
+            # Одна пачка = один вызов провайдера = один слот допуска
+            with ai_admission().admit() as admitted:
+                if admitted:
+                    results[start:start + len(chunk)] = backend.analyze_batch(chunk)
+
+    for i, item in enumerate(items):
+        if results[i] is None:
+            results[i] = analyze_locally(item)
+    return results
+
+
+class BatchCoalescer:
+    # Заявки из разных потоков процесса, пришедшие в пределах окна, уходят одним промптом
+    def __init__(self, window_ms=AI_BATCH_WINDOW_MS, batch_size=AI_BATCH_SIZE):
+        self.window = window_ms / 1000
+        self.batch_size = batch_size
+        self.pending = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, item):
+        future = Future()
+        self.pending.put((item, future))
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="ai-batcher", daemon=True)
+                self.thread.start()
+        return future
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self.pending.get(timeout=5)]
+            except queue.Empty:
+                with self.lock:
+                    if self.pending.empty():
+                        self.thread = None
+                        return
+                continue
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self.pending.get(timeout=self.window))
+            except queue.Empty:
+                pass
+
+            try:
+                results = analyze_items([item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+_coalescer = None
+
+
+def analyze(item):
+    global _coalescer
+    if AI_BATCH_WINDOW_MS > 0 and get_backend().remote:
+        if _coalescer is None:
+            _coalescer = BatchCoalescer()
+        return _coalescer.submit(item).result()
+    return analyze_items([item])[0]
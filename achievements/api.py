@@ -0,0 +1,289 @@
+import base64
+import hashlib
+import json
+from functools import wraps
+
+from django.db.models import FloatField, Q, Sum
+from django.db.models.functions import Coalesce
+from django.http import HttpResponseNotModified, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_datetime
+from django.utils.http import parse_etags, quote_etag
+
+from accounts.models import User
+from socgpa.db import replica_reads
+from .activity import activity_key, cursor_position, feed_page
+from .events import events_page, next_expiry, upcoming_events
+from .models import QuestCompletion, Quest, ShopItem, UserPurchase
+from .scoring import get_user_score
+from .versions import get_versions, user_key
+
+
+# ---------- Read-only JSON API v1 ----------
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        return None
+
+
+def cursor_values(request, *kinds):
+    # Курсор ожидаемой формы: kinds - конвертеры по позициям (int, float, parse_datetime).
+    # Любая другая форма (чужой/испорченный курсор) считается отсутствием курсора.
+    values = decode_cursor(request.GET.get("cursor"))
+    if not isinstance(values, list) or len(values) != len(kinds):
+        return None
+    try:
+        converted = [kind(value) for kind, value in zip(kinds, values)]
+    except (TypeError, ValueError, OverflowError):
+        return None
+    if any(value is None for value in converted):
+        return None
+    return converted
+
+
+def page_limit(request):
+    try:
+        return max(1, min(int(request.GET.get("limit", DEFAULT_LIMIT)), MAX_LIMIT))
+    except ValueError:
+        return DEFAULT_LIMIT
+
+
+def select_fields(request, items):
+    fields = [f for f in request.GET.get("fields", "").split(",") if f]
+    if not fields:
+        return items
+    return [{k: v for k, v in item.items() if k in fields} for item in items]
+
+
+def api_endpoint(version_keys, validator=None):
+    # version_keys(request, **kwargs) -> ключи EntityVersion, от которых зависит ответ.
+    # validator(request, **kwargs) -> то, что меняется со временем без записи в EntityVersion
+    # (наступивший пересчёт GPA, истёкшие мероприятия).
+    # ETag = хэш версий + параметров + пользователя: 304 отдаём до любых запросов к основным таблицам.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return JsonResponse({"error": "authentication required"}, status=401)
+            if request.method not in ("GET", "HEAD"):
+                return JsonResponse({"error": "method not allowed"}, status=405)
+
+            # validator первым: пересчёт внутри него может поднять версии
+            extra = validator(request, *args, **kwargs) if validator else None
+            keys = version_keys(request, *args, **kwargs)
+            versions = get_versions(*keys)
+            fingerprint = json.dumps([
+                view.__name__,
+                request.user.pk,
+                kwargs,
+                sorted(request.GET.items()),
+                [(key, versions[key][0]) for key in sorted(keys)],
+                extra,
+            ], default=str)
+            etag = quote_etag("v1-" + hashlib.sha1(fingerprint.encode()).hexdigest())
+
+            if etag in parse_etags(request.headers.get("If-None-Match", "")):
+                response = HttpResponseNotModified()
+            else:
+                response = JsonResponse(view(request, *args, **kwargs))
+            response["ETag"] = etag
+            response["Cache-Control"] = "private, no-cache"
+            response["Vary"] = "Cookie"
+            return response
+
+        return replica_reads(wrapper)
+
+    return decorator
+
+
+def _profile_user_id(request, user_id=None):
+    return user_id or request.user.pk
+
+
+def _profile_score_state(request, user_id=None):
+    # Пересчёт GPA по расписанию (ачивка вышла из окна) не трогает версию, пока его не сделали:
+    # делаем его до ETag, как user_page_state для HTML
+    profile_user = get_object_or_404(User, pk=_profile_user_id(request, user_id))
+    request._api_profile_user = profile_user
+    request._api_profile_score = get_user_score(profile_user)
+    return request._api_profile_score.computed_at
+
+
+@api_endpoint(
+    lambda request, user_id=None: [user_key(_profile_user_id(request, user_id))],
+    validator=_profile_score_state,
+)
+def profile_api(request, user_id=None):
+    profile_user = request._api_profile_user
+    score = request._api_profile_score
+    total_points = (
+        profile_user.achievements.filter(status='approved').aggregate(total=Sum('total_points'))['total'] or 0
+    )
+    data = {
+        "id": profile_user.id,
+        "username": profile_user.username,
+        "full_name": profile_user.get_full_name(),
+        "school_name": profile_user.school_name,
+        "role": profile_user.role,
+        "social_gpa": score.social_gpa,
+        "raw_social_score": round(score.raw_score, 1),
+        "total_points": total_points,
+    }
+    # баланс монет - только владельцу
+    if profile_user == request.user:
+        data["soc_coins"] = profile_user.soc_coins
+    return select_fields(request, [data])[0]
+
+
+@api_endpoint(lambda request, user_id=None: [user_key(_profile_user_id(request, user_id))])
+def profile_achievements_api(request, user_id=None):
+    profile_user = get_object_or_404(User, pk=_profile_user_id(request, user_id))
+    limit = page_limit(request)
+    qs = profile_user.achievements.filter(status='approved').defer('ai_raw_response').order_by('-created_at', '-id')
+
+    cursor = cursor_values(request, parse_datetime, int)
+    if cursor:
+        created_at, last_id = cursor
+        qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=last_id))
+
+    rows = list(qs[:limit + 1])
+    items = [
+        {
+            "id": a.id,
+            "title": a.title,
+            "category": a.category,
+            "subcategory": a.subcategory,
+            "scale": a.scale,
+            "role_type": a.role_type,
+            "duration_months": a.duration_months,
+            "total_points": a.total_points,
+            "created_at": a.created_at.isoformat(),
+        }
+        for a in rows[:limit]
+    ]
+    next_cursor = encode_cursor([rows[limit - 1].created_at.isoformat(), rows[limit - 1].id]) if len(rows) > limit else None
+    return {"results": select_fields(request, items), "next_cursor": next_cursor}
+
+
+@api_endpoint(lambda request: ['leaderboard'])
+def leaderboard_api(request):
+    limit = page_limit(request)
+    qs = User.objects.annotate(
+        points=Coalesce(Sum('achievements__total_points'), 0.0, output_field=FloatField())
+    ).order_by('-points', '-soc_coins', 'id')
+
+    cursor = cursor_values(request, float, int, int)
+    if cursor:
+        points, coins, last_id = cursor
+        qs = qs.filter(
+            Q(points__lt=points)
+            | Q(points=points, soc_coins__lt=coins)
+            | Q(points=points, soc_coins=coins, id__gt=last_id)
+        )
+
+    rows = list(qs[:limit + 1])
+    items = [
+        {
+            "id": u.id,
+            "username": u.username,
+            "full_name": u.get_full_name(),
+            "school_name": u.school_name,
+            "total_points": u.points,
+            "soc_coins": u.soc_coins,
+        }
+        for u in rows[:limit]
+    ]
+    last = rows[limit - 1] if len(rows) > limit else None
+    next_cursor = encode_cursor([last.points, last.soc_coins, last.id]) if last else None
+    return {"results": select_fields(request, items), "next_cursor": next_cursor}
+
+
+@api_endpoint(lambda request: ['events'], validator=lambda request: next_expiry())
+def events_api(request):
+    events, next_cursor = events_page(
+        upcoming_events(category=request.GET.get('category'), location=request.GET.get('location')),
+        cursor=request.GET.get('cursor'),
+        page_size=page_limit(request),
+    )
+    items = [
+        {
+            "id": e.id,
+            "title": e.title,
+            "organizer": e.organizer,
+            "category": e.category,
+            "location": e.location,
+            "date": e.date,
+            "starts_at": e.starts_at.isoformat() if e.starts_at else None,
+            "ends_at": e.ends_at.isoformat() if e.ends_at else None,
+            "link": e.link,
+        }
+        for e in events
+    ]
+    return {"results": select_fields(request, items), "next_cursor": next_cursor}
+
+
+@api_endpoint(lambda request: [activity_key(request.user.school_name)])
+def feed_api(request):
+    before = cursor_position(decode_cursor(request.GET.get("cursor")))
+    items, next_before = feed_page(request.user.school_name, before=before, limit=page_limit(request))
+    next_cursor = encode_cursor(next_before) if next_before else None
+    return {"results": select_fields(request, items), "next_cursor": next_cursor}
+
+
+def _id_page(request, qs):
+    limit = page_limit(request)
+    cursor = cursor_values(request, int)
+    if cursor:
+        qs = qs.filter(id__gt=cursor[0])
+    rows = list(qs.order_by('id')[:limit + 1])
+    next_cursor = encode_cursor([rows[limit - 1].id]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+@api_endpoint(lambda request: ['shop', user_key(request.user.pk)])
+def shop_api(request):
+    items, next_cursor = _id_page(request, ShopItem.objects.all())
+    owned = set(UserPurchase.objects.filter(user=request.user).values_list('item_id', flat=True))
+    results = [
+        {
+            "id": item.id,
+            "name": item.name,
+            "provider": item.provider,
+            "description": item.description,
+            "price": item.price,
+            "owned": item.id in owned,
+        }
+        for item in items
+    ]
+    return {"results": select_fields(request, results), "next_cursor": next_cursor}
+
+
+@api_endpoint(lambda request: ['quests', user_key(request.user.pk)])
+def quests_api(request):
+    quests, next_cursor = _id_page(request, Quest.objects.all())
+    completed = set(QuestCompletion.objects.filter(user=request.user).values_list('quest_id', flat=True))
+    results = [
+        {
+            "id": quest.id,
+            "title": quest.title,
+            "description": quest.description,
+            "reward_coins": quest.reward_coins,
+            "automatic": quest.is_automatic,
+            "completed": quest.id in completed,
+        }
+        for quest in quests
+    ]
+    return {"results": select_fields(request, results), "next_cursor": next_cursor}
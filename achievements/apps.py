@@ -4,3 +4,18 @@ from django.apps import AppConfig
 class AchievementsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'achievements'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from socgpa.db import configure_sqlite_connection
+
+        connection_created.connect(configure_sqlite_connection, dispatch_uid="socgpa_sqlite_pragmas")
+
+        from . import signals  # noqa: F401
+
+        from django.conf import settings
+
+        if settings.WARMUP_ON_READY:
+            from .warmup import warm_in_memory
+
+            warm_in_memory()
@@ -0,0 +1,138 @@
+from array import array
+from hashlib import blake2b
+
+from django.db import transaction
+
+from .models import AchievementFingerprint, LSHBucket
+
+
+# ---------- Near-duplicate поиск: MinHash + LSH ----------
+# One-permutation MinHash: каждый шингл хэшируется один раз и попадает в одну из
+# NUM_HASHES корзин, в корзине храним минимум. Сигнатура режется на BANDS полос
+# по ROWS значений; совпадение хотя бы одной полосы -> кандидат (индекс (band, bucket)).
+
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+SHINGLE_SIZE = 5
+MIN_TEXT_LENGTH = 20  # короче - слишком много ложных совпадений
+DUPLICATE_THRESHOLD = 0.8
+
+_EMPTY = 0xFFFFFFFF
+
+
+def _normalize(text):
+    text = (text or "").lower()
+    return ' '.join(''.join(ch if ch.isalnum() else ' ' for ch in text).split())
+
+
+def shingles(title, description):
+    text = _normalize(f"{title or ''} {description or ''}")
+    if len(text) < MIN_TEXT_LENGTH:
+        return set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(shingle_set):
+    if not shingle_set:
+        return None
+
+    sig = [_EMPTY] * NUM_HASHES
+    for sh in shingle_set:
+        h = int.from_bytes(blake2b(sh.encode("utf-8"), digest_size=8).digest(), "little")
+        slot = h % NUM_HASHES
+        value = h >> 32
+        if value < sig[slot]:
+            sig[slot] = value
+
+    # densification: пустую корзину заполняем из ближайшей непустой справа (по кругу),
+    # со сдвигом на расстояние - так совпадения остаются согласованными между документами
+    original = list(sig)
+    for i in range(NUM_HASHES):
+        if original[i] != _EMPTY:
+            continue
+        for step in range(1, NUM_HASHES):
+            j = (i + step) % NUM_HASHES
+            if original[j] != _EMPTY:
+                sig[i] = (original[j] + step * 0x9E3779B1) & 0xFFFFFFFF
+                break
+    return sig
+
+
+def band_buckets(sig):
+    buckets = []
+    for band in range(BANDS):
+        rows = array("I", sig[band * ROWS:(band + 1) * ROWS]).tobytes()
+        digest = blake2b(rows, digest_size=8, person=band.to_bytes(2, "little")).digest()
+        buckets.append((band, int.from_bytes(digest, "little", signed=True)))
+    return buckets
+
+
+def pack_signature(sig):
+    return array("I", sig).tobytes()
+
+
+def unpack_signature(data):
+    sig = array("I")
+    sig.frombytes(bytes(data))
+    return list(sig)
+
+
+def similarity(sig_a, sig_b):
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_HASHES
+
+
+def find_near_duplicates(sig, exclude_user_id=None, before_id=None, limit=50):
+    # bucket - 64-битный хэш, уже зависящий от номера полосы, поэтому хватает одного IN по индексу
+    keys = set(band_buckets(sig))
+    candidates = LSHBucket.objects.filter(bucket__in=[bucket for _, bucket in keys])
+    if before_id is not None:
+        candidates = candidates.filter(achievement_id__lt=before_id)
+    candidate_ids = {
+        achievement_id
+        for achievement_id, band, bucket in candidates.values_list('achievement_id', 'band', 'bucket')
+        if (band, bucket) in keys
+    }
+    if not candidate_ids:
+        return []
+
+    fingerprints = AchievementFingerprint.objects.filter(achievement_id__in=candidate_ids)
+    if exclude_user_id is not None:
+        fingerprints = fingerprints.exclude(achievement__user_id=exclude_user_id)
+
+    matches = []
+    for achievement_id, signature in fingerprints.values_list('achievement_id', 'signature'):
+        score = similarity(sig, unpack_signature(signature))
+        if score >= DUPLICATE_THRESHOLD:
+            matches.append((score, achievement_id))
+    matches.sort(reverse=True)
+    return matches[:limit]
+
+
+def build_fingerprint(achievement, sig, matches):
+    fingerprint = AchievementFingerprint(achievement=achievement, signature=pack_signature(sig))
+    if matches:
+        fingerprint.similarity, fingerprint.near_duplicate_of_id = matches[0]
+    buckets = [
+        LSHBucket(achievement=achievement, band=band, bucket=bucket)
+        for band, bucket in band_buckets(sig)
+    ]
+    return fingerprint, buckets
+
+
+def index_achievement(achievement):
+    # Проверить новую ачивку против корпуса (чужие ачивки) и добавить её в индекс.
+    # None - текста слишком мало, чтобы судить о копировании.
+    sig = minhash_signature(shingles(achievement.title, achievement.description))
+    matches = find_near_duplicates(sig, exclude_user_id=achievement.user_id) if sig is not None else []
+
+    with transaction.atomic():
+        # Переиндексация: корзины висят на ачивке, а не на отпечатке - каскадом не удалятся
+        LSHBucket.objects.filter(achievement=achievement).delete()
+        AchievementFingerprint.objects.filter(achievement=achievement).delete()
+        if sig is None:
+            return None
+        fingerprint, buckets = build_fingerprint(achievement, sig, matches)
+        fingerprint.save()
+        LSHBucket.objects.bulk_create(buckets)
+    return fingerprint
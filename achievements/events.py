@@ -0,0 +1,172 @@
+import base64
+import json
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db.models import Count, F, Max, Min, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Event
+
+
+# ---------- Каталог мероприятий: фильтры, keyset-пагинация, фиды ----------
+
+PAGE_SIZE = 12
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def upcoming_events(now=None, category=None, location=None):
+    now = now or timezone.now()
+    # Мероприятия совсем без дат (заведённые до появления полей) не отбрасываем
+    qs = Event.objects.filter(
+        Q(ends_at__gte=now)
+        | Q(ends_at__isnull=True, starts_at__gte=now)
+        | Q(starts_at__isnull=True, ends_at__isnull=True)
+    )
+    if category:
+        qs = qs.filter(category=category)
+    if location:
+        qs = qs.filter(location=location)
+    # Мероприятия без даты начала - в конце списка, явно для любой СУБД
+    return qs.order_by(F('starts_at').asc(nulls_last=True), 'id')
+
+
+def next_expiry(now=None):
+    # Ближайший момент, когда одно из предстоящих мероприятий перестанет им быть:
+    # до него список не меняется, если не менялся сам каталог
+    return upcoming_events(now=now).aggregate(at=Min(Coalesce('ends_at', 'starts_at')))['at']
+
+
+def encode_cursor(event):
+    starts_at = event.starts_at.isoformat() if event.starts_at else ""
+    raw = f"{starts_at}|{event.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    # -> (starts_at или None для мероприятий без даты, id)
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        starts_at, event_id = raw.split("|")
+        return (datetime.fromisoformat(starts_at) if starts_at else None), int(event_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def events_page(qs, cursor=None, page_size=PAGE_SIZE):
+    # (starts_at, id) > курсора - по индексу event_starts_at_id_idx, без OFFSET;
+    # NULL в starts_at идут после всех датированных
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        starts_at, event_id = position
+        if starts_at is None:
+            qs = qs.filter(starts_at__isnull=True, id__gt=event_id)
+        else:
+            qs = qs.filter(
+                Q(starts_at__gt=starts_at) | Q(starts_at=starts_at, id__gt=event_id) | Q(starts_at__isnull=True)
+            )
+    events = list(qs[:page_size + 1])
+    next_cursor = encode_cursor(events[page_size - 1]) if len(events) > page_size else None
+    return events[:page_size], next_cursor
+
+
+# ---------- Фиды: считаются один раз на версию каталога ----------
+
+def catalog_state(request=None):
+    # Любое изменение/добавление меняет max(updated_at), удаление - count.
+    # Один агрегат на запрос: ETag, Last-Modified и ключ кэша берут его отсюда.
+    state = getattr(request, '_events_catalog_state', None)
+    if state is None:
+        row = Event.objects.aggregate(last_modified=Max('updated_at'), total=Count('id'))
+        state = (row['last_modified'], row['total'])
+        if request is not None:
+            request._events_catalog_state = state
+    return state
+
+
+def catalog_etag(request, *args, **kwargs):
+    last_modified, total = catalog_state(request)
+    stamp = last_modified.timestamp() if last_modified else 0
+    return f"events-{total}-{stamp:.6f}"
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    return catalog_state(request)[0]
+
+
+def _ics_escape(text):
+    return (
+        (text or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def _ics_time(value):
+    return value.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def render_ics(events):
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//SocGPA.AI//Extracurriculars//EN",
+        "CALSCALE:GREGORIAN",
+    ]
+    for event in events:
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:event-{event.id}@socgpa.ai",
+            f"DTSTAMP:{_ics_time(event.updated_at)}",
+            f"DTSTART:{_ics_time(event.starts_at)}",
+        ]
+        if event.ends_at:
+            lines.append(f"DTEND:{_ics_time(event.ends_at)}")
+        lines += [
+            f"SUMMARY:{_ics_escape(event.title)}",
+            f"LOCATION:{_ics_escape(event.location)}",
+            f"CATEGORIES:{_ics_escape(event.category)}",
+            f"DESCRIPTION:{_ics_escape(f'Organizer: {event.organizer}')}",
+        ]
+        if event.link and event.link != "#":
+            lines.append(f"URL:{event.link}")
+        lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(lines) + "\r\n"
+
+
+def render_json(events):
+    return json.dumps({
+        "events": [
+            {
+                "id": event.id,
+                "title": event.title,
+                "organizer": event.organizer,
+                "category": event.category,
+                "location": event.location,
+                "starts_at": event.starts_at.isoformat(),
+                "ends_at": event.ends_at.isoformat() if event.ends_at else None,
+                "link": event.link,
+            }
+            for event in events
+        ]
+    })
+
+
+FEED_RENDERERS = {
+    "ics": render_ics,
+    "json": render_json,
+}
+
+
+def catalog_feed(request, fmt):
+    key = f"events-feed:{fmt}:{catalog_etag(request)}"
+    body = cache.get(key)
+    if body is None:
+        events = Event.objects.filter(starts_at__isnull=False).order_by('starts_at', 'id')
+        body = FEED_RENDERERS[fmt](events)
+        cache.set(key, body, FEED_CACHE_TIMEOUT)
+    return body
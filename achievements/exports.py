@@ -0,0 +1,131 @@
+import csv
+import json
+import os
+import zipfile
+
+from .models import Achievement
+
+
+# ---------- Потоковая выгрузка портфолио ----------
+# Всё - генераторы поверх .iterator(): CSV / JSON lines построчно, ZIP - по кускам
+# proof_file без буферизации архива. Память не зависит от размера выгрузки.
+
+EXPORT_FIELDS = (
+    'id', 'username', 'full_name', 'school_name', 'title', 'category', 'subcategory', 'scale',
+    'role_type', 'duration_months', 'status', 'total_points', 'created_at', 'proof_file', 'description',
+)
+EXPORT_CHUNK_SIZE = 500
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'jsonl': ('application/x-ndjson; charset=utf-8', 'jsonl'),
+    'zip': ('application/zip', 'zip'),
+}
+
+
+def export_queryset(user=None, school_name=None):
+    qs = Achievement.objects.select_related('user').defer('ai_raw_response', 'title_key').order_by('id')
+    if user is not None:
+        qs = qs.filter(user=user)
+    if school_name is not None:
+        qs = qs.filter(school_name=school_name)
+    return qs
+
+
+def export_row(ach):
+    return {
+        'id': ach.id,
+        'username': ach.user.username,
+        'full_name': ach.user.get_full_name(),
+        'school_name': ach.school_name,
+        'title': ach.title,
+        'category': ach.category,
+        'subcategory': ach.subcategory,
+        'scale': ach.scale,
+        'role_type': ach.role_type,
+        'duration_months': ach.duration_months,
+        'status': ach.status,
+        'total_points': ach.total_points,
+        'created_at': ach.created_at.isoformat(),
+        'proof_file': proof_name(ach) or '',
+        'description': ach.description,
+    }
+
+
+def proof_name(ach):
+    if not ach.proof_file:
+        return None
+    return f"proofs/{ach.id}-{os.path.basename(ach.proof_file.name)}"
+
+
+class _Echo:
+    # csv.writer пишет сюда, а мы сразу отдаём строку наружу
+    def write(self, value):
+        return value
+
+
+def iter_csv(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for ach in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        row = export_row(ach)
+        yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+
+def iter_jsonl(queryset):
+    for ach in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield json.dumps(export_row(ach), ensure_ascii=False) + "\n"
+
+
+class _Sink:
+    # Несидируемый поток для ZipFile: всё записанное забирается drain() и уходит клиенту
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def iter_zip(queryset, include_proofs=True):
+    # achievements.csv + proofs/<id>-<имя>; ZIP пишется в поток с дескрипторами данных
+    sink = _Sink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+        with archive.open("achievements.csv", mode="w", force_zip64=True) as entry:
+            for line in iter_csv(queryset):
+                entry.write(line.encode("utf-8"))
+                if sink.parts:
+                    yield sink.drain()
+        yield sink.drain()
+
+        if include_proofs:
+            for ach in queryset.exclude(proof_file='').exclude(proof_file__isnull=True).iterator(
+                chunk_size=EXPORT_CHUNK_SIZE
+            ):
+                try:
+                    proof = ach.proof_file.open("rb")
+                except (FileNotFoundError, OSError):
+                    continue
+                with proof, archive.open(proof_name(ach), mode="w", force_zip64=True) as entry:
+                    for chunk in proof.chunks():
+                        entry.write(chunk)
+                        yield sink.drain()
+                yield sink.drain()
+    yield sink.drain()
+
+
+def iter_export(queryset, fmt):
+    if fmt == 'csv':
+        return (line.encode('utf-8') for line in iter_csv(queryset))
+    if fmt == 'jsonl':
+        return (line.encode('utf-8') for line in iter_jsonl(queryset))
+    if fmt == 'zip':
+        return iter_zip(queryset)
+    raise ValueError(f"Unknown export format: {fmt}")
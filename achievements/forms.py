@@ -1,5 +1,6 @@
 from django import forms
 from .models import Achievement
+from .uploads import validate_proof
 
 
 class AchievementForm(forms.ModelForm):
@@ -10,6 +11,12 @@ class AchievementForm(forms.ModelForm):
             'description': forms.Textarea(attrs={'rows': 3}),
         }
 
+    def __init__(self, *args, user=None, upload_error=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+        # причина, по которой ProofUploadHandler отверг файл ещё при загрузке
+        self.upload_error = upload_error
+
     def clean(self):
         cleaned = super().clean()
         category = cleaned.get('category')
@@ -17,8 +24,12 @@ class AchievementForm(forms.ModelForm):
         description = cleaned.get('description')
         proof = cleaned.get('proof_file')
 
+        if self.upload_error:
+            raise forms.ValidationError(self.upload_error)
+
         if not proof:
             raise forms.ValidationError("Please upload a certificate or proof file.")
+        validate_proof(proof, self.user)
 
 
         if category not in ('other', None) and not subcategory:
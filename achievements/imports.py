@@ -0,0 +1,345 @@
+import csv
+import io
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Case, F, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts.models import User
+from .activity import achievement_event, record
+from .analyzers import AI_BATCH_SIZE, analysis_item, analyze_items
+from .dedup import index_achievement
+from .models import Achievement, UserScore, normalize_title
+from .moderation import achievement_coins
+from .proof_hashes import index_proof_image
+from .quests import award_quests_for_user
+from .rollups import achievement_contribution, apply_achievement_changes
+from .versions import bump, user_key
+
+
+# ---------- Массовый импорт ачивок (CSV / JSONL) ----------
+# Файл читается построчно; строки копятся в пачки по batch_size, пачка анализируется
+# параллельно и пишется одним bulk_create. После каждой пачки - контрольная точка
+# (<файл>.checkpoint), ошибки строк - в <файл>.errors.csv; повторный запуск продолжает.
+
+IMPORT_COLUMNS = (
+    'username', 'title', 'category', 'subcategory', 'description', 'proof_file', 'created_at',
+    'scale', 'role_type', 'duration_months',
+)
+CATEGORIES = {key for key, _ in Achievement.CATEGORY_CHOICES}
+SCALES = {key for key, _ in Achievement.SCALE_CHOICES}
+ROLES = {key for key, _ in Achievement.ROLE_CHOICES}
+
+
+class RowError(ValueError):
+    pass
+
+
+def iter_rows(stream, fmt):
+    # (номер строки, dict); stream - текстовый
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_no, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_no, RowError(f"invalid JSON: {e}")
+                continue
+            yield line_no, row if isinstance(row, dict) else RowError("row is not an object")
+    else:
+        raise ValueError(f"Unknown format: {fmt}")
+
+
+def format_for(path):
+    return 'jsonl' if path.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def clean_row(row, require_proof=True):
+    # Те же правила, что у AchievementForm, плюс необязательные поля уже проанализированных ачивок
+    data = {key: (str(row.get(key) or '')).strip() for key in IMPORT_COLUMNS}
+    if not data['username']:
+        raise RowError("username is required")
+    if not data['title']:
+        raise RowError("title is required")
+    if len(data['title']) > 255:
+        raise RowError("title is longer than 255 characters")
+
+    category = data['category'] or 'other'
+    if category not in CATEGORIES:
+        raise RowError(f"unknown category: {category}")
+    if category != 'other' and not data['subcategory']:
+        raise RowError("Please choose a subcategory for this achievement.")
+    if category == 'other' and not data['description']:
+        raise RowError("For 'Other' category please describe the achievement.")
+    data['category'] = category
+
+    if data['proof_file']:
+        if not default_storage.exists(data['proof_file']):
+            raise RowError(f"proof file not found in storage: {data['proof_file']}")
+    elif require_proof:
+        raise RowError("Please upload a certificate or proof file.")
+
+    if data['created_at']:
+        created_at = parse_datetime(data['created_at'])
+        if created_at is None:
+            raise RowError(f"invalid created_at: {data['created_at']}")
+        data['created_at'] = created_at if timezone.is_aware(created_at) else timezone.make_aware(created_at)
+    else:
+        data['created_at'] = None
+
+    # Заданные в файле классификации важнее анализа
+    for key, allowed in (('scale', SCALES), ('role_type', ROLES)):
+        if data[key] and data[key] not in allowed:
+            raise RowError(f"unknown {key}: {data[key]}")
+    if data['duration_months']:
+        try:
+            data['duration_months'] = max(0, int(data['duration_months']))
+        except ValueError:
+            raise RowError(f"invalid duration_months: {data['duration_months']}")
+    return data
+
+
+class Importer:
+    def __init__(self, school_name=None, batch_size=500, workers=4, require_proof=True,
+                 award_coins=True, status='approved', index_duplicates=True):
+        self.school_name = school_name
+        # False - индексы дублей (index_near_duplicates / index_proof_hashes) достраиваются потом,
+        # и строки не проверяются на копирование: все получают status
+        self.index_duplicates = index_duplicates
+        self.batch_size = batch_size
+        self.workers = workers
+        self.require_proof = require_proof
+        self.award_coins = award_coins
+        self.status = status
+        self.users = {}
+        self.imported = 0
+        self.failed = 0
+        self.flagged = 0
+
+    # ---- пользователи ----
+
+    def resolve_users(self, usernames):
+        missing = [u for u in set(usernames) if u not in self.users]
+        if missing:
+            qs = User.objects.filter(username__in=missing)
+            if self.school_name:
+                qs = qs.filter(school_name=self.school_name)
+            found = {u.username: u for u in qs.only('id', 'username', 'first_name', 'last_name', 'school_name', 'role')}
+            for username in missing:
+                self.users[username] = found.get(username)
+            if len(self.users) > 50000:
+                self.users = {u: self.users[u] for u in usernames if u in self.users}
+
+    # ---- анализ ----
+
+    def analyze(self, rows):
+        items = [
+            analysis_item(
+                self.users[data['username']].get_full_name() or data['username'],
+                data['title'],
+                data['category'],
+                data['description'],
+                file_path=default_storage.path(data['proof_file']) if data['proof_file'] else None,
+            )
+            for _, data in rows
+        ]
+        chunks = [items[i:i + AI_BATCH_SIZE] for i in range(0, len(items), AI_BATCH_SIZE)]
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            results = []
+            for chunk_results in pool.map(analyze_items, chunks):
+                results.extend(chunk_results)
+        return results
+
+    # ---- запись пачки ----
+
+    def build(self, data, user, ai_result):
+        ach = Achievement(
+            user_id=user.id,
+            title=data['title'],
+            title_key=normalize_title(data['title']),
+            school_name=user.school_name,
+            category=ai_result.get('category', data['category']),
+            subcategory=data['subcategory'],
+            description=data['description'],
+            scale=data['scale'] or ai_result.get('scale', 'school'),
+            role_type=data['role_type'] or ai_result.get('role_type', 'participant'),
+            duration_months=data['duration_months'] or ai_result.get('duration_months', 0),
+            status=self.status,
+            ai_raw_response=ai_result,
+        )
+        if data['proof_file']:
+            ach.proof_file.name = data['proof_file']
+            ach.proof_size = default_storage.size(data['proof_file'])
+        ach.total_points = ach.calculate_points()  # проставляет и scoring_version
+        return ach
+
+    def is_duplicate(self, ach):
+        # Та же проверка, что в add_achievement_view: скопированное у другого ученика описание
+        # или чужой сертификат. По одной, чтобы ачивки пачки сверялись и друг с другом
+        fingerprint = index_achievement(ach)
+        proof_hash = index_proof_image(ach) if ach.proof_file else None
+        return bool(
+            (fingerprint and fingerprint.near_duplicate_of_id)
+            or (proof_hash and proof_hash.near_duplicate_of_id)
+        )
+
+    def write(self, rows, results):
+        achievements = []
+        created_at = []
+        for (_, data), ai_result in zip(rows, results):
+            achievements.append(self.build(data, self.users[data['username']], ai_result))
+            created_at.append(data['created_at'])
+
+        with transaction.atomic():
+            # bulk_create не вызывает save() и сигналы: title_key/school_name/очки выставлены
+            # в build(), роллапы, монеты, GPA и версии - ниже
+            Achievement.objects.bulk_create(achievements, batch_size=self.batch_size)
+            dated = []
+            for ach, when in zip(achievements, created_at):
+                if when:
+                    ach.created_at = when
+                    dated.append(ach)
+            if dated:
+                Achievement.objects.bulk_update(dated, ['created_at'], batch_size=self.batch_size)
+
+            if self.index_duplicates:
+                # дубли уходят на проверку до монет, квестов и ленты
+                flagged = [ach for ach in achievements if self.is_duplicate(ach) and ach.status == 'approved']
+                for ach in flagged:
+                    ach.status = 'pending'
+                    ach.total_points = ach.calculate_points()
+                if flagged:
+                    Achievement.objects.bulk_update(
+                        flagged, ['status', 'total_points', 'scoring_version'], batch_size=self.batch_size
+                    )
+                self.flagged += len(flagged)
+
+            apply_achievement_changes([(None, achievement_contribution(ach)) for ach in achievements])
+
+            by_user = defaultdict(list)
+            for ach in achievements:
+                by_user[ach.user_id].append(ach)
+            user_ids = list(by_user)
+            users_by_id = {u.id: u for u in self.users.values() if u is not None and u.id in by_user}
+            approved = defaultdict(list)
+            for ach in achievements:
+                if ach.status == 'approved':
+                    approved[ach.user_id].append(ach)
+
+            if self.award_coins and approved:
+                coins = {uid: sum(achievement_coins(a) for a in items) for uid, items in approved.items()}
+                User.objects.filter(pk__in=list(coins)).update(
+                    soc_coins=F('soc_coins') + Case(*[When(pk=uid, then=n) for uid, n in coins.items()])
+                )
+                for uid, items in approved.items():
+                    award_quests_for_user(users_by_id[uid], items)
+
+            # дата события - дата строки, чтобы старые ачивки не всплывали наверх ленты
+            record([
+                achievement_event(a, users_by_id[uid], when=a.created_at)
+                for uid, items in approved.items() for a in items
+            ])
+
+            usage = {uid: sum(a.proof_size for a in items) for uid, items in by_user.items()}
+            usage = {uid: size for uid, size in usage.items() if size}
+            if usage:
+                User.objects.filter(pk__in=list(usage)).update(
+                    storage_used=F('storage_used') + Case(*[When(pk=uid, then=n) for uid, n in usage.items()])
+                )
+
+            UserScore.objects.filter(user_id__in=user_ids).update(next_refresh_at=timezone.now())
+            bump('leaderboard', *(user_key(uid) for uid in user_ids))
+        return len(achievements)
+
+    # ---- основной цикл ----
+
+    def run(self, stream, fmt, start_after=0, on_error=None, on_batch=None):
+        # on_error(line_no, message, raw); on_batch(last_line) - после каждой записанной пачки
+        pending = []
+        last_line = start_after
+
+        def flush():
+            nonlocal pending
+            if not pending:
+                return
+            self.resolve_users([data['username'] for _, data in pending])
+            valid = []
+            for line_no, data in pending:
+                if self.users.get(data['username']) is None:
+                    self.failed += 1
+                    if on_error:
+                        scope = f" in school {self.school_name}" if self.school_name else ""
+                        on_error(line_no, f"unknown user {data['username']}{scope}", data)
+                else:
+                    valid.append((line_no, data))
+            if valid:
+                self.imported += self.write(valid, self.analyze(valid))
+            if on_batch:
+                on_batch(last_line)
+            pending = []
+
+        for line_no, row in iter_rows(stream, fmt):
+            if line_no <= start_after:
+                continue
+            last_line = line_no
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                pending.append((line_no, clean_row(row, self.require_proof)))
+            except RowError as e:
+                self.failed += 1
+                if on_error:
+                    on_error(line_no, str(e), row if isinstance(row, dict) else {})
+            if len(pending) >= self.batch_size:
+                flush()
+        flush()
+        if on_batch:
+            on_batch(last_line)
+        return self.imported, self.failed
+
+
+def import_file(path, **options):
+    # Импорт с контрольной точкой и отчётом об ошибках рядом с файлом
+    checkpoint_path = path + '.checkpoint'
+    errors_path = path + '.errors.csv'
+    start_after = 0
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            start_after = json.load(f).get('line', 0)
+
+    importer = Importer(**options)
+    new_report = start_after == 0 or not os.path.exists(errors_path)
+    with open(path, newline='', encoding='utf-8-sig') as stream, \
+            open(errors_path, 'w' if new_report else 'a', newline='', encoding='utf-8') as errors:
+        writer = csv.writer(errors)
+        if new_report:
+            writer.writerow(['line', 'error', 'row'])
+
+        def on_error(line_no, message, raw):
+            writer.writerow([line_no, message, json.dumps(raw, ensure_ascii=False, default=str)])
+
+        def on_batch(last_line):
+            errors.flush()
+            with open(checkpoint_path + '.tmp', 'w') as f:
+                json.dump({'line': last_line, 'imported': importer.imported, 'failed': importer.failed}, f)
+            os.replace(checkpoint_path + '.tmp', checkpoint_path)
+
+        importer.run(stream, format_for(path), start_after=start_after, on_error=on_error, on_batch=on_batch)
+
+    return importer, start_after, errors_path
+
+
+def open_text(upload):
+    # UploadedFile -> текстовый поток без чтения целиком в память
+    return io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
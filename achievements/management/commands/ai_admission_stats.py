@@ -0,0 +1,18 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from achievements.admission import ai_admission
+
+
+class Command(BaseCommand):
+    help = "Show shared AI admission-control state: in-flight calls, tokens, queue depth and rejection counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="clear counters, slots and the token bucket")
+
+    def handle(self, *args, **options):
+        admission = ai_admission()
+        if options["reset"]:
+            admission.reset()
+        self.stdout.write(json.dumps(admission.stats(), indent=2))
@@ -0,0 +1,165 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from achievements.utils import local_fallback_analysis
+
+
+# ---------- Локальная замена /chat/completions для нагрузочных тестов ----------
+# Отвечает JSON того же вида, что ждёт ChatCompletionsAnalyzer (одиночный и пакетный
+# промпт), с настраиваемой задержкой, ошибками, зависаниями и битым JSON.
+# Использование: AI_PROVIDER=OPENAI_COMPATIBLE AI_BASE_URL=http://127.0.0.1:8001/v1
+
+class Simulator:
+    def __init__(self, latency_ms, jitter_ms, distribution, error_rate, timeout_rate, hang_seconds,
+                 malformed_rate, seed=None):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.distribution = distribution
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self.malformed_rate = malformed_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "items": 0, "errors": 0, "timeouts": 0, "malformed": 0}
+
+    def delay(self):
+        with self.lock:
+            if self.distribution == "fixed":
+                return self.latency
+            if self.distribution == "uniform":
+                return max(0.0, self.random.uniform(self.latency - self.jitter, self.latency + self.jitter))
+            if self.distribution == "exponential":
+                return self.random.expovariate(1 / self.latency) if self.latency else 0.0
+            # lognormal: медиана = latency, хвост задаётся jitter
+            sigma = self.jitter / self.latency if self.latency else 0.0
+            return self.random.lognormvariate(0, sigma) * self.latency
+
+    def outcome(self):
+        with self.lock:
+            roll = self.random.random()
+        if roll < self.timeout_rate:
+            return "timeout"
+        if roll < self.timeout_rate + self.error_rate:
+            return "error"
+        if roll < self.timeout_rate + self.error_rate + self.malformed_rate:
+            return "malformed"
+        return "ok"
+
+    def count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    @staticmethod
+    def analyze(payload):
+        result = local_fallback_analysis(
+            payload.get("student_name"),
+            payload.get("title"),
+            payload.get("category_hint"),
+            payload.get("description"),
+            payload.get("profile_summary"),
+        )
+        result.pop("provider", None)
+        return result
+
+    def content(self, body):
+        payload = json.loads(body["messages"][-1]["content"])
+        if "items" in payload:
+            self.count("items", len(payload["items"]))
+            return {"results": [{"id": item.get("id"), **self.analyze(item)} for item in payload["items"]]}
+        self.count("items")
+        return self.analyze(payload)
+
+
+def make_handler(sim):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body):
+            data = body.encode() if isinstance(body, str) else body
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/stats":
+                self._send(200, json.dumps(sim.stats))
+            else:
+                self._send(404, '{"error": "not found"}')
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send(404, '{"error": "not found"}')
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            sim.count("requests")
+            outcome = sim.outcome()
+            if outcome == "timeout":
+                sim.count("timeouts")
+                time.sleep(sim.hang_seconds)
+            else:
+                time.sleep(sim.delay())
+
+            if outcome == "error":
+                sim.count("errors")
+                self._send(sim.random.choice([429, 500, 502, 503]), '{"error": {"message": "simulated"}}')
+                return
+            if outcome == "malformed":
+                sim.count("malformed")
+                content = '{"category": "research", "scores": '
+            else:
+                try:
+                    content = json.dumps(sim.content(body))
+                except (KeyError, ValueError, TypeError) as e:
+                    self._send(400, json.dumps({"error": {"message": repr(e)}}))
+                    return
+            self._send(200, json.dumps({
+                "id": f"sim-{time.time_ns()}",
+                "object": "chat.completion",
+                "model": body.get("model", "simulator"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            }))
+
+    return Handler
+
+
+class Command(BaseCommand):
+    help = "Run a local OpenAI-compatible chat completions simulator for load tests."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8001)
+        parser.add_argument("--latency-ms", type=float, default=800, help="median/mean response latency")
+        parser.add_argument("--jitter-ms", type=float, default=300)
+        parser.add_argument("--distribution", choices=["fixed", "uniform", "exponential", "lognormal"], default="lognormal")
+        parser.add_argument("--error-rate", type=float, default=0.0, help="share of 429/5xx responses")
+        parser.add_argument("--timeout-rate", type=float, default=0.0, help="share of requests that hang")
+        parser.add_argument("--hang-seconds", type=float, default=60)
+        parser.add_argument("--malformed-rate", type=float, default=0.0, help="share of responses with broken JSON")
+        parser.add_argument("--seed", type=int)
+
+    def handle(self, *args, **options):
+        sim = Simulator(
+            options["latency_ms"], options["jitter_ms"], options["distribution"], options["error_rate"],
+            options["timeout_rate"], options["hang_seconds"], options["malformed_rate"], seed=options["seed"],
+        )
+        server = ThreadingHTTPServer((options["host"], options["port"]), make_handler(sim))
+        server.daemon_threads = True
+        self.stdout.write(f"AI simulator on http://{options['host']}:{options['port']}/v1/chat/completions")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(json.dumps(sim.stats))
@@ -0,0 +1,33 @@
+from itertools import groupby
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from achievements.models import Achievement, ScoreSnapshot
+from achievements.scoring import replay_history
+
+
+class Command(BaseCommand):
+    help = "Rebuild daily Social GPA snapshots from achievement history (one pass per user)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", dest="user_ids", help="limit to these user ids")
+
+    def handle(self, *args, **options):
+        qs = Achievement.objects.filter(status='approved').order_by('user_id', 'created_at')
+        if options["user_ids"]:
+            qs = qs.filter(user_id__in=options["user_ids"])
+
+        users = rows = 0
+        for user_id, achievements in groupby(qs.iterator(chunk_size=2000), key=lambda a: a.user_id):
+            snapshots = replay_history(list(achievements))
+            with transaction.atomic():
+                ScoreSnapshot.objects.filter(user_id=user_id).delete()
+                ScoreSnapshot.objects.bulk_create([
+                    ScoreSnapshot(user_id=user_id, day=day, raw_score=raw_score, social_gpa=social_gpa)
+                    for day, raw_score, social_gpa in snapshots
+                ])
+            users += 1
+            rows += len(snapshots)
+
+        self.stdout.write(f"Backfilled {rows} snapshots for {users} users.")
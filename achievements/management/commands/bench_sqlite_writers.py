@@ -0,0 +1,148 @@
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from socgpa.db import apply_sqlite_pragmas, sqlite_pragmas
+
+
+# Django по умолчанию: rollback-journal, synchronous=FULL, отложенный BEGIN
+DEFAULT_PRAGMAS = [
+    ("journal_mode", "DELETE"),
+    ("synchronous", "FULL"),
+]
+
+SCHEMA = """
+CREATE TABLE users (id INTEGER PRIMARY KEY, soc_coins INTEGER NOT NULL DEFAULT 0);
+CREATE TABLE achievements (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    total_points REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def _connect(path, pragmas, timeout):
+    conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+    apply_sqlite_pragmas(conn.cursor(), pragmas)
+    return conn
+
+
+def _writer(path, pragmas, timeout, begin, worker_id, ops, result_queue):
+    conn = _connect(path, pragmas, timeout)
+    done = errors = 0
+    for i in range(ops):
+        try:
+            conn.execute(begin)
+            # как в add_achievement_view: прочитать монеты, потом записать
+            coins = conn.execute("SELECT soc_coins FROM users WHERE id = ?", (worker_id,)).fetchone()[0]
+            conn.execute(
+                "INSERT INTO achievements (user_id, title, total_points, created_at) VALUES (?, ?, ?, ?)",
+                (worker_id, f"bench {i}", 7.5, time.time()),
+            )
+            conn.execute("UPDATE users SET soc_coins = ? WHERE id = ?", (coins + 10, worker_id))
+            conn.execute("COMMIT")
+            done += 1
+        except sqlite3.OperationalError:
+            errors += 1
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+    conn.close()
+    result_queue.put(("write", done, errors))
+
+
+def _reader(path, pragmas, timeout, stop, result_queue):
+    conn = _connect(path, pragmas, timeout)
+    done = errors = 0
+    while not stop.is_set():
+        try:
+            conn.execute(
+                "SELECT user_id, SUM(total_points) FROM achievements GROUP BY user_id ORDER BY 2 DESC LIMIT 100"
+            ).fetchall()
+            done += 1
+        except sqlite3.OperationalError:
+            errors += 1
+    conn.close()
+    result_queue.put(("read", done, errors))
+
+
+def run_scenario(pragmas, timeout, begin, writers, readers, ops):
+    fd, path = tempfile.mkstemp(suffix=".sqlite3")
+    os.close(fd)
+    try:
+        conn = _connect(path, pragmas, timeout)
+        conn.executescript(SCHEMA)
+        conn.executemany("INSERT INTO users (id, soc_coins) VALUES (?, 0)", [(w,) for w in range(writers)])
+        conn.close()
+
+        ctx = multiprocessing.get_context("spawn")
+        queue = ctx.Queue()
+        stop = ctx.Event()
+        writer_procs = [
+            ctx.Process(target=_writer, args=(path, pragmas, timeout, begin, w, ops, queue))
+            for w in range(writers)
+        ]
+        # читатели крутятся, пока писатели не закончат
+        reader_procs = [
+            ctx.Process(target=_reader, args=(path, pragmas, timeout, stop, queue))
+            for _ in range(readers)
+        ]
+        start = time.time()
+        for p in reader_procs + writer_procs:
+            p.start()
+        results = [queue.get() for _ in writer_procs]
+        elapsed = time.time() - start
+        stop.set()
+        results += [queue.get() for _ in reader_procs]
+        for p in reader_procs + writer_procs:
+            p.join()
+    finally:
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    writes = sum(r[1] for r in results if r[0] == "write")
+    write_errors = sum(r[2] for r in results if r[0] == "write")
+    reads = sum(r[1] for r in results if r[0] == "read")
+    read_errors = sum(r[2] for r in results if r[0] == "read")
+    return {
+        "elapsed": elapsed,
+        "writes": writes,
+        "write_errors": write_errors,
+        "writes_per_sec": writes / elapsed if elapsed else 0.0,
+        "reads": reads,
+        "read_errors": read_errors,
+    }
+
+
+class Command(BaseCommand):
+    help = "Concurrent-writer SQLite benchmark: Django defaults vs the tuned PRAGMA set."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=8)
+        parser.add_argument("--readers", type=int, default=2)
+        parser.add_argument("--ops", type=int, default=300, help="transactions per writer")
+        parser.add_argument("--default-timeout", type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        tuned = sqlite_pragmas()
+        busy_ms = dict(tuned).get("busy_timeout", 5000)
+        scenarios = [
+            ("before (defaults, BEGIN DEFERRED)", DEFAULT_PRAGMAS, options["default_timeout"], "BEGIN"),
+            ("after (tuned, BEGIN IMMEDIATE)", tuned, busy_ms / 1000, "BEGIN IMMEDIATE"),
+        ]
+        for label, pragmas, timeout, begin in scenarios:
+            r = run_scenario(
+                pragmas, timeout, begin,
+                writers=options["writers"], readers=options["readers"], ops=options["ops"],
+            )
+            self.stdout.write(
+                f"{label}: {r['writes']} commits in {r['elapsed']:.2f}s "
+                f"({r['writes_per_sec']:.0f}/s), {r['write_errors']} write errors, "
+                f"{r['reads']} reads, {r['read_errors']} read errors"
+            )
@@ -0,0 +1,86 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+# Каждый прогон - отдельный интерпретатор, как новый воркер gunicorn: импорт socgpa.wsgi
+# (с прогревом или без), затем первый запрос и пиковый RSS процесса.
+CHILD = r"""
+import json, os, resource, sys, time
+t0 = time.perf_counter()
+import socgpa.wsgi  # noqa: F401
+booted = time.perf_counter()
+
+from django.test import Client
+from django.test.utils import setup_test_environment
+from accounts.models import User
+
+setup_test_environment()
+client = Client()
+user = User.objects.filter(username=os.environ["BENCH_USER"]).first() if os.environ["BENCH_USER"] else None
+if user is not None:
+    client.force_login(user)
+t1 = time.perf_counter()
+status = client.get(os.environ["BENCH_PATH"]).status_code
+first = time.perf_counter() - t1
+t2 = time.perf_counter()
+client.get(os.environ["BENCH_PATH"])
+second = time.perf_counter() - t2
+
+print(json.dumps({
+    "boot": booted - t0,
+    "first": first,
+    "second": second,
+    "status": status,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "requests": "requests" in sys.modules,
+    "pil": "PIL" in sys.modules,
+}))
+"""
+
+
+def run_child(warmup, path, username):
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "socgpa.settings"),
+        "WARMUP_ON_READY": "true" if warmup else "false",
+        "BENCH_PATH": path,
+        "BENCH_USER": username or "",
+    }
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD], env=env, cwd=settings.BASE_DIR,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+class Command(BaseCommand):
+    help = "Cold-start benchmark: import time, time to first response and RSS per fresh worker, with and without WARMUP_ON_READY."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--path", default="/", help="page requested after boot")
+        parser.add_argument("--user", help="log in as this username (default: first student)")
+
+    def handle(self, *args, **options):
+        from accounts.models import User
+
+        username = options["user"] or User.objects.filter(role="student").values_list("username", flat=True).first()
+        for label, warmup in (("lazy (default)", False), ("WARMUP_ON_READY", True)):
+            runs = [run_child(warmup, options["path"], username) for _ in range(options["runs"])]
+            med = lambda key: statistics.median(r[key] for r in runs)  # noqa: E731
+            self.stdout.write(
+                f"{label}: boot {med('boot') * 1000:.0f} ms, first response {med('first') * 1000:.0f} ms "
+                f"(HTTP {runs[0]['status']}), next {med('second') * 1000:.0f} ms, "
+                f"boot+first {(med('boot') + med('first')) * 1000:.0f} ms, RSS {med('rss_mb'):.0f} MB, "
+                f"requests loaded: {runs[0]['requests']}, PIL loaded: {runs[0]['pil']}"
+            )
+        self.stdout.write(
+            "With gunicorn --preload the boot/warm-up cost is paid once in the master and "
+            "workers share the loaded pages copy-on-write."
+        )
@@ -0,0 +1,42 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from achievements.exports import FORMATS, export_queryset, iter_export
+
+
+class Command(BaseCommand):
+    help = "Stream achievements of a student or a whole school to CSV, JSONL or ZIP (with proof files)."
+
+    def add_arguments(self, parser):
+        scope = parser.add_mutually_exclusive_group(required=True)
+        scope.add_argument("--user", help="username of the student")
+        scope.add_argument("--school", help="school_name")
+        parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+        parser.add_argument("--output", "-o", help="output path (stdout if omitted)")
+
+    def handle(self, *args, **options):
+        if options["user"]:
+            user = User.objects.filter(username=options["user"]).first()
+            if user is None:
+                raise CommandError(f"No such user: {options['user']}")
+            queryset = export_queryset(user=user)
+        else:
+            queryset = export_queryset(school_name=options["school"])
+
+        if options["output"]:
+            out = open(options["output"], "wb")
+        else:
+            out = sys.stdout.buffer
+        written = 0
+        try:
+            for chunk in iter_export(queryset, options["format"]):
+                out.write(chunk)
+                written += len(chunk)
+        finally:
+            if options["output"]:
+                out.close()
+
+        if options["output"]:
+            self.stdout.write(f"Wrote {written} bytes to {options['output']}.")
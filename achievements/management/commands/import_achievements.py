@@ -0,0 +1,52 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from achievements.imports import import_file
+
+
+class Command(BaseCommand):
+    help = "Import achievements from a CSV or JSONL file in batches, resuming from <file>.checkpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help=".csv or .jsonl with columns username,title,category,subcategory,description,...")
+        parser.add_argument("--school", help="only accept users of this school_name")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--workers", type=int, default=4, help="parallel analysis calls per batch")
+        parser.add_argument("--status", choices=["approved", "pending"], default="approved")
+        parser.add_argument("--allow-missing-proof", action="store_true")
+        parser.add_argument("--no-coins", action="store_true", help="do not credit SocCoins for imported rows")
+        parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+        parser.add_argument(
+            "--skip-index", action="store_true",
+            help="do not add rows to the near-duplicate indexes and do not send copied rows to review; "
+                 "run index_near_duplicates and index_proof_hashes afterwards",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"No such file: {path}")
+        if options["restart"] and os.path.exists(path + ".checkpoint"):
+            os.remove(path + ".checkpoint")
+
+        started = time.monotonic()
+        importer, start_after, errors_path = import_file(
+            path,
+            school_name=options["school"],
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            require_proof=not options["allow_missing_proof"],
+            award_coins=not options["no_coins"],
+            status=options["status"],
+            index_duplicates=not options["skip_index"],
+        )
+        elapsed = time.monotonic() - started
+
+        if start_after:
+            self.stdout.write(f"Resumed after line {start_after}.")
+        self.stdout.write(
+            f"Imported {importer.imported} achievements ({importer.flagged} near-duplicates sent to review), "
+            f"{importer.failed} rows rejected in {elapsed:.1f}s. Errors: {errors_path}"
+        )
@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from achievements.dedup import (
+    band_buckets,
+    build_fingerprint,
+    find_near_duplicates,
+    minhash_signature,
+    shingles,
+    similarity,
+    DUPLICATE_THRESHOLD,
+)
+from achievements.models import Achievement, AchievementFingerprint, LSHBucket
+
+
+class Command(BaseCommand):
+    help = "Build the MinHash/LSH near-duplicate index for achievements that are not indexed yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--rebuild", action="store_true", help="drop the index and start over")
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            LSHBucket.objects.all().delete()
+            AchievementFingerprint.objects.all().delete()
+
+        unindexed = (
+            Achievement.objects.filter(fingerprint__isnull=True)
+            .only('id', 'user_id', 'title', 'description')
+            .order_by('id')
+        )
+
+        last_id = 0
+        indexed = flagged = 0
+        while True:
+            batch = list(unindexed.filter(id__gt=last_id)[:options["batch_size"]])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            fingerprints, buckets = [], []
+            # Ачивки этой же пачки ещё не в БД - сравниваем с ними в памяти
+            batch_buckets = {}
+            for ach in batch:
+                sig = minhash_signature(shingles(ach.title, ach.description))
+                if sig is None:
+                    continue
+
+                matches = find_near_duplicates(sig, exclude_user_id=ach.user_id, before_id=ach.id)
+                seen = set()
+                for key in band_buckets(sig):
+                    for other, other_sig in batch_buckets.get(key, ()):
+                        if other.user_id == ach.user_id or other.id in seen:
+                            continue
+                        seen.add(other.id)
+                        score = similarity(sig, other_sig)
+                        if score >= DUPLICATE_THRESHOLD:
+                            matches.append((score, other.id))
+                    batch_buckets.setdefault(key, []).append((ach, sig))
+                matches.sort(reverse=True)
+
+                fingerprint, ach_buckets = build_fingerprint(ach, sig, matches)
+                fingerprints.append(fingerprint)
+                buckets.extend(ach_buckets)
+                flagged += bool(matches)
+
+            with transaction.atomic():
+                AchievementFingerprint.objects.bulk_create(fingerprints)
+                LSHBucket.objects.bulk_create(buckets)
+            indexed += len(fingerprints)
+
+        self.stdout.write(f"Indexed {indexed} achievements, {flagged} near-duplicates found.")
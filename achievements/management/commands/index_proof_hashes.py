@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from achievements.models import Achievement, ProofImageHash
+from achievements.proof_hashes import (
+    MATCH_DISTANCE,
+    build_proof_hash,
+    find_similar_proofs,
+    hamming,
+    read_proof_hash,
+)
+
+
+class Command(BaseCommand):
+    help = "Compute perceptual hashes for proof images that are not indexed yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--rebuild", action="store_true", help="drop the index and start over")
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            ProofImageHash.objects.all().delete()
+
+        unindexed = (
+            Achievement.objects.filter(proof_hash__isnull=True)
+            .exclude(proof_file='')
+            .exclude(proof_file__isnull=True)
+            .only('id', 'user_id', 'proof_file')
+            .order_by('id')
+        )
+
+        last_id = 0
+        indexed = skipped = flagged = 0
+        while True:
+            batch = list(unindexed.filter(id__gt=last_id)[:options["batch_size"]])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            hashes, rows = [], []
+            for ach in batch:
+                processed, value = read_proof_hash(ach)
+                if value is None:
+                    skipped += 1
+                    # не картинку запоминаем отметкой, чтобы следующий прогон её не открывал
+                    if processed:
+                        rows.append(build_proof_hash(ach, None, []))
+                    continue
+
+                matches = find_similar_proofs(value, exclude_user_id=ach.user_id, before_id=ach.id)
+                # эта пачка ещё не в БД - сверяем с ней напрямую
+                for other, other_value in hashes:
+                    if other.user_id != ach.user_id:
+                        distance = hamming(value, other_value)
+                        if distance <= MATCH_DISTANCE:
+                            matches.append((distance, other.id))
+                matches.sort()
+
+                hashes.append((ach, value))
+                rows.append(build_proof_hash(ach, value, matches))
+                flagged += bool(matches)
+
+            with transaction.atomic():
+                ProofImageHash.objects.bulk_create(rows)
+            indexed += len(hashes)
+
+        self.stdout.write(
+            f"Indexed {indexed} proof images ({skipped} skipped: not an image or missing), "
+            f"{flagged} reused proofs found."
+        )
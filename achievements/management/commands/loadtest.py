@@ -0,0 +1,187 @@
+import io
+import random
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from accounts.models import User
+from achievements.models import Achievement, ShopItem
+
+
+# ---------- Нагрузочный прогон против запущенного сервера ----------
+# Пользователи создаются в той же БД, что у сервера; каждый поток логинится своим
+# пользователем и крутит смесь операций. Для стабильного AI-слоя поднимите ai_simulator
+# и запустите сервер с AI_PROVIDER=OPENAI_COMPATIBLE.
+
+PASSWORD = "loadtest-password"
+USER_PREFIX = "loadtest_"
+WORDS = (
+    "olympiad robotics volunteer debate chess marathon hackathon orchestra research mentor "
+    "city national international school leader winner founder camp festival league project"
+).split()
+FALLBACK_PROVIDERS = ("local_fallback", "safe_minimal_fallback")
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def proof_png():
+    image = Image.new("RGB", (64, 48), tuple(random.randrange(256) for _ in range(3)))
+    for _ in range(40):
+        image.putpixel((random.randrange(64), random.randrange(48)), tuple(random.randrange(256) for _ in range(3)))
+    buf = io.BytesIO()
+    image.save(buf, "PNG")
+    return buf.getvalue()
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, op, started, ok):
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.latencies[op].append(elapsed)
+            if not ok:
+                self.errors[op] += 1
+
+
+class Worker:
+    def __init__(self, base_url, username, recorder, item_ids, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.username = username
+        self.recorder = recorder
+        self.item_ids = item_ids
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _call(self, op, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            resp = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+            ok = resp.status_code < 400
+        except requests.RequestException:
+            resp, ok = None, False
+        self.recorder.record(op, started, ok)
+        return resp
+
+    def _csrf(self):
+        return {"csrfmiddlewaretoken": self.session.cookies.get("csrftoken", "")}
+
+    def login(self):
+        self.session.get(self.base_url + "/login/", timeout=self.timeout)
+        resp = self._call("login", "POST", "/login/", data={
+            **self._csrf(), "username": self.username, "password": PASSWORD,
+        }, allow_redirects=False)
+        return resp is not None and resp.status_code == 302
+
+    def upload(self):
+        title = " ".join(random.sample(WORDS, 5)).title()
+        self._call("upload", "POST", "/add/", data={
+            **self._csrf(),
+            "title": title,
+            "category": "other",
+            "description": f"{title}: {' '.join(random.sample(WORDS, 8))}",
+        }, files={"proof_file": (f"proof-{random.randrange(10**9)}.png", proof_png(), "image/png")})
+
+    def purchase(self):
+        if self.item_ids:
+            self._call("purchase", "POST", "/shop/", data={**self._csrf(), "item_id": random.choice(self.item_ids)})
+
+    def leaderboard(self):
+        self._call("leaderboard", "GET", "/leaderboard/")
+
+
+class Command(BaseCommand):
+    help = "Drive concurrent logins, uploads, shop purchases and leaderboard reads against a running server."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+        parser.add_argument("--duration", type=float, default=30, help="seconds")
+        parser.add_argument("--mix", default="upload=2,purchase=1,leaderboard=6", help="op=weight,...")
+        parser.add_argument("--think-ms", type=float, default=0, help="pause between ops per user")
+        parser.add_argument("--timeout", type=float, default=60)
+        parser.add_argument("--coins", type=int, default=500, help="starting SocCoins per user")
+        parser.add_argument("--cleanup", action="store_true", help="delete load-test users afterwards")
+
+    def handle(self, *args, **options):
+        try:
+            mix = {op: float(w) for op, w in (part.split("=") for part in options["mix"].split(","))}
+        except ValueError:
+            raise CommandError("--mix must look like upload=2,purchase=1,leaderboard=6")
+        unknown = set(mix) - {"upload", "purchase", "leaderboard"}
+        if unknown:
+            raise CommandError(f"Unknown ops in --mix: {', '.join(sorted(unknown))}")
+
+        usernames = [f"{USER_PREFIX}{i}" for i in range(options["users"])]
+        for username in usernames:
+            user, _ = User.objects.get_or_create(username=username, defaults={"school_name": "Load Test School"})
+            user.set_password(PASSWORD)
+            user.soc_coins = options["coins"]
+            user.save()
+        first_new_id = (Achievement.objects.order_by("-id").values_list("id", flat=True).first() or 0) + 1
+        item_ids = list(ShopItem.objects.values_list("id", flat=True))
+
+        recorder = Recorder()
+        ops, weights = list(mix), list(mix.values())
+        deadline = time.monotonic() + options["duration"]
+
+        def run(username):
+            worker = Worker(options["base_url"], username, recorder, item_ids, options["timeout"])
+            if not worker.login():
+                return
+            while time.monotonic() < deadline:
+                getattr(worker, random.choices(ops, weights)[0])()
+                if options["think_ms"]:
+                    time.sleep(options["think_ms"] / 1000)
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=run, args=(u,)) for u in usernames]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.monotonic() - started
+
+        self.report(recorder, elapsed, usernames, first_new_id)
+
+        if options["cleanup"]:
+            User.objects.filter(username__in=usernames).delete()
+
+    def report(self, recorder, elapsed, usernames, first_new_id):
+        self.stdout.write(f"{len(usernames)} users, {elapsed:.1f}s")
+        self.stdout.write(f"{'op':<12}{'count':>8}{'rps':>8}{'err':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        total = 0
+        for op, values in sorted(recorder.latencies.items()):
+            total += len(values)
+            self.stdout.write(
+                f"{op:<12}{len(values):>8}{len(values) / elapsed:>8.1f}{recorder.errors[op]:>6}"
+                f"{percentile(values, 50) * 1000:>9.0f}{percentile(values, 95) * 1000:>9.0f}"
+                f"{percentile(values, 99) * 1000:>9.0f}"
+            )
+        self.stdout.write(f"total {total} requests, {total / elapsed:.1f} req/s")
+
+        providers = defaultdict(int)
+        for response in Achievement.objects.filter(
+            id__gte=first_new_id, user__username__in=usernames
+        ).values_list("ai_raw_response", flat=True):
+            providers[(response or {}).get("provider", "unknown")] += 1
+        analysed = sum(providers.values())
+        if analysed:
+            fallback = sum(n for p, n in providers.items() if p in FALLBACK_PROVIDERS)
+            breakdown = ", ".join(f"{p}={n}" for p, n in sorted(providers.items()))
+            self.stdout.write(f"uploads analysed: {analysed}, fallback rate {100 * fallback / analysed:.1f}% ({breakdown})")
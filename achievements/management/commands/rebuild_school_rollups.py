@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from achievements.models import SchoolCategoryMonth, SchoolGpaBucket
+from achievements.rollups import rebuild_school_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild school analytics rollups from scratch (also reconciles drift, e.g. after a school rename)."
+
+    def handle(self, *args, **options):
+        rebuild_school_rollups()
+        self.stdout.write(
+            f"Rebuilt {SchoolCategoryMonth.objects.count()} category/month rows "
+            f"and {SchoolGpaBucket.objects.count()} GPA buckets."
+        )
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from achievements.scoring import refresh_due_scores
+
+
+class Command(BaseCommand):
+    help = "Recompute cached Social GPA only for users whose result is due (365-day repeat window)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="run forever instead of a single pass (cron)")
+        parser.add_argument("--interval", type=int, default=300, help="seconds between passes with --loop")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        while True:
+            total = 0
+            while True:
+                refreshed = refresh_due_scores(batch_size=options["batch_size"])
+                total += refreshed
+                if refreshed < options["batch_size"]:
+                    break
+            self.stdout.write(f"Refreshed {total} user scores.")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
+            close_old_connections()
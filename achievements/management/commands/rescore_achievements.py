@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from achievements.models import Achievement
+from achievements.scoring import RESCORE_FIELDS, rescore_batch
+from achievements.weights import get_weights
+
+
+class Command(BaseCommand):
+    help = "Recompute total_points for achievements scored with an older weights version."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        weights = get_weights()
+        batch_size = options["batch_size"]
+        stale = (
+            Achievement.objects.exclude(scoring_version=weights.version)
+            .only(*RESCORE_FIELDS)
+            .order_by('id')
+        )
+
+        last_id = 0
+        updated = 0
+        while True:
+            batch = list(stale.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+
+            rescore_batch(batch)
+
+            last_id = batch[-1].id
+            updated += len(batch)
+
+        self.stdout.write(f"Rescored {updated} achievements with weights v{weights.version}.")
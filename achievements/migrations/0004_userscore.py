@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achievements', '0003_achievement_subcategory_alter_achievement_category'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('raw_score', models.FloatField(default=0)),
+                ('social_gpa', models.FloatField(default=0)),
+                ('computed_at', models.DateTimeField(blank=True, null=True)),
+                ('next_refresh_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='social_score', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achievements', '0005_scoresnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='achievement',
+            name='scoring_version',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_title_key(apps, schema_editor):
+    Achievement = apps.get_model('achievements', 'Achievement')
+    batch = []
+    for ach in Achievement.objects.only('id', 'title').iterator(chunk_size=2000):
+        title = (ach.title or "").lower()
+        norm = ''.join(ch if (ch.isalnum() or ch.isspace()) else ' ' for ch in title)
+        ach.title_key = ' '.join(norm.split()[:6])
+        batch.append(ach)
+        if len(batch) >= 2000:
+            Achievement.objects.bulk_update(batch, ['title_key'])
+            batch = []
+    if batch:
+        Achievement.objects.bulk_update(batch, ['title_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achievements', '0006_achievement_scoring_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='achievement',
+            name='title_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='achievement',
+            index=models.Index(fields=['category', 'scale', 'title_key'], name='achievement_repeat_key_idx'),
+        ),
+        migrations.RunPython(fill_title_key, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achievements', '0007_achievement_title_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AchievementFingerprint',
+            fields=[
+                ('achievement', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fingerprint', serialize=False, to='achievements.achievement')),
+                ('signature', models.BinaryField()),
+                ('similarity', models.FloatField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('near_duplicate_of', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='achievements.achievement')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LSHBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField()),
+                ('bucket', models.BigIntegerField()),
+                ('achievement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='achievements.achievement')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket'], name='lsh_bucket_idx')],
+            },
+        ),
+    ]
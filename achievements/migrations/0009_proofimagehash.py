@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achievements', '0008_near_duplicate_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProofImageHash',
+            fields=[
+                ('achievement', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='proof_hash', serialize=False, to='achievements.achievement')),
+                ('dhash', models.BigIntegerField()),
+                ('chunk0', models.PositiveIntegerField(db_index=True)),
+                ('chunk1', models.PositiveIntegerField(db_index=True)),
+                ('chunk2', models.PositiveIntegerField(db_index=True)),
+                ('chunk3', models.PositiveIntegerField(db_index=True)),
+                ('distance', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('near_duplicate_of', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='achievements.achievement')),
+            ],
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:39
+
+from django.db import migrations, models
+
+
+DEFAULT_RULES = {
+    "Join 2 Debate Tournaments": {
+        "rule_category": "creative",
+        "rule_subcategory": "Debate / MUN / public speaking",
+        "rule_min_count": 2,
+    },
+    "Organize a School Event": {
+        "rule_roles": "organizer,leader",
+        "rule_min_count": 1,
+    },
+    "Complete 10h Volunteering": {
+        "rule_category": "social",
+        "rule_subcategory": "Volunteering projects",
+        "rule_min_count": 1,
+    },
+}
+
+
+def add_default_rules(apps, schema_editor):
+    Quest = apps.get_model('achievements', 'Quest')
+    for title, rules in DEFAULT_RULES.items():
+        Quest.objects.filter(title=title, rule_min_count=0).update(**rules)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achievements', '0009_proofimagehash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quest',
+            name='rule_category',
+            field=models.CharField(blank=True, choices=[('research', 'Научно-исследовательская деятельность'), ('social', 'Социальная и волонтерская активность'), ('creative', 'Творческая деятельность'), ('sports', 'Спортивные достижения'), ('competence', 'Развитие компетенций'), ('other', 'Другое')], db_index=True, max_length=30),
+        ),
+        migrations.AddField(
+            model_name='quest',
+            name='rule_min_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='quest',
+            name='rule_min_duration_months',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='quest',
+            name='rule_min_scale',
+            field=models.CharField(blank=True, choices=[('school', 'School'), ('city', 'City / Region'), ('national', 'National'), ('international', 'International')], max_length=30),
+        ),
+        migrations.AddField(
+            model_name='quest',
+            name='rule_roles',
+            field=models.CharField(blank=True, help_text='Comma-separated role types', max_length=120),
+        ),
+        migrations.AddField(
+            model_name='quest',
+            name='rule_subcategory',
+            field=models.CharField(blank=True, max_length=120),
+        ),
+        migrations.RunPython(add_default_rules, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:40
+
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+
+
+def parse_date_labels(apps, schema_editor):
+    # "March 2026" -> весь месяц
+    Event = apps.get_model('achievements', 'Event')
+    for event in Event.objects.filter(starts_at__isnull=True):
+        try:
+            start = datetime.strptime(event.date.strip(), '%B %Y').replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+        if start.month == 12:
+            end = start.replace(year=start.year + 1, month=1)
+        else:
+            end = start.replace(month=start.month + 1)
+        event.starts_at, event.ends_at = start, end
+        event.save(update_fields=['starts_at', 'ends_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achievements', '0010_quest_rules'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='ends_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='starts_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='category',
+            field=models.CharField(db_index=True, max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='location',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['starts_at', 'id'], name='event_starts_at_id_idx'),
+        ),
+        migrations.RunPython(parse_date_labels, migrations.RunPython.noop),
+    ]
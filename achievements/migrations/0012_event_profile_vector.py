@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achievements', '0011_event_dates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='profile_vector',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_school_name(apps, schema_editor):
+    Achievement = apps.get_model('achievements', 'Achievement')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Achievement.objects.update(
+        school_name=Subquery(User.objects.filter(pk=OuterRef('user_id')).values('school_name')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achievements', '0013_entityversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='achievement',
+            name='reviewed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='achievement',
+            name='reviewed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reviewed_achievements', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='achievement',
+            name='school_name',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='achievement',
+            index=models.Index(fields=['school_name', 'status', 'created_at'], name='achievement_moderation_idx'),
+        ),
+        migrations.RunPython(fill_school_name, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:47
+
+from collections import Counter
+import math
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DateField, Sum
+from django.db.models.functions import TruncMonth
+
+
+def fill_rollups(apps, schema_editor):
+    Achievement = apps.get_model('achievements', 'Achievement')
+    SchoolCategoryMonth = apps.get_model('achievements', 'SchoolCategoryMonth')
+    SchoolGpaBucket = apps.get_model('achievements', 'SchoolGpaBucket')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+
+    rows = (
+        Achievement.objects.filter(status='approved')
+        .exclude(school_name='')
+        .annotate(month=TruncMonth('created_at', output_field=DateField()))
+        .values('school_name', 'category', 'month')
+        .annotate(n=Count('id'), total=Sum('total_points'))
+    )
+    SchoolCategoryMonth.objects.bulk_create([
+        SchoolCategoryMonth(
+            school_name=row['school_name'], category=row['category'], month=row['month'],
+            achievements=row['n'], points=row['total'] or 0,
+        )
+        for row in rows
+    ], batch_size=1000)
+
+    # bucket = floor(gpa), -1 для нулевого GPA
+    histogram = Counter(
+        (school_name, int(math.floor(gpa)) if gpa and gpa > 0 else -1)
+        for school_name, gpa in User.objects.filter(role='student')
+        .exclude(school_name='')
+        .values_list('school_name', 'social_score__social_gpa')
+    )
+    SchoolGpaBucket.objects.bulk_create([
+        SchoolGpaBucket(school_name=school_name, bucket=bucket, students=n)
+        for (school_name, bucket), n in histogram.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achievements', '0014_achievement_moderation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolCategoryMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('school_name', models.CharField(max_length=255)),
+                ('category', models.CharField(max_length=30)),
+                ('month', models.DateField()),
+                ('achievements', models.IntegerField(default=0)),
+                ('points', models.FloatField(default=0)),
+            ],
+            options={
+                'unique_together': {('school_name', 'category', 'month')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SchoolGpaBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('school_name', models.CharField(max_length=255)),
+                ('bucket', models.IntegerField()),
+                ('students', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('school_name', 'bucket')},
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
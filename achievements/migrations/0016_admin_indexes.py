@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achievements', '0015_school_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='achievement',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending Review'), ('approved', 'Approved'), ('rejected', 'Rejected')], db_index=True, default='pending', max_length=20),
+        ),
+    ]
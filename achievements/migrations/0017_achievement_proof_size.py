@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:59
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+
+
+def fill_proof_sizes(apps, schema_editor):
+    Achievement = apps.get_model('achievements', 'Achievement')
+    User = apps.get_model('accounts', 'User')
+    batch = []
+    for ach in Achievement.objects.exclude(proof_file='').exclude(proof_file__isnull=True).only(
+        'id', 'proof_file'
+    ).iterator(chunk_size=2000):
+        try:
+            ach.proof_size = default_storage.size(ach.proof_file.name)
+        except OSError:
+            continue
+        batch.append(ach)
+        if len(batch) >= 2000:
+            Achievement.objects.bulk_update(batch, ['proof_size'])
+            batch = []
+    if batch:
+        Achievement.objects.bulk_update(batch, ['proof_size'])
+
+    used = (
+        Achievement.objects.filter(user=OuterRef('pk'))
+        .values('user')
+        .annotate(total=Sum('proof_size'))
+        .values('total')
+    )
+    User.objects.filter(achievements__proof_size__gt=0).distinct().update(storage_used=Subquery(used))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achievements', '0016_admin_indexes'),
+        ('accounts', '0004_storage_used'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='achievement',
+            name='proof_size',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_proof_sizes, migrations.RunPython.noop),
+    ]
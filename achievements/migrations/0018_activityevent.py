@@ -0,0 +1,72 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:03
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_activity(apps, schema_editor):
+    # Существующие одобренные ачивки, закрытые квесты и покупки - по времени события
+    ActivityEvent = apps.get_model('achievements', 'ActivityEvent')
+    Achievement = apps.get_model('achievements', 'Achievement')
+    QuestCompletion = apps.get_model('achievements', 'QuestCompletion')
+    UserPurchase = apps.get_model('achievements', 'UserPurchase')
+
+    def rows():
+        for ach in Achievement.objects.filter(status='approved').exclude(school_name='').iterator(chunk_size=2000):
+            yield ActivityEvent(
+                school_name=ach.school_name, user_id=ach.user_id, kind='achievement',
+                title=ach.title[:255], amount=ach.total_points,
+                created_at=ach.reviewed_at or ach.created_at,
+            )
+        for qc in QuestCompletion.objects.select_related('user', 'quest').exclude(user__school_name='').iterator(
+            chunk_size=2000
+        ):
+            yield ActivityEvent(
+                school_name=qc.user.school_name, user_id=qc.user_id, kind='quest',
+                title=qc.quest.title[:255], amount=qc.quest.reward_coins, created_at=qc.completed_at,
+            )
+        for purchase in UserPurchase.objects.select_related('user', 'item').exclude(user__school_name='').iterator(
+            chunk_size=2000
+        ):
+            yield ActivityEvent(
+                school_name=purchase.user.school_name, user_id=purchase.user_id, kind='purchase',
+                title=purchase.item.name[:255], amount=purchase.item.price, created_at=purchase.created_at,
+            )
+
+    batch = []
+    for event in rows():
+        batch.append(event)
+        if len(batch) >= 2000:
+            ActivityEvent.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        ActivityEvent.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achievements', '0017_achievement_proof_size'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('school_name', models.CharField(max_length=255)),
+                ('kind', models.CharField(choices=[('achievement', 'Achievement approved'), ('quest', 'Quest completed'), ('purchase', 'Reward purchased')], max_length=20)),
+                ('title', models.CharField(max_length=255)),
+                ('amount', models.FloatField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['school_name', 'created_at', 'id'], name='activity_feed_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_activity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('achievements', '0018_activityevent'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='proofimagehash',
+            name='chunk0',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='proofimagehash',
+            name='chunk1',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='proofimagehash',
+            name='chunk2',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='proofimagehash',
+            name='chunk3',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='proofimagehash',
+            name='dhash',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -1,5 +1,15 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+
+from .weights import get_weights
+
+
+def normalize_title(title):
+    # Ключ для поиска повторов: только буквы/цифры, первые 6 слов
+    title = (title or "").lower()
+    norm = ''.join(ch if (ch.isalnum() or ch.isspace()) else ' ' for ch in title)
+    return ' '.join(norm.split()[:6])
 
 
 class Achievement(models.Model):
@@ -39,6 +49,7 @@ class Achievement(models.Model):
     )
 
     title = models.CharField(max_length=255)
+    title_key = models.CharField(max_length=255, blank=True, db_index=True, editable=False)
 
 
     category = models.CharField(
@@ -73,59 +84,64 @@ class Achievement(models.Model):
         blank=True,
         null=True
     )
+    # размер proof_file в байтах - из него ведётся User.storage_used
+    proof_size = models.PositiveIntegerField(default=0, editable=False)
 
     status = models.CharField(
         max_length=20,
         choices=STATUS_CHOICES,
-        default='pending'
+        default='pending',
+        db_index=True
     )
 
     ai_raw_response = models.JSONField(blank=True, null=True)
     total_points = models.FloatField(default=0)
+    # версия таблиц весов (scoring_weights.json), которой посчитан total_points
+    scoring_version = models.PositiveSmallIntegerField(default=0, db_index=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
-    def __str__(self):
-        return f"{self.title} - {self.user}"
-
-    def calculate_points(self):
-        base_by_category = {
-            'research': 9,
-            'social': 7,
-            'creative': 6,
-            'sports': 6,
-            'competence': 8,
-            'other': 4,
-        }
-
-        scale_mult = {
-            'school': 1.0,
-            'city': 1.1,
-            'national': 1.3,
-            'international': 1.6,
-        }
-
-        role_mult = {
-            'participant': 1.0,
-            'winner': 1.4,
-            'organizer': 1.3,
-            'leader': 1.6,
-        }
-
+    # школа ученика на момент подачи - по ней строится очередь модерации
+    school_name = models.CharField(max_length=255, blank=True, editable=False)
+    reviewed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reviewed_achievements'
+    )
+    reviewed_at = models.DateTimeField(null=True, blank=True)
 
-        duration_mult = 1.0 + min(self.duration_months, 12) / 24
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'scale', 'title_key'], name='achievement_repeat_key_idx'),
+            models.Index(fields=['school_name', 'status', 'created_at'], name='achievement_moderation_idx'),
+        ]
 
-        verified_mult = 1.0
-        if self.status == 'approved':
-            verified_mult = 1.2
-        elif self.status == 'rejected':
-            verified_mult = 0.0
+    def __str__(self):
+        return f"{self.title} - {self.user}"
 
-        base = base_by_category.get(self.category, 4)
-        points = base * scale_mult.get(self.scale, 1.0) * role_mult.get(self.role_type, 1.0)
-        points *= duration_mult * verified_mult
+    def save(self, *args, **kwargs):
+        self.title_key = normalize_title(self.title)
+        if not self.school_name and self.user_id:
+            self.school_name = self.user.school_name
+        if not self.proof_file:
+            self.proof_size = 0
+        elif not self.proof_file._committed:
+            self.proof_size = self.proof_file.size
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'title' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'title_key'}
+        if update_fields is not None and 'proof_file' in update_fields:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'proof_size'}
+        super().save(*args, **kwargs)
 
-        return round(points, 2)
+    def calculate_points(self):
+        weights = get_weights()
+        self.scoring_version = weights.version
+        return weights.achievement_points(
+            self.category, self.scale, self.role_type, self.duration_months, self.status
+        )
 
 
 class ShopItem(models.Model):
@@ -156,9 +172,30 @@ class Quest(models.Model):
     description = models.TextField()
     reward_coins = models.PositiveIntegerField(default=100)
 
+    # Правило автозачёта: нужно rule_min_count одобренных ачивок, подходящих под фильтры.
+    # Пустой фильтр = любое значение; rule_min_count = 0 - квест без автопроверки.
+    rule_category = models.CharField(
+        max_length=30,
+        choices=Achievement.CATEGORY_CHOICES,
+        blank=True,
+        db_index=True
+    )
+    rule_subcategory = models.CharField(max_length=120, blank=True)
+    rule_roles = models.CharField(max_length=120, blank=True, help_text="Comma-separated role types")
+    rule_min_scale = models.CharField(max_length=30, choices=Achievement.SCALE_CHOICES, blank=True)
+    rule_min_duration_months = models.PositiveIntegerField(default=0)
+    rule_min_count = models.PositiveIntegerField(default=0)
+
     def __str__(self):
         return self.title
 
+    @property
+    def is_automatic(self):
+        return self.rule_min_count > 0
+
+    def role_list(self):
+        return [r.strip() for r in self.rule_roles.split(',') if r.strip()]
+
 
 class QuestCompletion(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -175,11 +212,189 @@ class QuestCompletion(models.Model):
 class Event(models.Model):
     title = models.CharField(max_length=255)
     organizer = models.CharField(max_length=255)
-    category = models.CharField(max_length=50)
-    date = models.CharField(max_length=50)
-    location = models.CharField(max_length=255)
+    category = models.CharField(max_length=50, db_index=True)
+    date = models.CharField(max_length=50)  # подпись для карточки, напр. "March 2026"
+    starts_at = models.DateTimeField(null=True, blank=True)
+    ends_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    location = models.CharField(max_length=255, db_index=True)
     link = models.CharField(max_length=255, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # {"category": {cat: weight}, "scale": scale} - см. recommendations.event_vector
+    profile_vector = models.JSONField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # keyset-пагинация по (starts_at, id)
+            models.Index(fields=['starts_at', 'id'], name='event_starts_at_id_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+
+
+class UserScore(models.Model):
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='social_score'
+    )
+    raw_score = models.FloatField(default=0)
+    social_gpa = models.FloatField(default=0)
+    computed_at = models.DateTimeField(null=True, blank=True)
+    # null = результат не меняется со временем, пока не поменяются ачивки
+    next_refresh_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.user}: {self.social_gpa}"
+
+    def is_due(self, now):
+        return self.computed_at is None or (self.next_refresh_at is not None and self.next_refresh_at <= now)
+
+
+class ScoreSnapshot(models.Model):
+    # Одна строка на день и только если GPA поменялся: значение действует до следующей строки
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='score_snapshots'
+    )
+    day = models.DateField()
+    raw_score = models.FloatField(default=0)
+    social_gpa = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'day')
+        ordering = ['day']
+
+    def __str__(self):
+        return f"{self.user} {self.day}: {self.social_gpa}"
+
+
+class AchievementFingerprint(models.Model):
+    achievement = models.OneToOneField(
+        Achievement,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='fingerprint'
+    )
+    signature = models.BinaryField()  # MinHash, uint32 x NUM_HASHES (см. dedup.py)
+    near_duplicate_of = models.ForeignKey(
+        Achievement,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    similarity = models.FloatField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Fingerprint of {self.achievement_id}"
+
+
+class LSHBucket(models.Model):
+    achievement = models.ForeignKey(
+        Achievement,
+        on_delete=models.CASCADE,
+        related_name='lsh_buckets'
+    )
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['bucket'], name='lsh_bucket_idx'),
+        ]
+
+
+class ProofImageHash(models.Model):
+    achievement = models.OneToOneField(
+        Achievement,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='proof_hash'
+    )
+    # 64 бита, хранится со знаком; NULL - пруф обработан, но это не картинка (PDF, битый файл)
+    dhash = models.BigIntegerField(null=True, blank=True)
+    # куски по 16 бит для multi-index поиска по расстоянию Хэмминга (см. proof_hashes.py)
+    chunk0 = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    chunk1 = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    chunk2 = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    chunk3 = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    near_duplicate_of = models.ForeignKey(
+        Achievement,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    distance = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Proof hash of {self.achievement_id}"
+
+
+class EntityVersion(models.Model):
+    # Счётчики версий для ETag/304: "user:<id>", "leaderboard", "events", "shop", "quests",
+    # "activity:<хэш школы>"
+    key = models.CharField(max_length=64, unique=True)
+    version = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key}@{self.version}"
+
+
+class SchoolCategoryMonth(models.Model):
+    # Роллап одобренных ачивок: школа x категория x месяц подачи
+    school_name = models.CharField(max_length=255)
+    category = models.CharField(max_length=30)
+    month = models.DateField()
+    achievements = models.IntegerField(default=0)
+    points = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ('school_name', 'category', 'month')
+
+    def __str__(self):
+        return f"{self.school_name} {self.category} {self.month:%Y-%m}: {self.achievements}"
+
+
+class SchoolGpaBucket(models.Model):
+    # Гистограмма Social GPA учеников школы: bucket = floor(gpa / GPA_BUCKET_WIDTH)
+    school_name = models.CharField(max_length=255)
+    bucket = models.IntegerField()
+    students = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('school_name', 'bucket')
+
+    def __str__(self):
+        return f"{self.school_name} #{self.bucket}: {self.students}"
+
+
+class ActivityEvent(models.Model):
+    # Лента школы, append-only: пишется при одобрении ачивки, закрытии квеста и покупке.
+    # Заголовок и очки копируются на момент события - чтение ленты не джойнит исходные таблицы.
+    KIND_CHOICES = [
+        ('achievement', 'Achievement approved'),
+        ('quest', 'Quest completed'),
+        ('purchase', 'Reward purchased'),
+    ]
+
+    school_name = models.CharField(max_length=255)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='activity')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    title = models.CharField(max_length=255)
+    # очки ачивки / награда квеста / цена покупки
+    amount = models.FloatField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['school_name', 'created_at', 'id'], name='activity_feed_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.school_name}: {self.user_id} {self.kind} {self.title}"
@@ -0,0 +1,94 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, When
+from django.utils import timezone
+
+from accounts.models import User
+from .activity import record_achievements
+from .models import Achievement
+from .quests import award_quests_for_user
+from .rollups import achievement_contribution, apply_achievement_changes
+from .scoring import refresh_user_score, social_gpa_details_bulk
+from .versions import bump, user_key
+
+
+# ---------- Очередь модерации учителя / школьного админа ----------
+
+REVIEWER_ROLES = ('teacher', 'school_admin')
+DECISIONS = ('approved', 'rejected')
+
+
+def can_moderate(user):
+    return user.is_authenticated and user.role in REVIEWER_ROLES and bool(user.school_name)
+
+
+def achievement_coins(achievement):
+    # Те же монеты, что начисляются при автоодобрении в add_achievement_view
+    ai_result = achievement.ai_raw_response or {}
+    return int(max(ai_result.get('total_score', achievement.total_points), 10))
+
+
+def moderation_queue(reviewer, status='pending'):
+    # Идёт по индексу (school_name, status, created_at); свои ачивки учитель не видит - решать по ним нельзя
+    return (
+        Achievement.objects.filter(school_name=reviewer.school_name, status=status)
+        .exclude(user=reviewer)
+        .select_related('user')
+        .defer('ai_raw_response')
+        .order_by('created_at', 'id')
+    )
+
+
+def moderate(reviewer, achievement_ids, decision, now=None):
+    # Учитель решает только по своей школе и не по своим ачивкам
+    return apply_decision(
+        Achievement.objects.filter(id__in=achievement_ids, school_name=reviewer.school_name).exclude(user=reviewer),
+        decision,
+        reviewer,
+        now=now,
+    )
+
+
+def apply_decision(queryset, decision, reviewer=None, now=None):
+    # Решение по пачке ачивок: bulk_update статусов/очков, одно UPDATE на монеты,
+    # пересчёт GPA всех затронутых пользователей одним запросом.
+    if decision not in DECISIONS:
+        raise ValueError(f"Unknown decision: {decision}")
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        achievements = list(queryset.select_for_update().filter(status='pending'))
+        if not achievements:
+            return []
+
+        by_user = defaultdict(list)
+        for ach in achievements:
+            ach.status = decision
+            ach.total_points = ach.calculate_points()
+            ach.reviewed_by = reviewer
+            ach.reviewed_at = now
+            by_user[ach.user_id].append(ach)
+        Achievement.objects.bulk_update(
+            achievements, ['status', 'total_points', 'scoring_version', 'reviewed_by', 'reviewed_at']
+        )
+        apply_achievement_changes([(None, achievement_contribution(a)) for a in achievements])
+
+        user_ids = list(by_user)
+        users = User.objects.in_bulk(user_ids)
+        if decision == 'approved':
+            coins = {user_id: sum(achievement_coins(a) for a in items) for user_id, items in by_user.items()}
+            User.objects.filter(pk__in=user_ids).update(
+                soc_coins=F('soc_coins') + Case(*[When(pk=user_id, then=n) for user_id, n in coins.items()])
+            )
+            for user_id, items in by_user.items():
+                award_quests_for_user(users[user_id], items)
+            record_achievements(achievements, users)
+
+        # bulk_update не шлёт сигналы: роллапы, GPA и версии обновляем сами
+        details = social_gpa_details_bulk(user_ids, now=now)
+        for user_id in user_ids:
+            refresh_user_score(users[user_id], now=now, details=details[user_id])
+        bump('leaderboard', *[user_key(user_id) for user_id in user_ids])
+
+    return achievements
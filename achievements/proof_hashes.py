@@ -0,0 +1,130 @@
+from itertools import combinations
+
+from django.db.models import Q
+
+from .models import ProofImageHash
+
+
+# ---------- Перцептивный хэш сертификатов ----------
+# dHash 64 бита: пережимание, ресайз и небольшая обрезка меняют лишь несколько бит.
+# Multi-index hashing: хэш режется на 4 куска по 16 бит, каждый в своей индексированной
+# колонке. Если расстояние <= k, то хотя бы один кусок отличается не больше чем на k // 4
+# бит (принцип Дирихле) - кандидатов берём точным IN по соседям кусков, потом считаем popcount.
+
+HASH_SIZE = 8
+CHUNKS = 4
+CHUNK_BITS = 64 // CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+MATCH_DISTANCE = 6
+# Больше пикселей не декодируем: 1-битный PNG 20000x20000 весит десятки КБ,
+# проходит лимиты загрузки, а convert() развернул бы его в сотни МБ
+MAX_PIXELS = 40_000_000
+
+
+def dhash(file_obj):
+    # Pillow грузим при первой загрузке пруфа, а не при старте воркера
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        image = Image.open(file_obj)
+        image.draft("L", (HASH_SIZE * 4, HASH_SIZE * 4))  # JPEG: декодируем сразу в малом размере
+        if image.size[0] * image.size[1] > MAX_PIXELS:
+            return None
+        image = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+        return None
+
+    pixels = list(image.getdata())
+    value = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            left = pixels[row * (HASH_SIZE + 1) + col]
+            right = pixels[row * (HASH_SIZE + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def split_chunks(value):
+    return [(value >> (CHUNK_BITS * i)) & CHUNK_MASK for i in range(CHUNKS)]
+
+
+def to_signed(value):
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def _chunk_neighbors(chunk, radius):
+    values = [chunk]
+    for r in range(1, radius + 1):
+        for bits in combinations(range(CHUNK_BITS), r):
+            flipped = chunk
+            for bit in bits:
+                flipped ^= 1 << bit
+            values.append(flipped)
+    return values
+
+
+def find_similar_proofs(value, max_distance=MATCH_DISTANCE, exclude_user_id=None, before_id=None, limit=50):
+    radius = max_distance // CHUNKS
+    query = Q()
+    for i, chunk in enumerate(split_chunks(value)):
+        query |= Q(**{f"chunk{i}__in": _chunk_neighbors(chunk, radius)})
+
+    candidates = ProofImageHash.objects.filter(query)
+    if exclude_user_id is not None:
+        candidates = candidates.exclude(achievement__user_id=exclude_user_id)
+    if before_id is not None:
+        candidates = candidates.filter(achievement_id__lt=before_id)
+
+    matches = []
+    for achievement_id, stored in candidates.values_list('achievement_id', 'dhash'):
+        distance = hamming(value, to_unsigned(stored))
+        if distance <= max_distance:
+            matches.append((distance, achievement_id))
+    matches.sort()
+    return matches[:limit]
+
+
+def build_proof_hash(achievement, value, matches):
+    # value=None - отметка "обработан, не картинка": бэкфилл не декодирует такой файл снова
+    proof_hash = ProofImageHash(achievement=achievement, dhash=None if value is None else to_signed(value))
+    if value is not None:
+        for i, chunk in enumerate(split_chunks(value)):
+            setattr(proof_hash, f"chunk{i}", chunk)
+    if matches:
+        proof_hash.distance, proof_hash.near_duplicate_of_id = matches[0]
+    return proof_hash
+
+
+def read_proof_hash(achievement):
+    # -> (обработан ли файл, dhash или None). Недоступное хранилище - не обработан, попробуем позже;
+    # отсутствующий файл и не-картинка - обработан, без хэша
+    try:
+        with achievement.proof_file.open("rb") as f:
+            return True, dhash(f)
+    except FileNotFoundError:
+        return True, None
+    except OSError:
+        return False, None
+
+
+def index_proof_image(achievement):
+    # Сверить сертификат с чужими и добавить в индекс. None - не картинка (PDF и т.п.)
+    if not achievement.proof_file:
+        return None
+    processed, value = read_proof_hash(achievement)
+    if not processed:
+        return None
+
+    matches = find_similar_proofs(value, exclude_user_id=achievement.user_id) if value is not None else []
+    proof_hash = build_proof_hash(achievement, value, matches)
+    ProofImageHash.objects.filter(achievement=achievement).delete()
+    proof_hash.save()
+    return proof_hash if value is not None else None
@@ -0,0 +1,91 @@
+from django.db.models import F, Q
+
+from accounts.models import User
+from .activity import record_quests
+from .models import Achievement, Quest, QuestCompletion
+from .versions import bump, user_key
+
+
+# ---------- Автозачёт квестов по правилам ----------
+
+SCALE_ORDER = [key for key, _ in Achievement.SCALE_CHOICES]
+
+
+def achievement_matches(quest, achievement):
+    if quest.rule_category and achievement.category != quest.rule_category:
+        return False
+    if quest.rule_subcategory and achievement.subcategory != quest.rule_subcategory:
+        return False
+    roles = quest.role_list()
+    if roles and achievement.role_type not in roles:
+        return False
+    if quest.rule_min_scale and achievement.scale not in SCALE_ORDER[SCALE_ORDER.index(quest.rule_min_scale):]:
+        return False
+    if (achievement.duration_months or 0) < quest.rule_min_duration_months:
+        return False
+    return True
+
+
+def matching_achievements(quest, user):
+    qs = user.achievements.filter(status='approved', duration_months__gte=quest.rule_min_duration_months)
+    if quest.rule_category:
+        qs = qs.filter(category=quest.rule_category)
+    if quest.rule_subcategory:
+        qs = qs.filter(subcategory=quest.rule_subcategory)
+    if quest.role_list():
+        qs = qs.filter(role_type__in=quest.role_list())
+    if quest.rule_min_scale:
+        qs = qs.filter(scale__in=SCALE_ORDER[SCALE_ORDER.index(quest.rule_min_scale):])
+    return qs
+
+
+def quest_progress(quest, user):
+    return matching_achievements(quest, user).count()
+
+
+def candidate_quests(user_id, categories):
+    # Правила проиндексированы по категории: берём только квесты этих категорий и
+    # квесты без фильтра по категории, которые пользователь ещё не закрыл.
+    return (
+        Quest.objects.filter(rule_min_count__gt=0)
+        .filter(Q(rule_category='') | Q(rule_category__in=categories))
+        .exclude(questcompletion__user_id=user_id)
+    )
+
+
+def complete_quests(user, quests):
+    # Вызывать внутри transaction.atomic() вместе с сохранением ачивки.
+    # Строка пользователя блокируется: параллельный запрос на тот же квест ждёт и видит
+    # уже созданный QuestCompletion - монеты и событие в ленте только за новые.
+    if not quests:
+        return []
+    User.objects.select_for_update().filter(pk=user.pk).values_list('pk', flat=True).first()
+    done = set(
+        QuestCompletion.objects.filter(user_id=user.pk, quest__in=quests).values_list('quest_id', flat=True)
+    )
+    quests = [quest for quest in {quest.pk: quest for quest in quests}.values() if quest.pk not in done]
+    if not quests:
+        return []
+    QuestCompletion.objects.bulk_create([QuestCompletion(user_id=user.pk, quest=quest) for quest in quests])
+    reward = sum(quest.reward_coins for quest in quests)
+    User.objects.filter(pk=user.pk).update(soc_coins=F('soc_coins') + reward)
+    bump(user_key(user.pk), 'leaderboard')
+    record_quests(user, quests)
+    return quests
+
+
+def award_quests_for_user(user, achievements):
+    # achievements - только что одобренные ачивки одного пользователя
+    approved = [a for a in achievements if a.status == 'approved']
+    if not approved:
+        return []
+    earned = [
+        quest for quest in candidate_quests(user.pk, {a.category for a in approved})
+        if any(achievement_matches(quest, a) for a in approved)
+        and quest_progress(quest, user) >= quest.rule_min_count
+    ]
+    return complete_quests(user, earned)
+
+
+def award_quests_for_achievement(achievement):
+    return award_quests_for_user(achievement.user, [achievement])
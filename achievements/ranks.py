@@ -0,0 +1,163 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from sortedcontainers import SortedList
+
+
+# ---------- Индекс рангов в памяти процесса ----------
+# Отсортированные списки (-gpa, user_id) по всем ученикам и по каждой школе:
+# ранг / перцентиль / соседи и обновление - O(log n). Загружается при первом обращении,
+# в своём процессе обновляется сигналами, чужие изменения подтягивает фоновая сверка с БД.
+
+class RankIndex:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.users = {}  # user_id -> (school_name, social_gpa)
+        self.everyone = SortedList()
+        self.schools = {}
+        self.loaded_at = None
+
+    def load(self, rows):
+        # rows: (user_id, school_name, social_gpa)
+        users = {user_id: (school_name or '', gpa or 0.0) for user_id, school_name, gpa in rows}
+        everyone = SortedList((-gpa, user_id) for user_id, (_, gpa) in users.items())
+        schools = {}
+        for key in everyone:
+            schools.setdefault(users[key[1]][0], SortedList()).add(key)
+        with self.lock:
+            self.users, self.everyone, self.schools = users, everyone, schools
+            self.loaded_at = time.monotonic()
+
+    def _discard(self, user_id):
+        current = self.users.pop(user_id, None)
+        if current is None:
+            return
+        school_name, gpa = current
+        key = (-gpa, user_id)
+        self.everyone.discard(key)
+        school = self.schools.get(school_name)
+        if school is not None:
+            school.discard(key)
+            if not school:
+                del self.schools[school_name]
+
+    def update(self, user_id, school_name, social_gpa):
+        with self.lock:
+            self._discard(user_id)
+            school_name, social_gpa = school_name or '', social_gpa or 0.0
+            self.users[user_id] = (school_name, social_gpa)
+            self.everyone.add((-social_gpa, user_id))
+            self.schools.setdefault(school_name, SortedList()).add((-social_gpa, user_id))
+
+    def remove(self, user_id):
+        with self.lock:
+            self._discard(user_id)
+
+    def _keys(self, user_id, school):
+        if school:
+            return self.schools.get(self.users[user_id][0], SortedList())
+        return self.everyone
+
+    def rank(self, user_id, school=False):
+        # 1-based; при равном GPA одинаковый ранг
+        with self.lock:
+            if user_id not in self.users:
+                return None
+            gpa = self.users[user_id][1]
+            return self._keys(user_id, school).bisect_left((-gpa, 0)) + 1
+
+    def size(self, user_id=None, school=False):
+        with self.lock:
+            if school:
+                return len(self._keys(user_id, True)) if user_id in self.users else 0
+            return len(self.everyone)
+
+    def percentile(self, user_id, school=False):
+        # Доля учеников с GPA не выше, чем у пользователя
+        rank, total = self.rank(user_id, school), self.size(user_id, school)
+        if not rank or not total:
+            return None
+        return round(100 * (total - rank + 1) / total)
+
+    def neighbours(self, user_id, school=False, k=2):
+        with self.lock:
+            if user_id not in self.users:
+                return []
+            keys = self._keys(user_id, school)
+            pos = keys.bisect_left((-self.users[user_id][1], user_id))
+            return [
+                (keys.bisect_left((neg_gpa, 0)) + 1, other_id, -neg_gpa)
+                for neg_gpa, other_id in keys.islice(max(0, pos - k), pos + k + 1)
+            ]
+
+
+_index = RankIndex()
+_load_lock = threading.Lock()
+
+
+def load_rows():
+    from accounts.models import User
+
+    return (
+        User.objects.filter(role='student')
+        .values_list('id', 'school_name', 'social_score__social_gpa')
+        .iterator(chunk_size=5000)
+    )
+
+
+def _reconcile():
+    try:
+        _index.load(load_rows())
+    finally:
+        # у потока своё соединение - не оставляем его висеть
+        connection.close()
+        _load_lock.release()
+
+
+def get_rank_index():
+    # Первое обращение - загрузка (без индекса отвечать нечем). Дальше сверка с БД раз в
+    # RANK_INDEX_RECONCILE_SECONDS идёт в фоновом потоке, запрос отвечает по текущему индексу.
+    loaded_at = _index.loaded_at
+    if loaded_at is None:
+        with _load_lock:
+            if _index.loaded_at is None:
+                _index.load(load_rows())
+    elif time.monotonic() - loaded_at > settings.RANK_INDEX_RECONCILE_SECONDS:
+        if _load_lock.acquire(blocking=False):
+            if _index.loaded_at == loaded_at:
+                threading.Thread(target=_reconcile, name="rank-index-reconcile", daemon=True).start()
+            else:
+                _load_lock.release()
+    return _index
+
+
+def track_score(user, social_gpa):
+    # Вызывается при смене GPA, школы или роли; незагруженный индекс всё равно прочитает БД при загрузке
+    if _index.loaded_at is None:
+        return
+    if user.role == 'student':
+        _index.update(user.pk, user.school_name, social_gpa)
+    else:
+        _index.remove(user.pk)
+
+
+def forget_user(user_id):
+    if _index.loaded_at is not None:
+        _index.remove(user_id)
+
+
+def rank_summary(user_id, k=2):
+    index = get_rank_index()
+    if index.rank(user_id) is None:
+        return None
+    return {
+        'rank': index.rank(user_id),
+        'total': index.size(),
+        'percentile': index.percentile(user_id),
+        'school_rank': index.rank(user_id, school=True),
+        'school_total': index.size(user_id, school=True),
+        'school_percentile': index.percentile(user_id, school=True),
+        'neighbours': index.neighbours(user_id, school=True, k=k),
+    }
@@ -0,0 +1,83 @@
+from django.core.cache import cache
+from django.db.models import Count
+
+from .events import catalog_etag, upcoming_events
+from .models import Event
+from .utils import CATEGORY_KEYWORDS, SCALE_KEYWORDS
+
+
+# ---------- Персональные рекомендации мероприятий по "дырам" в профиле ----------
+
+CORE_CATEGORIES = [cat for cat, _ in CATEGORY_KEYWORDS]
+SCALE_ORDER = ['school', 'city', 'national', 'international']
+TOP_K = 3
+CACHE_TIMEOUT = 60 * 60
+
+
+def event_vector(event):
+    text = f"{event.title} {event.category} {event.organizer} {event.location}".lower()
+    matched = [cat for cat, words in CATEGORY_KEYWORDS if any(w in text for w in words)]
+    scale = next((sc for sc, words in SCALE_KEYWORDS if any(w in text for w in words)), 'school')
+    return {
+        "category": {cat: 1.0 / len(matched) for cat in matched},
+        "scale": scale,
+    }
+
+
+def ensure_event_vectors():
+    # bulk_create и старые строки идут без вектора - досчитываем один раз
+    missing = list(Event.objects.filter(profile_vector__isnull=True))
+    for event in missing:
+        event.profile_vector = event_vector(event)
+    if missing:
+        Event.objects.bulk_update(missing, ['profile_vector'])
+
+
+def user_gap_vector(user):
+    rows = (
+        user.achievements.filter(status='approved')
+        .values('category', 'scale')
+        .annotate(n=Count('id'))
+    )
+    counts = {cat: 0 for cat in CORE_CATEGORIES}
+    best_scale = 0
+    for row in rows:
+        if row['category'] in counts:
+            counts[row['category']] += row['n']
+        if row['scale'] in SCALE_ORDER:
+            best_scale = max(best_scale, SCALE_ORDER.index(row['scale']))
+
+    # нет ачивок в категории -> 1.0, чем больше - тем меньше дыра
+    gaps = {cat: 1.0 / (1 + n) for cat, n in counts.items()}
+    return gaps, best_scale
+
+
+def score_event(vector, gaps, best_scale):
+    score = sum(weight * gaps.get(cat, 0.0) for cat, weight in vector["category"].items())
+    # чуть выше текущего уровня ученика - следующий шаг
+    if SCALE_ORDER.index(vector["scale"]) > best_scale:
+        score += 0.25
+    return score
+
+
+def recommend_events(user, profile_version, request=None, k=TOP_K):
+    # profile_version меняется при любом изменении ачивок пользователя, catalog_etag -
+    # при изменении каталога: ключ сам устаревает, явная инвалидация не нужна
+    key = f"event-recs:{user.id}:{profile_version}:{catalog_etag(request)}"
+    ranked = cache.get(key)
+    if ranked is None:
+        ensure_event_vectors()
+        gaps, best_scale = user_gap_vector(user)
+        candidates = []
+        for event_id, vector in upcoming_events().values_list('id', 'profile_vector'):
+            score = score_event(vector, gaps, best_scale)
+            if score > 0:
+                candidates.append((score, event_id))
+        candidates.sort(key=lambda item: (-item[0], item[1]))
+        ranked = [event_id for _, event_id in candidates[:k]]
+        cache.set(key, ranked, CACHE_TIMEOUT)
+
+    if not ranked:
+        return []
+    by_id = Event.objects.in_bulk(ranked)
+    return [by_id[event_id] for event_id in ranked if event_id in by_id]
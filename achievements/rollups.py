@@ -0,0 +1,201 @@
+from collections import Counter, defaultdict
+import math
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Achievement, SchoolCategoryMonth, SchoolGpaBucket, UserScore
+
+
+# ---------- Роллапы для аналитики школы ----------
+# Обновляются инкрементально (сигналы, модерация, пересчёт очков);
+# rebuild_school_rollups() пересобирает всё с нуля и служит сверкой.
+
+GPA_BUCKET_WIDTH = 1.0
+ZERO_BUCKET = -1  # ученики без единого балла - отдельно, для доли участия
+PERCENTILES = (25, 50, 75, 90)
+
+
+def month_of(value):
+    return timezone.localdate(value).replace(day=1)
+
+
+def months_back(month, n):
+    # первое число месяца на n месяцев раньше: (2026-10-01, 11) -> 2025-11-01
+    index = month.year * 12 + month.month - 1 - n
+    return month.replace(year=index // 12, month=index % 12 + 1, day=1)
+
+
+def gpa_bucket(social_gpa):
+    if not social_gpa or social_gpa <= 0:
+        return ZERO_BUCKET
+    return int(math.floor(social_gpa / GPA_BUCKET_WIDTH))
+
+
+def _add(model, deltas, **keys):
+    updated = model.objects.filter(**keys).update(**{field: F(field) + d for field, d in deltas.items()})
+    if not updated:
+        try:
+            with transaction.atomic():
+                model.objects.create(**keys, **deltas)
+        except IntegrityError:
+            model.objects.filter(**keys).update(**{field: F(field) + d for field, d in deltas.items()})
+
+
+def achievement_contribution(ach):
+    # (school_name, category, month), points - или None, если в роллап не входит
+    if ach is None or ach.status != 'approved' or not ach.school_name or ach.created_at is None:
+        return None
+    return (ach.school_name, ach.category, month_of(ach.created_at)), ach.total_points or 0
+
+
+def apply_achievement_changes(changes):
+    # changes: [(вклад до, вклад после)], дельты схлопываются по ключу
+    deltas = defaultdict(lambda: [0, 0.0])
+    for before, after in changes:
+        if before == after:
+            continue
+        if before:
+            deltas[before[0]][0] -= 1
+            deltas[before[0]][1] -= before[1]
+        if after:
+            deltas[after[0]][0] += 1
+            deltas[after[0]][1] += after[1]
+
+    for (school_name, category, month), (count, points) in deltas.items():
+        if count or points:
+            _add(
+                SchoolCategoryMonth,
+                {'achievements': count, 'points': points},
+                school_name=school_name, category=category, month=month,
+            )
+
+
+def counts_in_histogram(user):
+    return user.role == 'student' and bool(user.school_name)
+
+
+def move_student_gpa(user, previous_gpa, social_gpa):
+    # previous_gpa=None - ученика ещё нет в гистограмме
+    if not counts_in_histogram(user):
+        return
+    old_bucket = None if previous_gpa is None else gpa_bucket(previous_gpa)
+    new_bucket = None if social_gpa is None else gpa_bucket(social_gpa)
+    if old_bucket == new_bucket:
+        return
+    if old_bucket is not None:
+        _add(SchoolGpaBucket, {'students': -1}, school_name=user.school_name, bucket=old_bucket)
+    if new_bucket is not None:
+        _add(SchoolGpaBucket, {'students': 1}, school_name=user.school_name, bucket=new_bucket)
+
+
+def rebuild_school_rollups():
+    from accounts.models import User
+
+    with transaction.atomic():
+        SchoolCategoryMonth.objects.all().delete()
+        rows = (
+            Achievement.objects.filter(status='approved')
+            .exclude(school_name='')
+            .annotate(month=TruncMonth('created_at', output_field=DateField()))
+            .values('school_name', 'category', 'month')
+            .annotate(n=Count('id'), total=Sum('total_points'))
+        )
+        SchoolCategoryMonth.objects.bulk_create([
+            SchoolCategoryMonth(
+                school_name=row['school_name'], category=row['category'], month=row['month'],
+                achievements=row['n'], points=row['total'] or 0,
+            )
+            for row in rows
+        ], batch_size=1000)
+
+        SchoolGpaBucket.objects.all().delete()
+        histogram = Counter(
+            (school_name, gpa_bucket(social_gpa))
+            for school_name, social_gpa in User.objects.filter(role='student')
+            .exclude(school_name='')
+            .values_list('school_name', 'social_score__social_gpa')
+            .iterator(chunk_size=2000)
+        )
+        SchoolGpaBucket.objects.bulk_create([
+            SchoolGpaBucket(school_name=school_name, bucket=bucket, students=n)
+            for (school_name, bucket), n in histogram.items()
+        ], batch_size=1000)
+
+
+# ---------- Чтение ----------
+
+def approximate_percentile(histogram, p):
+    # histogram: [(bucket, students)] по возрастанию; линейная интерполяция внутри бакета
+    total = sum(n for _, n in histogram)
+    if not total:
+        return 0.0
+    rank = p / 100 * total
+    seen = 0
+    for bucket, n in histogram:
+        if n <= 0:
+            continue
+        if seen + n >= rank:
+            if bucket == ZERO_BUCKET:
+                return 0.0
+            return round((bucket + (rank - seen) / n) * GPA_BUCKET_WIDTH, 2)
+        seen += n
+    return round((histogram[-1][0] + 1) * GPA_BUCKET_WIDTH, 2)
+
+
+def school_analytics(school_name, months=12, top=10):
+    since = months_back(month_of(timezone.now()), months - 1)
+    rows = list(
+        SchoolCategoryMonth.objects.filter(school_name=school_name, month__gte=since)
+        .order_by('month', 'category')
+    )
+
+    by_category = defaultdict(lambda: {'achievements': 0, 'points': 0.0})
+    by_month = defaultdict(int)
+    for row in rows:
+        by_category[row.category]['achievements'] += row.achievements
+        by_category[row.category]['points'] += row.points
+        by_month[row.month] += row.achievements
+    labels = dict(Achievement.CATEGORY_CHOICES)
+    total_achievements = sum(c['achievements'] for c in by_category.values())
+    categories = sorted(
+        (
+            {
+                'category': labels.get(category, category),
+                'achievements': c['achievements'],
+                'points': round(c['points'], 1),
+                'share': round(100 * c['achievements'] / total_achievements) if total_achievements else 0,
+            }
+            for category, c in by_category.items()
+        ),
+        key=lambda c: -c['achievements'],
+    )
+
+    histogram = list(
+        SchoolGpaBucket.objects.filter(school_name=school_name, students__gt=0)
+        .order_by('bucket')
+        .values_list('bucket', 'students')
+    )
+    students = sum(n for _, n in histogram)
+    inactive = sum(n for bucket, n in histogram if bucket == ZERO_BUCKET)
+
+    top_students = (
+        UserScore.objects.filter(user__school_name=school_name, user__role='student', social_gpa__gt=0)
+        .select_related('user')
+        .order_by('-social_gpa')[:top]
+    )
+
+    return {
+        'categories': categories,
+        'months': sorted(by_month.items()),
+        'total_achievements': total_achievements,
+        'students': students,
+        'participation_rate': round(100 * (students - inactive) / students) if students else 0,
+        'percentiles': [(p, approximate_percentile(histogram, p)) for p in PERCENTILES],
+        'histogram': [
+            (bucket * GPA_BUCKET_WIDTH if bucket != ZERO_BUCKET else None, n) for bucket, n in histogram
+        ],
+        'top_students': top_students,
+    }
@@ -0,0 +1,276 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+from itertools import groupby
+import math
+
+from django.db import transaction
+from django.db.models import BooleanField, Case, Count, F, Value, When, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .models import Achievement, ScoreSnapshot, UserScore
+from .ranks import track_score
+from .rollups import achievement_contribution, apply_achievement_changes, move_student_gpa
+from .versions import bump, user_key
+from .weights import get_weights
+
+
+REPEAT_WINDOW = timedelta(days=365)
+
+
+def annotate_repeats(qs, now):
+    # Порядковый номер ачивки среди повторов (user, category, scale, title_key) за
+    # последние 365 дней считает сама БД: ROW_NUMBER() / COUNT() OVER (PARTITION BY ...).
+    year_ago = now - REPEAT_WINDOW
+    in_window = Case(
+        When(created_at__gte=year_ago, then=Value(True)),
+        default=Value(False),
+        output_field=BooleanField(),
+    )
+    partition = [F('user_id'), in_window, F('category'), F('scale'), F('title_key')]
+    return qs.only(
+        'id', 'user_id', 'category', 'scale', 'role_type', 'duration_months', 'title_key', 'created_at',
+    ).annotate(
+        in_window=in_window,
+        repeat_ordinal=Window(RowNumber(), partition_by=partition, order_by=[F('created_at').asc(), F('id').asc()]),
+        repeat_count=Window(Count('id'), partition_by=partition),
+    ).order_by('user_id', 'created_at', 'id')
+
+
+def score_rows(rows, weights=None):
+    # rows - ачивки с аннотациями annotate_repeats
+    weights = weights or get_weights()
+    raw_score = 0.0
+    next_change_at = None
+
+    for ach in rows:
+        fr = 1.0
+        if ach.in_window:
+            fr = 1.0 / math.sqrt(ach.repeat_ordinal)
+            # Одиночка в группе штрафа не получает, её выход из окна ничего не меняет.
+            # Для повторов первая ачивка группы, выходя из окна, сдвигает ординалы остальных.
+            if ach.repeat_ordinal == 1 and ach.repeat_count > 1:
+                expires_at = ach.created_at + REPEAT_WINDOW
+                if next_change_at is None or expires_at < next_change_at:
+                    next_change_at = expires_at
+
+        raw_score += weights.gpa_item_score(ach.category, ach.scale, ach.role_type, ach.duration_months) * fr
+
+    social_gpa = 10.0 * math.log10(1.0 + raw_score)
+    social_gpa = round(social_gpa, 2)
+
+    return raw_score, social_gpa, next_change_at
+
+
+# (raw_score, social_gpa, next_change_at): next_change_at - когда результат может
+# измениться сам по себе, т.е. ачивка выходит из 365-дневного окна повторов.
+def social_gpa_details(user, now=None):
+    now = now or timezone.now()
+    return score_rows(annotate_repeats(user.achievements.filter(status='approved'), now))
+
+
+def social_gpa_details_bulk(user_ids, now=None):
+    # То же для пачки пользователей одним запросом
+    now = now or timezone.now()
+    qs = annotate_repeats(Achievement.objects.filter(status='approved', user_id__in=user_ids), now)
+    weights = get_weights()
+    details = {user_id: (0.0, 0.0, None) for user_id in user_ids}
+    for user_id, rows in groupby(qs, key=lambda a: a.user_id):
+        details[user_id] = score_rows(rows, weights)
+    return details
+
+
+# Та же формула в памяти - для воспроизведения истории на произвольную дату.
+# achievements - одобренные ачивки пользователя, отсортированные по created_at
+def score_achievements(achievements, now=None):
+    if not achievements:
+        return 0.0, 0.0, None
+
+    weights = get_weights()
+    now = now or timezone.now()
+    year_ago = now - REPEAT_WINDOW
+
+    counts = Counter(
+        (ach.category, ach.scale, ach.title_key)
+        for ach in achievements
+        if ach.created_at >= year_ago
+    )
+    seen = Counter()
+    for ach in achievements:
+        ach.in_window = ach.created_at >= year_ago
+        if ach.in_window:
+            key = (ach.category, ach.scale, ach.title_key)
+            seen[key] += 1
+            ach.repeat_ordinal = seen[key]
+            ach.repeat_count = counts[key]
+
+    return score_rows(achievements, weights)
+
+
+def compute_social_gpa_for_user(user):
+    raw_score, social_gpa, _ = social_gpa_details(user)
+    return raw_score, social_gpa
+
+
+# ---------- Кэш GPA + расписание пересчёта ----------
+
+def refresh_user_score(user, now=None, details=None):
+    now = now or timezone.now()
+    raw_score, social_gpa, next_change_at = details or social_gpa_details(user, now=now)
+    previous = UserScore.objects.filter(user=user).values_list('social_gpa', flat=True).first()
+    if previous != social_gpa:
+        bump(user_key(user.pk))
+        move_student_gpa(user, previous or 0.0, social_gpa)
+        track_score(user, social_gpa)
+    score, _ = UserScore.objects.update_or_create(
+        user=user,
+        defaults={
+            'raw_score': raw_score,
+            'social_gpa': social_gpa,
+            'computed_at': now,
+            'next_refresh_at': next_change_at,
+        },
+    )
+    record_snapshot(user, timezone.localdate(now), raw_score, social_gpa)
+    return score
+
+
+def get_user_score(user):
+    now = timezone.now()
+    score = UserScore.objects.filter(user=user).first()
+    if score is None or score.is_due(now):
+        score = refresh_user_score(user, now=now)
+    return score
+
+
+def mark_score_stale(user_id):
+    # Ачивки поменялись -> пересчитать при следующем чтении или прогоне планировщика
+    UserScore.objects.filter(user_id=user_id).update(next_refresh_at=timezone.now())
+
+
+def refresh_due_scores(now=None, batch_size=500):
+    from accounts.models import User
+
+    now = now or timezone.now()
+    due_ids = list(
+        UserScore.objects.filter(next_refresh_at__lte=now)
+        .order_by('next_refresh_at')
+        .values_list('user_id', flat=True)[:batch_size]
+    )
+    details = social_gpa_details_bulk(due_ids, now=now)
+    for user in User.objects.filter(id__in=due_ids):
+        with transaction.atomic():
+            refresh_user_score(user, now=now, details=details[user.id])
+    return len(due_ids)
+
+
+# ---------- Пересчёт total_points пачкой ----------
+
+RESCORE_FIELDS = (
+    'id', 'user_id', 'category', 'scale', 'role_type', 'duration_months', 'status',
+    'school_name', 'created_at', 'total_points',
+)
+
+
+def rescore_batch(batch, extra_fields=(), before=None):
+    # batch - ачивки с полями RESCORE_FIELDS; total_points по текущей версии весов.
+    # Если поля (extra_fields) поменяли до вызова, before - их вклад в роллапы до изменений.
+    if before is None:
+        before = [achievement_contribution(ach) for ach in batch]
+    changes = []
+    for ach, contribution in zip(batch, before):
+        ach.total_points = ach.calculate_points()
+        changes.append((contribution, achievement_contribution(ach)))
+    user_ids = {ach.user_id for ach in batch}
+
+    with transaction.atomic():
+        Achievement.objects.bulk_update(batch, ['total_points', 'scoring_version', *extra_fields])
+        # bulk_update не шлёт сигналы - роллапы и кэш GPA обновляем сами
+        apply_achievement_changes(changes)
+        UserScore.objects.filter(user_id__in=user_ids).update(next_refresh_at=timezone.now())
+        bump('leaderboard', *(user_key(user_id) for user_id in user_ids))
+
+
+# ---------- История GPA по дням ----------
+
+def record_snapshot(user, day, raw_score, social_gpa):
+    last = ScoreSnapshot.objects.filter(user=user, day__lte=day).order_by('-day').first()
+    if last is None or last.day != day:
+        if last is None or last.social_gpa != social_gpa:
+            ScoreSnapshot.objects.create(user=user, day=day, raw_score=raw_score, social_gpa=social_gpa)
+        return
+
+    # За сегодня уже есть строка: обновить, либо убрать, если вернулись к вчерашнему значению
+    prev = ScoreSnapshot.objects.filter(user=user, day__lt=day).order_by('-day').first()
+    if prev is not None and prev.social_gpa == social_gpa:
+        last.delete()
+    elif last.social_gpa != social_gpa:
+        last.raw_score, last.social_gpa = raw_score, social_gpa
+        last.save(update_fields=['raw_score', 'social_gpa'])
+
+
+def replay_history(achievements, until=None):
+    # Проход по дням, когда GPA может измениться: ачивка появляется или выходит из окна
+    # повторов. Вклад каждой группы повторов (category, scale, title_key) хранится отдельно;
+    # за день пересчитываются только группы, где что-то появилось или вышло из окна.
+    # achievements - одобренные ачивки пользователя, отсортированные по created_at.
+    until = timezone.localdate(until or timezone.now())
+    tz = timezone.get_current_timezone()
+    weights = get_weights()
+    days = set()
+    for ach in achievements:
+        days.add(timezone.localdate(ach.created_at))
+        days.add(timezone.localdate(ach.created_at + REPEAT_WINDOW))
+
+    groups = {}  # key -> [очки ачивок группы по порядку, lo - первая в окне, hi - добавлено]
+    contributions = {}
+    added = expired = 0
+
+    snapshots = []
+    last_gpa = None
+    for day in sorted(d for d in days if d <= until):
+        day_end = datetime.combine(day, time.max, tzinfo=tz)
+        year_ago = day_end - REPEAT_WINDOW
+        dirty = set()
+        while added < len(achievements) and achievements[added].created_at <= day_end:
+            ach = achievements[added]
+            key = (ach.category, ach.scale, ach.title_key)
+            group = groups.setdefault(key, [[], 0, 0])
+            group[0].append(weights.gpa_item_score(ach.category, ach.scale, ach.role_type, ach.duration_months))
+            group[2] += 1
+            dirty.add(key)
+            added += 1
+        while expired < added and achievements[expired].created_at < year_ago:
+            ach = achievements[expired]
+            key = (ach.category, ach.scale, ach.title_key)
+            groups[key][1] += 1
+            dirty.add(key)
+            expired += 1
+
+        for key in dirty:
+            scores, lo, hi = groups[key]
+            # вне окна - полный вес, в окне - 1/sqrt(порядковый номер среди оставшихся)
+            contributions[key] = math.fsum(scores[:lo]) + math.fsum(
+                scores[j] / math.sqrt(j - lo + 1) for j in range(lo, hi)
+            )
+
+        raw_score = math.fsum(contributions.values())
+        social_gpa = round(10.0 * math.log10(1.0 + raw_score), 2)
+        if social_gpa != last_gpa:
+            snapshots.append((day, raw_score, social_gpa))
+            last_gpa = social_gpa
+    return snapshots
+
+
+def downsample_history(snapshots, resolution='day'):
+    # snapshots: [(day, social_gpa)] по возрастанию; на бакет - значение на его конец
+    buckets = {}
+    for day, social_gpa in snapshots:
+        if resolution == 'week':
+            key = day - timedelta(days=day.weekday())
+        elif resolution == 'month':
+            key = day.replace(day=1)
+        else:
+            key = day
+        buckets[key] = social_gpa
+    return sorted(buckets.items())
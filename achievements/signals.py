@@ -0,0 +1,128 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from accounts.models import User
+from .activity import record_achievements, record_purchase
+from .models import Achievement, Event, Quest, QuestCompletion, ShopItem, UserPurchase, UserScore
+from .ranks import forget_user, track_score
+from .recommendations import event_vector
+from .rollups import achievement_contribution, apply_achievement_changes, move_student_gpa
+from .scoring import mark_score_stale
+from .uploads import add_storage_usage
+from .versions import bump, user_key
+
+
+@receiver(post_save, sender=Achievement)
+@receiver(post_delete, sender=Achievement)
+def achievement_changed(sender, instance, **kwargs):
+    mark_score_stale(instance.user_id)
+    bump(user_key(instance.user_id), 'leaderboard')
+
+
+@receiver(pre_save, sender=Achievement)
+def achievement_before_save(sender, instance, **kwargs):
+    before = None
+    if instance.pk:
+        before = Achievement.objects.filter(pk=instance.pk).only(
+            'status', 'school_name', 'category', 'created_at', 'total_points', 'proof_size'
+        ).first()
+    instance._rollup_before = achievement_contribution(before)
+    instance._proof_size_before = before.proof_size if before else 0
+    instance._status_before = before.status if before else None
+
+
+@receiver(post_save, sender=Achievement)
+def achievement_rollup_saved(sender, instance, **kwargs):
+    apply_achievement_changes([(getattr(instance, '_rollup_before', None), achievement_contribution(instance))])
+    add_storage_usage(instance.user_id, instance.proof_size - getattr(instance, '_proof_size_before', 0))
+    if instance.status == 'approved' and getattr(instance, '_status_before', None) != 'approved':
+        record_achievements([instance])
+
+
+@receiver(post_delete, sender=Achievement)
+def achievement_rollup_deleted(sender, instance, **kwargs):
+    apply_achievement_changes([(achievement_contribution(instance), None)])
+    add_storage_usage(instance.user_id, -instance.proof_size)
+
+
+@receiver(pre_save, sender=Event)
+def event_changed(sender, instance, **kwargs):
+    instance.profile_vector = event_vector(instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump(user_key(instance.pk), 'leaderboard')
+
+
+@receiver(post_save, sender=User)
+def student_joined(sender, instance, created, **kwargs):
+    # Новый ученик сразу попадает в гистограмму школы с нулевым GPA
+    if created:
+        move_student_gpa(instance, None, 0.0)
+        track_score(instance, 0.0)
+
+
+PLACEMENT_FIELDS = ('school_name', 'role')
+
+
+@receiver(pre_save, sender=User)
+def user_before_save(sender, instance, update_fields=None, **kwargs):
+    # Школа и роль до сохранения - чтобы перенести ученика в гистограмме школы и рангах
+    instance._placement_before = None
+    if instance.pk and (update_fields is None or set(update_fields) & set(PLACEMENT_FIELDS)):
+        instance._placement_before = User.objects.filter(pk=instance.pk).values_list(*PLACEMENT_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def student_moved(sender, instance, created, **kwargs):
+    before = getattr(instance, '_placement_before', None)
+    if created or before is None or before == (instance.school_name, instance.role):
+        return
+    score = UserScore.objects.filter(user=instance).values_list('social_gpa', flat=True).first() or 0.0
+    # из старой школы/роли уходим, в новую приходим; move_student_gpa сам пропустит не-учеников
+    move_student_gpa(User(pk=instance.pk, school_name=before[0], role=before[1]), score, None)
+    move_student_gpa(instance, None, score)
+    track_score(instance, score)
+
+
+@receiver(pre_delete, sender=User)
+def student_left(sender, instance, **kwargs):
+    score = UserScore.objects.filter(user=instance).values_list('social_gpa', flat=True).first()
+    move_student_gpa(instance, score or 0.0, None)
+    forget_user(instance.pk)
+
+
+@receiver(post_save, sender=UserPurchase)
+@receiver(post_delete, sender=UserPurchase)
+@receiver(post_save, sender=QuestCompletion)
+@receiver(post_delete, sender=QuestCompletion)
+def user_item_changed(sender, instance, **kwargs):
+    bump(user_key(instance.user_id))
+
+
+@receiver(post_save, sender=UserPurchase)
+def purchase_activity(sender, instance, created, **kwargs):
+    if created:
+        record_purchase(instance)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def events_catalog_changed(sender, instance, **kwargs):
+    bump('events')
+
+
+@receiver(post_save, sender=ShopItem)
+@receiver(post_delete, sender=ShopItem)
+def shop_catalog_changed(sender, instance, **kwargs):
+    bump('shop')
+
+
+@receiver(post_save, sender=Quest)
+@receiver(post_delete, sender=Quest)
+def quests_catalog_changed(sender, instance, **kwargs):
+    bump('quests')
@@ -1,3 +1,1181 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import warnings
+import zipfile
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from http.server import ThreadingHTTPServer
+from itertools import product
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from accounts.models import User
+
+from socgpa.db import ReplicaRouter, database_from_url, pin_to_primary, replica_reads
+from socgpa.pagination import EstimatedCountPaginator
+from . import ranks, views
+from .management.commands.ai_simulator import Simulator, make_handler
+from .management.commands.loadtest import percentile
+from .activity import cursor_position, feed_page, record
+from .admin import chunked_ids
+from .admission import AdmissionController
+from .analyzers import BatchCoalescer, ChatCompletionsAnalyzer, analysis_item, analyze_items
+from .api import encode_cursor
+from .dedup import BANDS, index_achievement
+from .events import events_page, upcoming_events
+from .exports import export_queryset, iter_zip
+from .imports import RowError, clean_row, import_file
+from .models import (
+    Achievement,
+    ActivityEvent,
+    Event,
+    LSHBucket,
+    ProofImageHash,
+    Quest,
+    QuestCompletion,
+    SchoolCategoryMonth,
+    SchoolGpaBucket,
+    ShopItem,
+    UserScore,
+)
+from .moderation import achievement_coins, apply_decision, moderation_queue
+from .proof_hashes import dhash
+from .quests import award_quests_for_achievement, complete_quests, quest_progress
+from .ranks import RankIndex
+from .recommendations import recommend_events, user_gap_vector
+from .rollups import month_of, months_back, rebuild_school_rollups
+from .scoring import (
+    REPEAT_WINDOW,
+    RESCORE_FIELDS,
+    refresh_due_scores,
+    refresh_user_score,
+    replay_history,
+    rescore_batch,
+    score_achievements,
+    social_gpa_details,
+    social_gpa_details_bulk,
+)
+from .views import ensure_default_events
+from .warmup import warm_up_application
+from .weights import CATEGORIES, ROLES, SCALES
+
+# Тесты не ходят к внешним провайдерам, что бы ни стояло в .env
+local_analyzer = mock.patch('achievements.analyzers.AI_PROVIDER', 'LOCAL')
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+        @replica_reads
+        def read_view(request):
+            return Achievement.objects.all().db
+
+        self.read_view = read_view
+
+    def _get(self, session=None):
+        request = self.factory.get('/leaderboard/')
+        request.session = session if session is not None else {}
+        return request
+
+    def test_database_from_url_sqlite_stand_ins(self):
+        primary = database_from_url('sqlite:///db.sqlite3', '/srv/app')
+        replica = database_from_url('sqlite:////tmp/replica.sqlite3', '/srv/app')
+        self.assertEqual(str(primary['NAME']), '/srv/app/db.sqlite3')
+        self.assertEqual(replica['NAME'], '/tmp/replica.sqlite3')
+
+    def test_database_from_url_postgres(self):
+        db = database_from_url('postgres://u:p%40ss@db:5433/socgpa?sslmode=require', '/srv', conn_max_age=60,
+                               health_checks=True)
+        self.assertEqual(db['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual((db['USER'], db['PASSWORD'], db['HOST'], db['PORT']), ('u', 'p@ss', 'db', '5433'))
+        self.assertEqual(db['CONN_MAX_AGE'], 60)
+        self.assertEqual(db['OPTIONS'], {'sslmode': 'require'})
+
+    @override_settings(DATABASE_READ_REPLICA='replica')
+    def test_hot_path_reads_from_replica(self):
+        self.assertEqual(self.read_view(self._get()), 'replica')
+        # вне декорированной view всё идёт на primary
+        self.assertEqual(Achievement.objects.all().db, 'default')
+        self.assertEqual(ReplicaRouter().db_for_write(Achievement), 'default')
+
+    @override_settings(DATABASE_READ_REPLICA='replica')
+    def test_read_your_writes_after_submission(self):
+        session = {}
+        pin_to_primary(self._get(session))
+        self.assertEqual(self.read_view(self._get(session)), 'default')
+
+    @override_settings(DATABASE_READ_REPLICA=None)
+    def test_no_replica_configured(self):
+        self.assertEqual(self.read_view(self._get()), 'default')
+
+
+class ApiCursorTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('cursor-student', password='x', school_name='NIS')
+        self.client.force_login(self.user)
+
+    def test_malformed_cursors_are_ignored(self):
+        bad = [encode_cursor([1]), encode_cursor([{"a": 1}]), encode_cursor("x"), encode_cursor([None, None]),
+               encode_cursor(["not a date", 1]), "%%%", "e30"]
+        for url in ('/api/v1/leaderboard/', '/api/v1/shop/', '/api/v1/quests/', '/api/v1/profile/achievements/',
+                    '/api/v1/feed/'):
+            for cursor in bad:
+                response = self.client.get(url, {'cursor': cursor})
+                self.assertEqual(response.status_code, 200, (url, cursor))
+
+
+def png_file(size):
+    buf = io.BytesIO()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        Image.new('1', size).save(buf, 'PNG')
+    buf.seek(0)
+    return buf
+
+
+class ProofHashTests(SimpleTestCase):
+    def test_huge_images_are_not_decoded(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            self.assertIsNone(dhash(png_file((10000, 10000))))
+            self.assertIsNone(dhash(png_file((20000, 20000))))
+        self.assertIsNotNone(dhash(png_file((64, 48))))
+
+
+class ProofHashBackfillTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=media)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+    def test_unhashable_proofs_are_marked_and_not_reopened(self):
+        user = User.objects.create_user('backfill-student', password='x', school_name='NIS')
+        image = Achievement(user=user, title='Certificate', category='research')
+        image.proof_file.save('cert.png', ContentFile(png_file((64, 48)).read()), save=False)
+        pdf = Achievement(user=user, title='Scan', category='research')
+        pdf.proof_file.save('scan.pdf', ContentFile(b'%PDF-1.4 not an image'), save=False)
+        # мимо сигналов и view - как старые строки до появления индекса
+        Achievement.objects.bulk_create([image, pdf])
+
+        call_command('index_proof_hashes', stdout=io.StringIO())
+        self.assertIsNotNone(ProofImageHash.objects.get(achievement__title='Certificate').dhash)
+        self.assertIsNone(ProofImageHash.objects.get(achievement__title='Scan').dhash)
+
+        with mock.patch('achievements.proof_hashes.dhash') as dhash:
+            call_command('index_proof_hashes', stdout=io.StringIO())
+        dhash.assert_not_called()
+
+
+class EventPagingTests(TestCase):
+    def test_undated_events_are_paged_after_dated_ones(self):
+        now = timezone.now()
+        common = dict(organizer='o', category='c', date='-', location='l', link='#')
+        dated = [
+            Event.objects.create(title=f'd{i}', starts_at=now + timedelta(days=i + 1),
+                                 ends_at=now + timedelta(days=i + 2), **common)
+            for i in range(3)
+        ]
+        undated = [Event.objects.create(title=f'u{i}', ends_at=now + timedelta(days=30), **common) for i in range(3)]
+
+        seen, cursor = [], None
+        while True:
+            events, cursor = events_page(upcoming_events(now=now), cursor=cursor, page_size=2)
+            seen += events
+            if not cursor:
+                break
+        self.assertEqual([e.id for e in seen], [e.id for e in dated + undated])
+
+    def test_events_without_any_dates_are_listed(self):
+        now = timezone.now()
+        common = dict(organizer='o', category='c', date='Spring', location='l', link='#')
+        past = Event.objects.create(title='past', starts_at=now - timedelta(days=9), ends_at=now - timedelta(days=2),
+                                    **common)
+        legacy = Event.objects.create(title='legacy', **common)
+        soon = Event.objects.create(title='soon', starts_at=now + timedelta(days=1), **common)
+
+        ids = list(upcoming_events(now=now).values_list('id', flat=True))
+        self.assertEqual(ids, [soon.id, legacy.id])
+        self.assertNotIn(past.id, ids)
+
+    def test_seeded_events_are_upcoming(self):
+        ensure_default_events.__wrapped__()
+        self.assertEqual(upcoming_events().count(), 4)
+
+
+class RollupWindowTests(SimpleTestCase):
+    def test_months_back(self):
+        self.assertEqual(months_back(date(2026, 10, 1), 11), date(2025, 11, 1))
+        self.assertEqual(months_back(date(2026, 1, 1), 1), date(2025, 12, 1))
+        self.assertEqual(months_back(date(2026, 3, 1), 0), date(2026, 3, 1))
+
+
+class ReplayHistoryTests(SimpleTestCase):
+    def test_matches_full_rescore_on_each_change_day(self):
+        rng = random.Random(7)
+        start = datetime(2023, 1, 1, 12, tzinfo=dt_timezone.utc)
+        achievements = sorted(
+            (
+                SimpleNamespace(
+                    category=rng.choice(['research', 'social', 'sports']),
+                    scale=rng.choice(['school', 'city']),
+                    title_key=rng.choice(['olympiad', 'cup', 'camp']),
+                    role_type=rng.choice(['participant', 'winner']),
+                    duration_months=rng.choice([0, 1, 6]),
+                    created_at=start + timedelta(days=rng.randrange(900), hours=rng.randrange(24)),
+                )
+                for _ in range(60)
+            ),
+            key=lambda a: a.created_at,
+        )
+        until = start + timedelta(days=1400)
+        snapshots = replay_history(achievements, until=until)
+
+        tz = timezone.get_current_timezone()
+        days = sorted({
+            timezone.localdate(a.created_at + shift) for a in achievements for shift in (timedelta(0), REPEAT_WINDOW)
+        })
+        expected, last = [], None
+        for day in days:
+            day_end = datetime.combine(day, time.max, tzinfo=tz)
+            _, gpa, _ = score_achievements([a for a in achievements if a.created_at <= day_end], now=day_end)
+            if gpa != last:
+                expected.append((day, gpa))
+                last = gpa
+        self.assertEqual([(day, gpa) for day, _, gpa in snapshots], expected)
+
+
+# ---------- Эталон: формулы до вынесения весов в scoring_weights.json ----------
+
+def baseline_points(category, scale, role_type, duration_months, status):
+    base = {'research': 9, 'social': 7, 'creative': 6, 'sports': 6, 'competence': 8, 'other': 4}.get(category, 4)
+    scale_mult = {'school': 1.0, 'city': 1.1, 'national': 1.3, 'international': 1.6}.get(scale, 1.0)
+    role_mult = {'participant': 1.0, 'winner': 1.4, 'organizer': 1.3, 'leader': 1.6}.get(role_type, 1.0)
+    verified = {'approved': 1.2, 'rejected': 0.0}.get(status, 1.0)
+    points = base * scale_mult * role_mult
+    points *= (1.0 + min(duration_months, 12) / 24) * verified
+    return round(points, 2)
+
+
+def baseline_social_gpa(achievements, now):
+    # achievements - одобренные, по created_at
+    w_cat = {'research': 1.5, 'social': 1.4, 'creative': 1.1, 'sports': 1.1, 'competence': 0.9, 'other': 0.7}
+    w_scale = {'school': 1.0, 'city': 1.3, 'national': 2.0, 'international': 3.0}
+    w_role = {'participant': 0.7, 'winner': 1.6, 'organizer': 1.6, 'leader': 2.0}
+
+    def w_duration(m):
+        m = float(m or 0)
+        if m <= 0:
+            return 0.7
+        if m <= 1:
+            return 1.0
+        if m <= 4:
+            return 1.3
+        if m <= 6:
+            return 1.7
+        return 2.0
+
+    year_ago = now - timedelta(days=365)
+    groups = defaultdict(list)
+    for idx, ach in enumerate(achievements):
+        if ach.created_at >= year_ago:
+            title = (ach.title or "").lower()
+            norm = ' '.join(''.join(ch if (ch.isalnum() or ch.isspace()) else ' ' for ch in title).split()[:6])
+            groups[(ach.category or 'other', ach.scale or 'school', norm)].append(idx)
+    f_repeat = [1.0] * len(achievements)
+    for idxs in groups.values():
+        for j, pos in enumerate(sorted(idxs), start=1):
+            f_repeat[pos] = 1.0 / math.sqrt(j)
+
+    raw = sum(
+        10.0 * w_cat.get(a.category or 'other', 0.7) * w_scale.get(a.scale or 'school', 1.0)
+        * w_role.get(a.role_type or 'participant', 0.7) * w_duration(a.duration_months) * f_repeat[i]
+        for i, a in enumerate(achievements)
+    )
+    return raw, round(10.0 * math.log10(1.0 + raw), 2)
+
+
+SCORING_CASES = [
+    # title, category, scale, role_type, duration_months, days_ago
+    ('Math Olympiad', 'research', 'national', 'winner', 1, 10),
+    ('Math olympiad!', 'research', 'national', 'participant', 0, 40),
+    ('Math Olympiad', 'research', 'national', 'winner', 2, 90),
+    ('Math Olympiad', 'research', 'national', 'winner', 2, 500),
+    ('Food bank volunteering', 'social', 'city', 'organizer', 6, 20),
+    ('Food bank volunteering', 'social', 'city', 'organizer', 12, 200),
+    ('Jazz band', 'creative', 'school', 'leader', 24, 5),
+    ('Football league', 'sports', 'international', 'participant', 3, 300),
+    ('Peer mentoring', 'competence', 'school', 'leader', 5, 100),
+    ('Something else', 'other', 'school', 'participant', 0, 700),
+]
+
+
+@override_settings(SCORING_VERSION=1)
+class ScoringEquivalenceTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.user = User.objects.create_user('scoring-student', password='x', school_name='NIS')
+        self.other = User.objects.create_user('scoring-other', password='x', school_name='NIS')
+        for owner in (self.user, self.other):
+            for title, category, scale, role, months, days_ago in SCORING_CASES:
+                ach = Achievement.objects.create(
+                    user=owner, title=title, category=category, scale=scale, role_type=role,
+                    duration_months=months, status='approved',
+                )
+                Achievement.objects.filter(pk=ach.pk).update(created_at=self.now - timedelta(days=days_ago))
+
+    def test_calculate_points_matches_baseline(self):
+        for category, scale, role, months, status in product(
+            CATEGORIES, SCALES, ROLES, (0, 1, 6, 12, 30), ('approved', 'pending', 'rejected')
+        ):
+            ach = Achievement(category=category, scale=scale, role_type=role, duration_months=months, status=status)
+            self.assertEqual(
+                ach.calculate_points(), baseline_points(category, scale, role, months, status),
+                (category, scale, role, months, status),
+            )
+
+    def test_social_gpa_matches_baseline(self):
+        achievements = list(self.user.achievements.filter(status='approved').order_by('created_at', 'id'))
+        raw, gpa = baseline_social_gpa(achievements, self.now)
+
+        single_raw, single_gpa, _ = social_gpa_details(self.user, now=self.now)
+        bulk = social_gpa_details_bulk([self.user.pk, self.other.pk], now=self.now)
+        memory_raw, memory_gpa, _ = score_achievements(achievements, now=self.now)
+
+        for got_raw, got_gpa in ((single_raw, single_gpa), bulk[self.user.pk][:2], bulk[self.other.pk][:2],
+                                 (memory_raw, memory_gpa)):
+            self.assertAlmostEqual(got_raw, raw, places=9)
+            self.assertEqual(got_gpa, gpa)
+
+
+@override_settings(SCORING_VERSION=1)
+class RescoreBatchTests(TestCase):
+    def test_rescore_matches_calculate_points_and_rollups(self):
+        user = User.objects.create_user('rescore-student', password='x', school_name='NIS')
+        for title, category, scale, role, months, _ in SCORING_CASES:
+            Achievement.objects.create(user=user, title=title, category=category, scale=scale, role_type=role,
+                                       duration_months=months, status='approved')
+        refresh_user_score(user)
+        # устаревшие очки, посчитанные "старой версией" весов; роллапы согласованы с ними
+        Achievement.objects.filter(user=user).update(total_points=1.0, scoring_version=0)
+        rebuild_school_rollups()
+
+        def rollups():
+            return sorted(
+                (school, category, month, n, round(points, 6))
+                for school, category, month, n, points in SchoolCategoryMonth.objects.values_list(
+                    'school_name', 'category', 'month', 'achievements', 'points')
+            )
+
+        before = timezone.now()
+        rescore_batch(list(Achievement.objects.filter(user=user).only(*RESCORE_FIELDS)))
+
+        for ach in Achievement.objects.filter(user=user):
+            self.assertEqual(ach.total_points, baseline_points(ach.category, ach.scale, ach.role_type,
+                                                               ach.duration_months, ach.status))
+            self.assertEqual(ach.scoring_version, 1)
+        incremental = rollups()
+        rebuild_school_rollups()
+        self.assertEqual(incremental, rollups())
+        self.assertGreaterEqual(UserScore.objects.get(user=user).next_refresh_at, before)
+
+
+@local_analyzer
+class ProofUploadTests(TestCase):
+    PNG = b'\x89PNG\r\n\x1a\n' + b'0' * 4000
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=media)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        self.user = User.objects.create_user('upload-student', password='x', school_name='NIS')
+        self.client.force_login(self.user)
+
+    def _post(self, name, content):
+        return self.client.post('/add/', {
+            'title': 'Science fair', 'category': 'research', 'subcategory': 'Olympiads',
+            'description': 'regional science fair', 'proof_file': SimpleUploadedFile(name, content),
+        })
+
+    def test_oversized_upload_is_rejected_while_streaming(self):
+        with override_settings(PROOF_MAX_UPLOAD_MB=0.001):
+            response = self._post('big.png', self.PNG)
+        self.assertIn('too large', response.wsgi_request.proof_upload_error)
+        self.assertContains(response, 'Proof file is too large')
+        self.assertFalse(Achievement.objects.filter(user=self.user).exists())
+
+    def test_executable_is_rejected_by_magic_bytes(self):
+        response = self._post('cert.png', b'MZ\x90\x00' + b'0' * 4000)
+        self.assertIn('Unsupported', response.wsgi_request.proof_upload_error)
+        self.assertContains(response, 'Unsupported proof file type')
+        self.assertFalse(Achievement.objects.filter(user=self.user).exists())
+
+    def test_storage_used_follows_uploads_and_deletes(self):
+        response = self._post('cert.png', self.PNG)
+        self.assertEqual(response.status_code, 200)
+        ach = Achievement.objects.get(user=self.user)
+        self.assertEqual(ach.ai_raw_response['provider'], 'local_fallback')
+        self.assertEqual(ach.proof_size, len(self.PNG))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.storage_used, len(self.PNG))
+
+        ach.delete()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.storage_used, 0)
+
+    def test_quota_counts_existing_usage(self):
+        User.objects.filter(pk=self.user.pk).update(storage_used=10 * 1024 * 1024)
+        with override_settings(PROOF_USER_QUOTA_MB=10):
+            response = self._post('cert.png', self.PNG)
+        self.assertContains(response, 'Storage quota exceeded')
+        self.assertFalse(Achievement.objects.filter(user=self.user).exists())
+
+
+class ApplyDecisionTests(TestCase):
+    def test_approve_credits_coins_and_rollups_once(self):
+        user = User.objects.create_user('moderated-student', password='x', school_name='NIS')
+        pending = [
+            Achievement.objects.create(user=user, title=f'Debate {i}', category='creative', scale='city',
+                                       role_type='winner', duration_months=i, status='pending',
+                                       ai_raw_response={'total_score': 20 + i})
+            for i in range(3)
+        ]
+        self.assertFalse(SchoolCategoryMonth.objects.exists())
+
+        approved = apply_decision(Achievement.objects.filter(user=user), 'approved')
+        self.assertEqual(len(approved), 3)
+
+        user.refresh_from_db()
+        expected_coins = sum(achievement_coins(a) for a in approved)
+        self.assertEqual(user.soc_coins, expected_coins)
+        self.assertEqual(expected_coins, sum(int(20 + i) for i in range(3)))
+
+        rollup = SchoolCategoryMonth.objects.get(school_name='NIS', category='creative',
+                                                 month=month_of(pending[0].created_at))
+        self.assertEqual(rollup.achievements, 3)
+        self.assertAlmostEqual(rollup.points, sum(a.total_points for a in approved))
+
+        # повторное одобрение - уже не pending, ничего не меняется
+        self.assertEqual(apply_decision(Achievement.objects.filter(user=user), 'approved'), [])
+        user.refresh_from_db()
+        self.assertEqual(user.soc_coins, expected_coins)
+        rollup.refresh_from_db()
+        self.assertEqual(rollup.achievements, 3)
+
+    def test_queue_hides_reviewers_own_achievements(self):
+        teacher = User.objects.create_user('moderating-teacher', password='x', school_name='NIS', role='teacher')
+        student = User.objects.create_user('queued-student', password='x', school_name='NIS')
+        own = Achievement.objects.create(user=teacher, title='Own', category='social', status='pending')
+        theirs = Achievement.objects.create(user=student, title='Theirs', category='social', status='pending')
+
+        self.assertEqual(list(moderation_queue(teacher)), [theirs])
+        self.assertNotIn(own, moderation_queue(teacher))
+
+
+class NearDuplicateIndexTests(TestCase):
+    TEXT = ('Organised a city-wide charity marathon that raised funds for the children hospital '
+            'and coordinated forty volunteers over three weekends')
+
+    def setUp(self):
+        self.author = User.objects.create_user('dedup-author', password='x', school_name='NIS')
+        self.copier = User.objects.create_user('dedup-copier', password='x', school_name='NIS')
+
+    def _add(self, user, description):
+        ach = Achievement.objects.create(user=user, title='Charity marathon', category='social',
+                                         description=description)
+        return ach, index_achievement(ach)
+
+    def test_near_copy_is_found_and_reindex_replaces_buckets(self):
+        original, _ = self._add(self.author, self.TEXT)
+        _, fingerprint = self._add(self.copier, self.TEXT.replace('forty', 'fourty') + '!')
+        self.assertEqual(fingerprint.near_duplicate_of_id, original.id)
+        self.assertGreaterEqual(fingerprint.similarity, 0.8)
+
+        # автор переписал описание - старые корзины не должны находить копию
+        original.description = 'Played the violin solo at the regional spring concert of the music school'
+        original.save()
+        index_achievement(original)
+        index_achievement(original)
+        self.assertEqual(LSHBucket.objects.filter(achievement=original).count(), BANDS)
+
+        _, fingerprint = self._add(self.copier, self.TEXT)
+        self.assertIsNone(fingerprint.near_duplicate_of_id)
+
+
+class ApiValidatorTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('etag-student', password='x', school_name='NIS', soc_coins=70)
+        self.other = User.objects.create_user('etag-other', password='x', school_name='NIS', soc_coins=900)
+        self.client.force_login(self.user)
+
+    def test_due_score_refresh_changes_profile_etag(self):
+        earlier, _ = (
+            Achievement.objects.create(user=self.user, title='Robotics cup', category='research',
+                                       scale='national', role_type='winner', status='approved')
+            for _ in range(2)
+        )
+        first = self.client.get('/api/v1/profile/')
+
+        # первая ачивка вышла из окна повторов, вторая больше не штрафуется; планировщик не запускался
+        Achievement.objects.filter(pk=earlier.pk).update(created_at=timezone.now() - timedelta(days=400))
+        UserScore.objects.filter(user=self.user).update(next_refresh_at=timezone.now() - timedelta(seconds=1))
+        second = self.client.get('/api/v1/profile/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertGreater(second.json()['social_gpa'], first.json()['social_gpa'])
+        self.assertEqual(self.client.get('/api/v1/profile/', HTTP_IF_NONE_MATCH=second['ETag']).status_code, 304)
+
+    def test_soc_coins_only_for_owner(self):
+        self.assertEqual(self.client.get('/api/v1/profile/').json()['soc_coins'], 70)
+        self.assertNotIn('soc_coins', self.client.get(f'/api/v1/profile/{self.other.pk}/').json())
+
+    def test_expired_events_change_events_etag(self):
+        now = timezone.now()
+        Event.objects.create(title='Ends soon', organizer='o', category='c', date='-', location='l', link='#',
+                             starts_at=now - timedelta(days=1), ends_at=now + timedelta(hours=1))
+        first = self.client.get('/api/v1/events/')
+        self.assertEqual(len(first.json()['results']), 1)
+
+        with mock.patch('django.utils.timezone.now', return_value=now + timedelta(hours=2)):
+            second = self.client.get('/api/v1/events/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()['results'], [])
+
+
+class RankIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = RankIndex()
+        # user_id, school, gpa
+        self.index.load([(1, 'A', 30.0), (2, 'A', 20.0), (3, 'B', 20.0), (4, 'B', 10.0), (5, 'A', None)])
+
+    def test_rank_percentile_and_neighbours(self):
+        self.assertEqual([self.index.rank(u) for u in (1, 2, 3, 4, 5)], [1, 2, 2, 4, 5])
+        self.assertEqual(self.index.rank(2, school=True), 2)
+        self.assertEqual(self.index.size(3, school=True), 2)
+        self.assertEqual(self.index.percentile(1), 100)
+        self.assertEqual(self.index.percentile(5), 20)
+        self.assertEqual(self.index.neighbours(2, k=1), [(1, 1, 30.0), (2, 2, 20.0), (2, 3, 20.0)])
+
+    def test_update_moves_between_schools(self):
+        self.index.update(4, 'A', 25.0)
+        self.assertEqual(self.index.rank(4), 2)
+        self.assertEqual(self.index.rank(4, school=True), 2)
+        self.assertEqual(self.index.size(3, school=True), 1)
+        self.assertEqual(self.index.size(4, school=True), 4)
+        self.index.remove(3)
+        self.assertIsNone(self.index.rank(3))
+        self.assertNotIn('B', self.index.schools)
+        self.assertEqual(self.index.size(), 4)
+
+    def test_reconcile_runs_in_background(self):
+        loaded = threading.Event()
+        release = threading.Event()
+
+        def slow_rows():
+            loaded.set()
+            release.wait(5)
+            return [(1, 'A', 5.0)]
+
+        with mock.patch.object(ranks, '_index', self.index), mock.patch.object(ranks, 'load_rows', slow_rows), \
+                override_settings(RANK_INDEX_RECONCILE_SECONDS=0):
+            # запрос не ждёт перезагрузку и отвечает по старому индексу
+            self.assertEqual(ranks.get_rank_index().rank(4), 4)
+            self.assertTrue(loaded.wait(5))
+            self.assertEqual(self.index.size(), 5)
+            release.set()
+            with ranks._load_lock:
+                pass
+        self.assertEqual(self.index.size(), 1)
+
+
+class RankTrackingTests(TestCase):
+    def test_school_and_role_changes_move_the_rank_entry(self):
+        index = ranks.RankIndex()
+        with mock.patch.object(ranks, '_index', index):
+            first = User.objects.create_user('rank-a', password='x', school_name='NIS', role='student')
+            second = User.objects.create_user('rank-b', password='x', school_name='NIS', role='student')
+            ranks.get_rank_index()
+            self.assertEqual(index.size(first.pk, school=True), 2)
+
+            second.school_name = 'BIL'
+            second.save()
+            self.assertEqual(index.size(first.pk, school=True), 1)
+            self.assertEqual(index.users[second.pk][0], 'BIL')
+
+            first.role = 'teacher'
+            first.save()
+            self.assertIsNone(index.rank(first.pk))
+            self.assertEqual(index.size(), 1)
+
+
+class SchoolGpaHistogramTests(TestCase):
+    def buckets(self):
+        return sorted(
+            (school, bucket, n) for school, bucket, n in
+            SchoolGpaBucket.objects.filter(students__gt=0).values_list('school_name', 'bucket', 'students')
+        )
+
+    def test_school_and_role_changes_move_the_student(self):
+        user = User.objects.create_user('histogram-student', password='x', school_name='NIS', role='student')
+        Achievement.objects.create(user=user, title='Chess cup', category='sports', scale='city',
+                                   role_type='winner', status='approved')
+        refresh_user_score(user)
+
+        user.school_name = 'BIL'
+        user.save()
+        incremental = self.buckets()
+        self.assertEqual([school for school, _, _ in incremental], ['BIL'])
+        rebuild_school_rollups()
+        self.assertEqual(incremental, self.buckets())
+
+        user.role = 'teacher'
+        user.save()
+        self.assertEqual(self.buckets(), [])
+
+        user.role = 'student'
+        user.save(update_fields=['role'])
+        self.assertEqual(self.buckets(), incremental)
+
+
+class CleanRowTests(SimpleTestCase):
+    ROW = {'username': 'st', 'title': ' Robotics cup ', 'category': 'research', 'subcategory': 'Olympiads'}
+
+    def test_valid_row_is_normalized(self):
+        data = clean_row({**self.ROW, 'created_at': '2025-03-01T10:00:00', 'duration_months': '-3'},
+                         require_proof=False)
+        self.assertEqual(data['title'], 'Robotics cup')
+        self.assertTrue(timezone.is_aware(data['created_at']))
+        self.assertEqual(data['duration_months'], 0)
+        self.assertEqual(clean_row({'username': 'st', 'title': 'x', 'description': 'why'}, False)['category'], 'other')
+
+    def test_invalid_rows_are_rejected(self):
+        for row, require_proof in (
+            ({**self.ROW, 'username': ''}, False),
+            ({**self.ROW, 'category': 'magic'}, False),
+            ({**self.ROW, 'subcategory': ''}, False),
+            ({'username': 'st', 'title': 'x', 'category': 'other'}, False),
+            ({**self.ROW, 'created_at': 'yesterday'}, False),
+            ({**self.ROW, 'scale': 'galactic'}, False),
+            ({**self.ROW, 'duration_months': 'six'}, False),
+            (self.ROW, True),
+        ):
+            with self.assertRaises(RowError, msg=row):
+                clean_row(row, require_proof=require_proof)
+
+
+@local_analyzer
+class ImportTests(TestCase):
+    COLUMNS = ['username', 'title', 'category', 'subcategory', 'description']
+    TEXT = 'Led the school team to the regional robotics final and built the autonomous line follower'
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.first = User.objects.create_user('import-first', password='x', school_name='NIS')
+        self.second = User.objects.create_user('import-second', password='x', school_name='NIS')
+
+    def _csv(self, rows, name='rows.csv', mode='w'):
+        path = os.path.join(self.dir, name)
+        with open(path, mode, newline='') as f:
+            writer = csv.writer(f)
+            if mode == 'w':
+                writer.writerow(self.COLUMNS)
+            writer.writerows(rows)
+        return path
+
+    def test_side_effects_and_duplicates_go_to_review(self):
+        path = self._csv([
+            ['import-first', 'Robotics final', 'research', 'Olympiads', self.TEXT],
+            ['import-second', 'Robotics final', 'research', 'Olympiads', self.TEXT],
+            ['import-second', 'Chess club', 'sports', 'Chess', 'Weekly chess club captain for two years'],
+        ])
+        importer, _, _ = import_file(path, require_proof=False, batch_size=10, workers=1)
+        self.assertEqual((importer.imported, importer.failed, importer.flagged), (3, 0, 1))
+
+        copied = Achievement.objects.get(user=self.second, title='Robotics final')
+        self.assertEqual(copied.status, 'pending')
+        self.assertEqual(copied.fingerprint.near_duplicate_of.user, self.first)
+
+        approved = list(Achievement.objects.filter(status='approved'))
+        self.assertEqual(len(approved), 2)
+        for user in (self.first, self.second):
+            user.refresh_from_db()
+            self.assertEqual(user.soc_coins, sum(achievement_coins(a) for a in approved if a.user_id == user.pk))
+        self.assertEqual(sum(SchoolCategoryMonth.objects.values_list('achievements', flat=True)), 2)
+        self.assertEqual(sorted(ActivityEvent.objects.values_list('title', flat=True)),
+                         ['Chess club', 'Robotics final'])
+        self.assertFalse(UserScore.objects.filter(next_refresh_at__gt=timezone.now()).exists())
+
+    def test_resume_continues_after_checkpoint(self):
+        path = self._csv([
+            ['import-first', 'Debate cup', 'creative', 'Debate', ''],
+            ['nobody', 'Debate cup', 'creative', 'Debate', ''],
+        ])
+        importer, start_after, errors_path = import_file(path, require_proof=False, batch_size=1, workers=1)
+        self.assertEqual((importer.imported, importer.failed, start_after), (1, 1, 0))
+        with open(path + '.checkpoint') as f:
+            self.assertEqual(json.load(f)['line'], 3)
+
+        self._csv([['import-second', 'Art fair', 'creative', 'Art', '']], mode='a')
+        importer, start_after, _ = import_file(path, require_proof=False, batch_size=1, workers=1)
+        self.assertEqual((importer.imported, importer.failed, start_after), (1, 0, 3))
+        self.assertEqual(Achievement.objects.count(), 2)
+        with open(errors_path) as f:
+            self.assertIn('unknown user nobody', f.read())
+
+
+class ScoreRefreshSchedulerTests(TestCase):
+    def test_scores_refresh_only_when_the_repeat_window_shifts(self):
+        now = timezone.now()
+        user = User.objects.create_user('scheduled-student', password='x', school_name='NIS')
+        first, second = (
+            Achievement.objects.create(user=user, title='Robotics cup', category='research', scale='city',
+                                       role_type='winner', status='approved')
+            for _ in range(2)
+        )
+        Achievement.objects.filter(pk=first.pk).update(created_at=now - timedelta(days=300))
+        Achievement.objects.filter(pk=second.pk).update(created_at=now - timedelta(days=10))
+
+        score = refresh_user_score(user, now=now)
+        self.assertEqual(score.next_refresh_at, now - timedelta(days=300) + REPEAT_WINDOW)
+        # пока срок не наступил, планировщик пользователя не трогает
+        self.assertEqual(refresh_due_scores(now=now + timedelta(days=64)), 0)
+        self.assertEqual(UserScore.objects.get(user=user).computed_at, now)
+
+        # первая ачивка вышла из окна повторов -> вторая больше не штрафуется
+        later = now + timedelta(days=66)
+        self.assertEqual(refresh_due_scores(now=later), 1)
+        refreshed = UserScore.objects.get(user=user)
+        self.assertGreater(refreshed.social_gpa, score.social_gpa)
+        self.assertEqual(refreshed.social_gpa, social_gpa_details(user, now=later)[1])
+        # одна ачивка в группе - её выход из окна GPA уже не меняет
+        self.assertIsNone(refreshed.next_refresh_at)
+        self.assertEqual(refresh_due_scores(now=later), 0)
+
+
+class QuestRuleTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('quest-student', password='x', school_name='NIS')
+        self.organizer = Quest.objects.create(title='Organize an event', reward_coins=300, rule_category='social',
+                                              rule_roles='organizer,leader', rule_min_count=1)
+        self.national = Quest.objects.create(title='Two national results', reward_coins=500,
+                                             rule_min_scale='national', rule_min_count=2)
+        self.manual = Quest.objects.create(title='Manual check', reward_coins=50)
+
+    def _add(self, **fields):
+        return Achievement.objects.create(user=self.user, **{
+            'title': 'Charity fair', 'category': 'social', 'scale': 'school', 'role_type': 'participant',
+            'status': 'approved', **fields,
+        })
+
+    def test_rules_complete_quests_once_and_credit_coins(self):
+        self.assertEqual(award_quests_for_achievement(self._add()), [])
+
+        self.assertEqual(award_quests_for_achievement(self._add(role_type='leader')), [self.organizer])
+        self.assertEqual(award_quests_for_achievement(self._add(scale='national')), [])
+        self.assertEqual(award_quests_for_achievement(self._add(scale='international', category='research')),
+                         [self.national])
+        # уже закрытый квест не засчитывается повторно
+        self.assertEqual(award_quests_for_achievement(self._add(role_type='organizer')), [])
+        self.assertEqual(complete_quests(self.user, [self.organizer, self.national]), [])
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.soc_coins, 800)
+        self.assertEqual(
+            sorted(QuestCompletion.objects.filter(user=self.user).values_list('quest__title', flat=True)),
+            ['Organize an event', 'Two national results'],
+        )
+        self.assertEqual(quest_progress(self.national, self.user), 2)
+
+    def test_pending_achievements_do_not_count(self):
+        self.assertEqual(award_quests_for_achievement(self._add(role_type='leader', status='pending')), [])
+        self.assertFalse(QuestCompletion.objects.exists())
+
+
+class RecommendationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        common = dict(date='-', link='#', starts_at=now + timedelta(days=5), ends_at=now + timedelta(days=6))
+        self.olympiad = Event.objects.create(title='STEM Olympiad', organizer='Ministry', category='Competition',
+                                             location='Astana', **common)
+        self.volunteering = Event.objects.create(title='Volunteering Week', organizer='Green Earth NGO',
+                                                 category='Volunteering', location='Your city', **common)
+        Event.objects.create(title='Past football tournament', organizer='Club', category='Sports', location='Almaty',
+                             date='-', link='#', starts_at=now - timedelta(days=9), ends_at=now - timedelta(days=8))
+        self.user = User.objects.create_user('recs-student', password='x', school_name='NIS')
+        for _ in range(3):
+            Achievement.objects.create(user=self.user, title='Physics olympiad', category='research',
+                                       scale='national', status='approved')
+
+    def test_gaps_rank_events_and_results_are_cached(self):
+        with mock.patch('achievements.recommendations.user_gap_vector', wraps=user_gap_vector) as gaps:
+            self.assertEqual(recommend_events(self.user, 'v1'), [self.volunteering, self.olympiad])
+            self.assertEqual(recommend_events(self.user, 'v1'), [self.volunteering, self.olympiad])
+            self.assertEqual(gaps.call_count, 1)
+
+            # новая версия профиля или изменённый каталог - новый ключ кэша
+            recommend_events(self.user, 'v2')
+            self.assertEqual(gaps.call_count, 2)
+            Event.objects.filter(pk=self.olympiad.pk).update(updated_at=timezone.now() + timedelta(seconds=1))
+            recommend_events(self.user, 'v2')
+            self.assertEqual(gaps.call_count, 3)
+
+
+class AdminBigTableTests(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user('admin-student', password='x', school_name='NIS')
+        self.achievements = [
+            Achievement.objects.create(user=self.student, title=f'Essay {i}', category='creative', status='pending')
+            for i in range(5)
+        ]
+
+    def test_estimated_count_only_for_unfiltered_big_tables(self):
+        Achievement.objects.filter(pk=self.achievements[0].pk).delete()
+        qs = Achievement.objects.order_by('pk')
+        with mock.patch.object(EstimatedCountPaginator, 'exact_threshold', 2):
+            # оценка по max(pk) не видит удалённую строку - зато без COUNT(*)
+            self.assertEqual(EstimatedCountPaginator(qs, 2).count, self.achievements[-1].pk)
+            self.assertEqual(EstimatedCountPaginator(qs.filter(status='pending'), 2).count, 4)
+        self.assertEqual(EstimatedCountPaginator(qs, 2).count, 4)
+
+    def test_chunked_actions_cover_the_whole_selection(self):
+        ids = [a.pk for a in self.achievements]
+        self.assertEqual(list(chunked_ids(Achievement.objects.all(), size=2)), [ids[:2], ids[2:4], ids[4:]])
+
+        admin_user = User.objects.create_superuser('admin-root', 'root@example.com', 'x')
+        self.client.force_login(admin_user)
+        response = self.client.post('/admin/achievements/achievement/', {
+            'action': 'approve_selected', '_selected_action': ids[:3],
+        }, follow=True)
+        self.assertContains(response, '3 achievement(s) approved.')
+        self.assertEqual(Achievement.objects.filter(status='approved').count(), 3)
+        self.assertTrue(Achievement.objects.filter(reviewed_by=admin_user).exists())
+        self.assertEqual(self.client.get('/admin/achievements/achievement/').status_code, 200)
+
+
+class AdmissionControlTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+
+    def _controller(self, **options):
+        options = {'rate_per_minute': 60, 'burst': 2, 'max_concurrent': 5, 'slot_ttl': 30, **options}
+        return AdmissionController(os.path.join(self.dir, 'admission.sqlite3'), **options)
+
+    def test_token_bucket_is_shared_between_workers(self):
+        first, second = self._controller(), self._controller()
+        self.assertIsNotNone(first.try_acquire(now=1000.0))
+        self.assertIsNotNone(second.try_acquire(now=1000.0))
+        self.assertIsNone(first.try_acquire(now=1000.5))
+        # 1 токен в секунду
+        self.assertIsNotNone(second.try_acquire(now=1001.6))
+        stats = first.stats()
+        self.assertEqual((stats['admitted'], stats['rejected_rate'], stats['in_flight']), (3, 1, 3))
+
+    def test_concurrency_limit_and_expired_slots(self):
+        controller = self._controller(burst=10, max_concurrent=1)
+        slot = controller.try_acquire(now=1000.0)
+        self.assertIsNone(controller.try_acquire(now=1001.0))
+        controller.release(slot)
+        self.assertIsNotNone(controller.try_acquire(now=1002.0))
+        # слот упавшего воркера освобождается по TTL
+        self.assertIsNotNone(controller.try_acquire(now=1040.0))
+        stats = controller.stats()
+        self.assertEqual((stats['rejected_concurrency'], stats['expired_slots'], stats['in_flight']), (1, 1, 1))
+
+    def test_admit_releases_the_slot(self):
+        controller = self._controller(max_concurrent=1)
+        with controller.admit() as admitted:
+            self.assertTrue(admitted)
+            with controller.admit() as nested:
+                self.assertFalse(nested)
+        self.assertEqual(controller.stats()['in_flight'], 0)
+
+
+@mock.patch('achievements.analyzers.ai_admission')
+class AnalyzerBatchingTests(SimpleTestCase):
+    def _items(self, n):
+        return [analysis_item('Student', f'Olympiad {i}', 'research', 'national olympiad') for i in range(n)]
+
+    def test_one_prompt_per_batch_and_local_fallback_per_item(self, admission):
+        backend = ChatCompletionsAnalyzer('http://ai.invalid/v1/chat/completions', 'model')
+
+        def reply(system_msg, payload, attachments):
+            ids = [item['id'] for item in payload['items']]
+            # второй элемент пачки провайдер потерял
+            return {'results': [{'id': i, 'category': 'social', 'total_score': 77} for i in ids if i != 1]}
+
+        with mock.patch.object(backend, '_post', side_effect=reply) as post:
+            results = analyze_items(self._items(5), backend=backend, batch_size=3)
+
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual([len(call.args[1]['items']) for call in post.call_args_list], [3, 2])
+        self.assertEqual([r['provider'] for r in results],
+                         ['openai_compatible', 'local_fallback', 'openai_compatible', 'openai_compatible',
+                          'local_fallback'])
+        self.assertEqual(results[0]['total_score'], 77)
+        self.assertEqual(results[0]['scale'], 'school')  # дефолты дозаполнены
+
+    def test_rejected_admission_analyzes_locally(self, admission):
+        admission.return_value.admit.return_value.__enter__.return_value = False
+        backend = ChatCompletionsAnalyzer('http://ai.invalid/v1/chat/completions', 'model')
+        with mock.patch.object(backend, '_post') as post:
+            results = analyze_items(self._items(2), backend=backend)
+        post.assert_not_called()
+        self.assertEqual({r['provider'] for r in results}, {'local_fallback'})
+
+    def test_coalescer_sends_concurrent_requests_together(self, admission):
+        calls = []
+
+        def fake_analyze(items):
+            calls.append(len(items))
+            return [{'title': item['title']} for item in items]
+
+        coalescer = BatchCoalescer(window_ms=500, batch_size=3)
+        with mock.patch('achievements.analyzers.analyze_items', side_effect=fake_analyze):
+            futures = [coalescer.submit(item) for item in self._items(3)]
+            results = [future.result(timeout=5) for future in futures]
+        self.assertEqual(calls, [3])
+        self.assertEqual([r['title'] for r in results], ['Olympiad 0', 'Olympiad 1', 'Olympiad 2'])
+
+
+@mock.patch('achievements.analyzers.ai_admission')
+class AiSimulatorTests(SimpleTestCase):
+    def _serve(self, **options):
+        options = {'latency_ms': 0, 'jitter_ms': 0, 'distribution': 'fixed', 'error_rate': 0.0,
+                   'timeout_rate': 0.0, 'hang_seconds': 0, 'malformed_rate': 0.0, 'seed': 1, **options}
+        sim = Simulator(**options)
+        server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(sim))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        backend = ChatCompletionsAnalyzer(f'http://127.0.0.1:{server.server_port}/v1/chat/completions', 'sim',
+                                          timeout=5)
+        return sim, backend
+
+    def _items(self):
+        return [analysis_item('Student', title, 'other', 'volunteer at the city NGO')
+                for title in ('Food bank', 'Beach cleanup', 'Tutoring')]
+
+    def test_batched_prompt_is_answered_in_analyzer_format(self, admission):
+        sim, backend = self._serve()
+        results = analyze_items(self._items(), backend=backend, batch_size=8)
+        self.assertEqual({r['provider'] for r in results}, {'openai_compatible'})
+        self.assertEqual({r['category'] for r in results}, {'social'})
+        self.assertEqual((sim.stats['requests'], sim.stats['items']), (1, 3))
+
+    def test_injected_failures_fall_back_locally(self, admission):
+        for options in ({'malformed_rate': 1.0}, {'error_rate': 1.0}):
+            sim, backend = self._serve(**options)
+            with mock.patch('builtins.print'):
+                results = analyze_items(self._items(), backend=backend)
+            self.assertEqual({r['provider'] for r in results}, {'local_fallback'}, options)
+            self.assertEqual(sim.stats['requests'], 1)
+
+    def test_loadtest_percentile(self, admission):
+        self.assertEqual(percentile([], 95), 0.0)
+        self.assertEqual(percentile([4, 1, 3, 2], 50), 2.5)
+        self.assertEqual(percentile(list(range(101)), 99), 99)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=media)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        self.user = User.objects.create_user('export-student', password='x', school_name='NIS',
+                                             first_name='Aru', last_name='Sm')
+        other = User.objects.create_user('export-other', password='x', school_name='NIS')
+        self.with_proof = Achievement(user=self.user, title='Science fair, "gold"', category='research',
+                                      description='Line one\nline two', status='approved')
+        self.with_proof.proof_file.save('cert.png', ContentFile(b'\x89PNG' + b'x' * 70000), save=False)
+        self.with_proof.save()
+        self.plain = Achievement.objects.create(user=self.user, title='Debate', category='creative')
+        Achievement.objects.create(user=other, title='Not mine', category='sports')
+        self.client.force_login(self.user)
+
+    def _body(self, response):
+        self.assertIsInstance(response, StreamingHttpResponse)
+        return b''.join(response.streaming_content)
+
+    def test_csv_and_jsonl_stream_only_own_rows(self):
+        response = self.client.get('/profile/export.csv')
+        self.assertIn('attachment; filename="', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(self._body(response).decode('utf-8'))))
+        self.assertEqual([r['title'] for r in rows], ['Science fair, "gold"', 'Debate'])
+        self.assertEqual(rows[0]['description'], 'Line one\nline two')
+        self.assertEqual(rows[0]['proof_file'], f'proofs/{self.with_proof.id}-cert.png')
+        self.assertEqual(rows[0]['full_name'], 'Aru Sm')
+
+        lines = self._body(self.client.get('/profile/export.jsonl')).decode('utf-8').splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [self.with_proof.id, self.plain.id])
+        self.assertEqual(self.client.get('/profile/export.xml').status_code, 404)
+
+    def test_zip_is_streamed_in_chunks_with_proofs(self):
+        chunks = list(iter_zip(export_queryset(user=self.user)))
+        self.assertGreater(len([c for c in chunks if c]), 2)
+        with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as archive:
+            self.assertEqual(archive.namelist(), ['achievements.csv', f'proofs/{self.with_proof.id}-cert.png'])
+            self.assertEqual(archive.read(f'proofs/{self.with_proof.id}-cert.png')[:4], b'\x89PNG')
+            self.assertEqual(len(list(csv.DictReader(io.StringIO(archive.read('achievements.csv').decode())))), 2)
+
+    def test_school_export_requires_a_reviewer(self):
+        self.assertEqual(self.client.get('/school/export.csv').status_code, 403)
+        teacher = User.objects.create_user('export-teacher', password='x', school_name='NIS', role='teacher')
+        self.client.force_login(teacher)
+        rows = list(csv.DictReader(io.StringIO(self._body(self.client.get('/school/export.csv')).decode())))
+        self.assertEqual(len(rows), 3)
+
+
+class WarmUpTests(TestCase):
+    def test_lazy_imports_stay_lazy_without_warm_up(self):
+        script = (
+            "import sys, django; django.setup();"
+            "from django.urls import get_resolver; get_resolver().url_patterns;"
+            "print('requests' in sys.modules, 'PIL' in sys.modules)"
+        )
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'socgpa.settings', 'AI_PROVIDER': 'LOCAL',
+               'WARMUP_ON_READY': 'False'}
+        result = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True, text=True,
+                                cwd=settings.BASE_DIR, check=True)
+        self.assertEqual(result.stdout.split(), ['False', 'False'])
+
+    def test_warm_up_seeds_catalogs_and_loads_ranks(self):
+        student = User.objects.create_user('warm-student', password='x', school_name='NIS')
+        index = RankIndex()
+        # сиды once_per_process могли отработать в других тестах - зовём сами функции
+        seeds = {name: getattr(views, name).__wrapped__
+                 for name in ('ensure_default_shop_items', 'ensure_default_quests', 'ensure_default_events')}
+        with mock.patch.multiple(views, **seeds), mock.patch.object(ranks, '_index', index), \
+                mock.patch('achievements.warmup.connections') as connections, \
+                override_settings(WARMUP_ON_READY=True):
+            warm_up_application()
+
+        connections.close_all.assert_called_once()
+        self.assertTrue(ShopItem.objects.exists())
+        self.assertTrue(Quest.objects.exists())
+        self.assertFalse(Event.objects.filter(profile_vector__isnull=True).exists())
+        self.assertEqual(upcoming_events().count(), Event.objects.count())
+        self.assertEqual(index.rank(student.pk), 1)
+
+    def test_warm_up_can_be_disabled_and_survives_missing_tables(self):
+        with mock.patch('achievements.warmup.warm_database') as warm_database, \
+                override_settings(WARMUP_ON_READY=False):
+            warm_up_application()
+        warm_database.assert_not_called()
+
+        with mock.patch('achievements.warmup.warm_database', side_effect=DatabaseError('no such table')), \
+                mock.patch('achievements.warmup.connections') as connections, \
+                override_settings(WARMUP_ON_READY=True), self.assertLogs('achievements.warmup', 'WARNING'):
+            warm_up_application()
+        connections.close_all.assert_called_once()
+
+
+class ActivityFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('feed-student', password='x', school_name='NIS')
+        self.outsider = User.objects.create_user('feed-outsider', password='x', school_name='BIL')
+        now = timezone.now()
+        same_time = now - timedelta(hours=7)
+        self.events = record([
+            ActivityEvent(school_name='NIS', user=self.user, kind='achievement', title=f'Event {i}', amount=i,
+                          created_at=same_time if i in (2, 3) else now - timedelta(hours=10 - i))
+            for i in range(5)
+        ])
+        record([ActivityEvent(school_name='BIL', user=self.outsider, kind='quest', title='Elsewhere', amount=1)])
+
+    def test_keyset_pages_cover_the_feed_newest_first(self):
+        seen, before = [], None
+        while True:
+            items, next_before = feed_page('NIS', before=before, limit=2)
+            seen += [item['title'] for item in items]
+            if not next_before:
+                break
+            before = cursor_position(next_before)
+        # одинаковое время - порядок по id, без пропусков и повторов на границе страниц
+        self.assertEqual(seen, ['Event 4', 'Event 3', 'Event 2', 'Event 1', 'Event 0'])
+
+    def test_first_page_is_cached_until_a_new_event(self):
+        feed_page('NIS')
+        with self.assertNumQueries(1):  # только версия
+            items, _ = feed_page('NIS')
+        self.assertEqual(len(items), 5)
+
+        approved = Achievement.objects.create(user=self.user, title='Fresh result', category='social',
+                                              status='approved')
+        items, _ = feed_page('NIS')
+        self.assertEqual(items[0]['title'], approved.title)
+        self.assertEqual(items[0]['user']['username'], 'feed-student')
+
+    def test_feed_api_is_scoped_to_the_school(self):
+        self.client.force_login(self.outsider)
+        response = self.client.get('/api/v1/feed/')
+        self.assertEqual([item['title'] for item in response.json()['results']], ['Elsewhere'])
+        self.assertEqual(self.client.get('/school/feed/').status_code, 200)
+
+
+class UserPageConditionalTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('page-student', password='x', school_name='NIS')
+        self.other = User.objects.create_user('page-other', password='x', school_name='NIS')
+        self.client.force_login(self.user)
+
+    def get_with_etag(self, url):
+        # первый показ считает GPA и уходит без валидаторов
+        self.assertFalse(self.client.get(url).has_header('ETag'))
+        response = self.client.get(url)
+        self.assertTrue(response.has_header('ETag'))
+        return response
+
+    def test_unchanged_pages_answer_304(self):
+        self.get_with_etag('/')
+        self.get_with_etag(f'/profile/{self.other.pk}/')
+        for url in ('/', '/profile/', f'/profile/{self.other.pk}/'):
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+    def test_new_achievement_changes_the_page(self):
+        first = self.get_with_etag('/profile/')
+        Achievement.objects.create(user=self.user, title='Debate league', category='social', status='approved')
+        second = self.client.get('/profile/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertContains(second, 'Debate league')
+        self.assertNotEqual(self.client.get('/profile/')['ETag'], first['ETag'])
+
+    def test_due_score_disables_validators(self):
+        self.get_with_etag('/')
+        UserScore.objects.filter(user=self.user).update(next_refresh_at=timezone.now() - timedelta(seconds=1))
+        request = RequestFactory().get('/')
+        request.user = self.user
+        self.assertEqual(views.user_page_state(request), (None, None))
+        self.get_with_etag('/')
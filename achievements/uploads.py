@@ -0,0 +1,111 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.db.models import F
+
+
+# ---------- Приём пруфов: лимиты по мере прихода чанков ----------
+# ProofUploadHandler стоит первым в FILE_UPLOAD_HANDLERS: первый чанк proof_file сверяется
+# по сигнатуре, счётчик байт - с лимитом и остатком квоты. Отвергнутый файл не доходит до
+# Memory/TemporaryFileUploadHandler (или удаляется вместе с их временным файлом).
+
+PROOF_FIELD = 'proof_file'
+# запас на остальные поля формы, когда решаем по Content-Length всего запроса
+FORM_OVERHEAD = 64 * 1024
+MB = 1024 * 1024
+
+SIGNATURES = [
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+]
+ALLOWED_LABEL = "PDF, PNG, JPEG, GIF or WebP"
+
+
+def sniff_mime(head):
+    for magic, mime in SIGNATURES:
+        if head.startswith(magic):
+            return mime
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+def max_upload_bytes():
+    return int(settings.PROOF_MAX_UPLOAD_MB * MB)
+
+
+def quota_left(user):
+    from accounts.models import User
+
+    used = User.objects.filter(pk=user.pk).values_list('storage_used', flat=True).first() or 0
+    return max(int(settings.PROOF_USER_QUOTA_MB * MB) - used, 0)
+
+
+def upload_limit(user):
+    # (лимит в байтах, сообщение при превышении)
+    limit = max_upload_bytes()
+    if user is not None and user.is_authenticated:
+        left = quota_left(user)
+        if left < limit:
+            return left, f"Storage quota exceeded: {settings.PROOF_USER_QUOTA_MB:g} MB per student."
+    return limit, f"Proof file is too large (max {settings.PROOF_MAX_UPLOAD_MB:g} MB)."
+
+
+def add_storage_usage(user_id, delta):
+    from accounts.models import User
+
+    if delta:
+        User.objects.filter(pk=user_id).update(storage_used=F('storage_used') + delta)
+
+
+def validate_proof(upload, user=None):
+    # Та же проверка по уже принятому файлу - на случай, если обработчик не установлен
+    limit, message = upload_limit(user)
+    if upload.size > limit:
+        raise ValidationError(message)
+    upload.seek(0)
+    head = upload.read(16)
+    upload.seek(0)
+    if sniff_mime(head) is None:
+        raise ValidationError(f"Unsupported proof file type. Allowed: {ALLOWED_LABEL}.")
+
+
+class ProofUploadHandler(FileUploadHandler):
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.request_length = content_length or 0
+        self.limit = None
+        return None
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.active = field_name == PROOF_FIELD
+        if not self.active:
+            return
+        if self.limit is None:
+            self.limit, self.limit_message = upload_limit(getattr(self.request, 'user', None))
+        self.received = 0
+        # Content-Length уже больше лимита - файл не читаем вовсе
+        if self.request_length > self.limit + FORM_OVERHEAD:
+            self.reject(self.limit_message)
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+        if start == 0 and sniff_mime(raw_data[:16]) is None:
+            self.reject(f"Unsupported proof file type. Allowed: {ALLOWED_LABEL}.")
+        self.received += len(raw_data)
+        if self.received > self.limit:
+            self.reject(self.limit_message)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+    def reject(self, message):
+        # причина уходит в форму через request, сам файл Django дочитывает вхолостую
+        self.request.proof_upload_error = message
+        raise SkipFile(message)
@@ -1,17 +1,11 @@
 import os
 import base64
-import json
-import requests
-from requests.exceptions import RequestException, Timeout, HTTPError
+
+from .weights import get_weights
 
 # По умолчанию работаем ТОЛЬКО на локальном анализе.
 # Если захочешь вернуть OpenRouter — в Render Environment поставь AI_PROVIDER=OPENROUTER
-AI_PROVIDER = os.environ.get("AI_PROVIDER", "LOCAL").upper()
-OPENROUTER_API_KEY = os.environ.get("OPENROUTER_API_KEY")
-
-OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
-OPENROUTER_MODEL = "z-ai/glm-4.5-air:free"
-OPENROUTER_TIMEOUT = 40  # должно быть меньше gunicorn timeout
+# (выбор бэкенда и настройки провайдеров - в analyzers.py)
 
 
 def encode_file_to_base64(file_path):
@@ -60,6 +54,22 @@ def build_gap_recommendations(main_category, profile_summary):
 
 # ---------- Локальный fallback-анализ (без внешних зависимостей) ----------
 
+# Порядок важен: побеждает первое совпадение
+CATEGORY_KEYWORDS = [
+    ("research", ["олимпиад", "olymp", "competition", "contest", "hackathon", "research"]),
+    ("social", ["volunteer", "волонтер", "волонтёр", "ngo", "community service"]),
+    ("creative", ["art", "music", "dance", "drawing", "creative", "debate", "mun"]),
+    ("sports", ["sport", "football", "basketball", "swimming", "tournament"]),
+    ("competence", ["leader", "leadership", "soft skills", "teamwork", "mentor"]),
+]
+
+SCALE_KEYWORDS = [
+    ("international", ["international", "междунар", "world", "global"]),
+    ("national", ["national", "республикан", "country-wide"]),
+    ("city", ["city", "regional", "обл", "город"]),
+]
+
+
 def local_fallback_analysis(user_full_name, title, category_hint, description, profile_summary=None):
     text = f"{title or ''} {description or ''}".lower()
 
@@ -67,28 +77,16 @@ def local_fallback_analysis(user_full_name, title, category_hint, description, p
     if category_hint and category_hint != 'other':
         category = category_hint
     else:
-        if any(w in text for w in ["олимпиад", "olymp", "competition", "contest", "hackathon", "research"]):
-            category = "research"
-        elif any(w in text for w in ["volunteer", "волонтер", "волонтёр", "ngo", "community service"]):
-            category = "social"
-        elif any(w in text for w in ["art", "music", "dance", "drawing", "creative", "debate", "mun"]):
-            category = "creative"
-        elif any(w in text for w in ["sport", "football", "basketball", "swimming", "tournament"]):
-            category = "sports"
-        elif any(w in text for w in ["leader", "leadership", "soft skills", "teamwork", "mentor"]):
-            category = "competence"
-        else:
-            category = "other"
+        category = next(
+            (cat for cat, words in CATEGORY_KEYWORDS if any(w in text for w in words)),
+            "other",
+        )
 
     # Масштаб
-    if any(w in text for w in ["international", "междунар", "world", "global"]):
-        scale = "international"
-    elif any(w in text for w in ["national", "республикан", "country-wide"]):
-        scale = "national"
-    elif any(w in text for w in ["city", "regional", "обл", "город"]):
-        scale = "city"
-    else:
-        scale = "school"
+    scale = next(
+        (sc for sc, words in SCALE_KEYWORDS if any(w in text for w in words)),
+        "school",
+    )
 
     # Роль
     if any(w in text for w in ["founder", "co-founder", "president", "captain", "chair", "leader"]):
@@ -107,12 +105,7 @@ def local_fallback_analysis(user_full_name, title, category_hint, description, p
     if any(w in text for w in ["1 year", "12 months", "год", "12 месяцев"]):
         duration_months = 12
 
-    scores = {
-        "category": 20 if category in ["research", "competence"] else 15,
-        "scale": {"school": 5, "city": 10, "national": 15, "international": 20}.get(scale, 5),
-        "role": {"participant": 5, "winner": 15, "organizer": 12, "leader": 18}.get(role_type, 5),
-        "duration": min(duration_months, 12) * (20 / 12),
-    }
+    scores = get_weights().analysis_scores(category, scale, role_type, duration_months)
     total_score = round(sum(scores.values()), 1)
 
     feedback = (
@@ -135,92 +128,6 @@ def local_fallback_analysis(user_full_name, title, category_hint, description, p
     }
 
 
-# ---------- OpenRouter (опционально, но не обязателен для работы) ----------
-
-def call_openrouter_analyzer(user_full_name, title, category_hint, description, file_b64, profile_summary):
-    if not OPENROUTER_API_KEY:
-        raise RuntimeError("No OPENROUTER_API_KEY")
-
-    system_msg = (
-        "You are SocGPA.AI, an expert evaluator for a student Social GPA platform.\n"
-        "Return ONLY JSON with keys: "
-        "{category, scale, role_type, duration_months, scores, total_score, feedback, missing_recommendations}."
-    )
-
-    user_payload = {
-        "student_name": user_full_name,
-        "title": title,
-        "category_hint": category_hint,
-        "description": description,
-        "profile_summary": profile_summary or {},
-    }
-
-    messages = [
-        {"role": "system", "content": system_msg},
-        {"role": "user", "content": json.dumps(user_payload)},
-    ]
-
-    data = {
-        "model": OPENROUTER_MODEL,
-        "messages": messages,
-        "temperature": 0.2,
-        "response_format": {"type": "json_object"},
-    }
-
-    if file_b64:
-        data["attachments"] = [
-            {
-                "type": "image",
-                "data": file_b64,
-                "mime_type": "image/png",
-            }
-        ]
-
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-        "Referer": "https://socgpa.ai",
-        "X-Title": "SocGPA.AI",
-    }
-
-    try:
-        resp = requests.post(
-            OPENROUTER_URL,
-            headers=headers,
-            json=data,
-            timeout=OPENROUTER_TIMEOUT,
-        )
-        resp.raise_for_status()
-        content = resp.json()["choices"][0]["message"]["content"]
-        result = json.loads(content)
-    except (Timeout, HTTPError, RequestException, KeyError, ValueError) as e:
-        # Любая проблема -> пусть выше решит уйти на fallback.
-        print("AI error (OpenRouter), will use local fallback instead:", repr(e))
-        raise
-
-    # Заполняем дефолты, чтобы не было KeyError
-    defaults = {
-        "category": "other",
-        "scale": "school",
-        "role_type": "participant",
-        "duration_months": 0,
-        "scores": {
-            "category": 10,
-            "scale": 10,
-            "role": 10,
-            "duration": 10,
-        },
-        "total_score": 40,
-        "feedback": "Solid achievement.",
-        "missing_recommendations": [],
-    }
-    for k, v in defaults.items():
-        result.setdefault(k, v)
-
-    result["provider"] = "openrouter"
-    return result
-
-
 # ---------- Главная точка входа (гарантированный результат) ----------
 
 def analyze_achievement_with_ai(
@@ -231,38 +138,12 @@ def analyze_achievement_with_ai(
     file_path=None,
     profile_summary=None
 ):
-    file_b64 = encode_file_to_base64(file_path) if file_path else None
-    desc = description or ""
+    # Бэкенд (локальные правила / OpenRouter / OpenAI-совместимый сервер) и пакетирование -
+    # в analyzers.py; любая ошибка там уже заканчивается локальным анализом.
+    from .analyzers import analysis_item, analyze
 
-    # 1) Опционально пробуем OpenRouter, только если ЯВНО включен и есть ключ.
-    use_remote = (
-        AI_PROVIDER == "OPENROUTER"
-        and bool(OPENROUTER_API_KEY)
-    )
-
-    if use_remote:
-        try:
-            return call_openrouter_analyzer(
-                user_full_name,
-                title,
-                category,
-                desc,
-                file_b64,
-                profile_summary,
-            )
-        except Exception:
-            # Любая ошибка -> просто лог и идём на локальный анализ.
-            pass
-
-    # 2) Всегда делаем локальный анализ как основной / резервный вариант.
     try:
-        return local_fallback_analysis(
-            user_full_name,
-            title,
-            category,
-            desc,
-            profile_summary,
-        )
+        return analyze(analysis_item(user_full_name, title, category, description, file_path, profile_summary))
     except Exception as e:
         # На всякий пожарный: даже если внутри fallback что-то сломают,
         # пользователь всё равно получит валидный JSON, а не 500.
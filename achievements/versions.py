@@ -0,0 +1,33 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import EntityVersion
+
+
+# ---------- Версии сущностей для ETag ----------
+# Проверка If-None-Match читает только эту маленькую таблицу, не трогая ачивки/юзеров.
+
+def user_key(user_id):
+    return f"user:{user_id}"
+
+
+def bump(*keys):
+    now = timezone.now()
+    for key in set(keys):
+        updated = EntityVersion.objects.filter(key=key).update(version=F('version') + 1, updated_at=now)
+        if not updated:
+            try:
+                with transaction.atomic():
+                    EntityVersion.objects.create(key=key)
+            except IntegrityError:
+                EntityVersion.objects.filter(key=key).update(version=F('version') + 1, updated_at=now)
+
+
+def get_versions(*keys):
+    # {key: (version, updated_at)}; для ещё не менявшихся сущностей - (0, None)
+    rows = EntityVersion.objects.filter(key__in=keys).values_list('key', 'version', 'updated_at')
+    versions = {key: (0, None) for key in keys}
+    for key, version, updated_at in rows:
+        versions[key] = (version, updated_at)
+    return versions
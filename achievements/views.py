@@ -1,130 +1,61 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.db import transaction
 from django.db.models import Sum, Q
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
 from accounts.models import User
+from socgpa.db import pin_to_primary, replica_reads
 from .forms import AchievementForm
 from .models import (
-    Achievement,
     ShopItem,
     UserPurchase,
     Quest,
     QuestCompletion,
     Event,
+    ScoreSnapshot,
+    UserScore,
 )
+from .activity import cursor_position, feed_page
+from .api import decode_cursor, encode_cursor
+from .dedup import index_achievement
+from .events import catalog_etag, catalog_feed, catalog_last_modified, events_page, upcoming_events
+from .exports import FORMATS as EXPORT_FORMATS, export_queryset, iter_export
+from .moderation import DECISIONS, achievement_coins, can_moderate, moderate, moderation_queue
+from .proof_hashes import index_proof_image
+from .quests import award_quests_for_achievement, complete_quests, quest_progress
+from .ranks import rank_summary
+from .recommendations import recommend_events
+from .rollups import school_analytics
+from .scoring import downsample_history, get_user_score
 from .utils import analyze_achievement_with_ai
+from .versions import bump, get_versions, user_key
 
-from collections import defaultdict
 from datetime import timedelta
-import math
+import hashlib
+from functools import wraps
 
 
+def once_per_process(func):
+    # Сиды проверяются один раз на воркер (или в мастере при WARMUP_ON_READY),
+    # а не запросом exists() на каждый хит страницы
+    done = []
 
-
-def compute_social_gpa_for_user(user):
-
-    qs = user.achievements.filter(status='approved').order_by('created_at')
-    if not qs.exists():
-        return 0.0, 0.0
-
-    achievements = list(qs)
-
-
-    B = 10.0
-
-
-    W_CAT = {
-        'research': 1.5,
-        'social': 1.4,
-        'creative': 1.1,
-        'sports': 1.1,
-        'competence': 0.9,
-        'other': 0.7,
-    }
-
-    W_SCALE = {
-        'school': 1.0,
-        'city': 1.3,
-        'national': 2.0,
-        'international': 3.0,
-    }
-
-    W_ROLE = {
-        'participant': 0.7,
-        'winner': 1.6,
-        'organizer': 1.6,
-        'leader': 2.0,
-    }
-
-    def w_duration(months):
-
-        try:
-            m = float(months or 0)
-        except (TypeError, ValueError):
-            m = 0.0
-
-        if m <= 0:
-            return 0.7
-        if m <= 1:
-            return 1.0
-        if m <= 4:
-            return 1.3
-        if m <= 6:
-            return 1.7
-        return 2.0
-
-
-    now = timezone.now()
-    year_ago = now - timedelta(days=365)
-
-
-    groups = defaultdict(list)
-
-    for idx, ach in enumerate(achievements):
-        if ach.created_at and ach.created_at >= year_ago:
-            title = (ach.title or "").lower()
-
-            norm = ''.join(ch if (ch.isalnum() or ch.isspace()) else ' ' for ch in title)
-            norm = ' '.join(norm.split()[:6])
-            key = (ach.category or 'other', ach.scale or 'school', norm)
-            groups[key].append(idx)
-
-
-
-    f_repeat = [1.0] * len(achievements)
-
-    for key, idxs in groups.items():
-        if not idxs:
-            continue
-
-        for j, pos in enumerate(sorted(idxs), start=1):
-            f_repeat[pos] = 1.0 / math.sqrt(j)
-
-
-    raw_score = 0.0
-
-    for idx, ach in enumerate(achievements):
-        cat = ach.category or 'other'
-        scale = ach.scale or 'school'
-        role = ach.role_type or 'participant'
-
-        wc = W_CAT.get(cat, 0.7)
-        ws = W_SCALE.get(scale, 1.0)
-        wr = W_ROLE.get(role, 0.7)
-        wd = w_duration(ach.duration_months)
-        fr = f_repeat[idx]
-
-        score_i = B * wc * ws * wr * wd * fr
-        raw_score += score_i
-
-
-    social_gpa = 10.0 * math.log10(1.0 + raw_score)
-    social_gpa = round(social_gpa, 2)
-
-    return raw_score, social_gpa
-
+    @wraps(func)
+    def wrapper():
+        if not done:
+            func()
+            done.append(True)
+    return wrapper
 
 
+@once_per_process
 def ensure_default_shop_items():
     if ShopItem.objects.exists():
         return
@@ -165,8 +96,10 @@ def ensure_default_shop_items():
             discount_info="35% off full course."
         ),
     ])
+    bump('shop')
 
 
+@once_per_process
 def ensure_default_quests():
     if Quest.objects.exists():
         return
@@ -174,62 +107,116 @@ def ensure_default_quests():
         Quest(
             title="Join 2 Debate Tournaments",
             description="Upload 2 verified debate achievements.",
-            reward_coins=500
+            reward_coins=500,
+            rule_category='creative',
+            rule_subcategory="Debate / MUN / public speaking",
+            rule_min_count=2,
         ),
         Quest(
             title="Organize a School Event",
             description="Upload a leadership/organizer certificate.",
-            reward_coins=700
+            reward_coins=700,
+            rule_roles='organizer,leader',
+            rule_min_count=1,
         ),
         Quest(
             title="Complete 10h Volunteering",
             description="Upload volunteering certificate with 10+ hours.",
-            reward_coins=400
+            reward_coins=400,
+            rule_category='social',
+            rule_subcategory="Volunteering projects",
+            rule_min_count=1,
         ),
     ])
+    bump('quests')
 
 
+@once_per_process
 def ensure_default_events():
     if Event.objects.exists():
         return
-    Event.objects.bulk_create([
-        Event(
-            title="National STEM Olympiad",
-            organizer="Ministry of Education",
-            category="Competition",
-            date="March 2026",
-            location="Astana, Kazakhstan",
-            link="#"
-        ),
-        Event(
-            title="Youth Social Impact Hackathon",
-            organizer="FutureLab",
-            category="Hackathon",
-            date="April 2026",
-            location="Online",
-            link="#"
-        ),
-        Event(
-            title="Environmental Volunteering Week",
-            organizer="Green Earth NGO",
-            category="Volunteering",
-            date="May 2026",
-            location="Your city",
-            link="#"
-        ),
-        Event(
-            title="Entrepreneurship Case Championship",
-            organizer="BizUp Academy",
-            category="Competition",
-            date="June 2026",
-            location="Almaty, Kazakhstan",
+    # Даты - от сегодняшнего дня: на свежей установке каталог не должен состоять из прошедших мероприятий
+    today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    seeds = [
+        ("National STEM Olympiad", "Ministry of Education", "Competition", "Astana, Kazakhstan"),
+        ("Youth Social Impact Hackathon", "FutureLab", "Hackathon", "Online"),
+        ("Environmental Volunteering Week", "Green Earth NGO", "Volunteering", "Your city"),
+        ("Entrepreneurship Case Championship", "BizUp Academy", "Competition", "Almaty, Kazakhstan"),
+    ]
+    events = []
+    for months_ahead, (title, organizer, category, location) in enumerate(seeds, start=1):
+        starts_at = today + timedelta(days=30 * months_ahead)
+        events.append(Event(
+            title=title,
+            organizer=organizer,
+            category=category,
+            date=starts_at.strftime("%B %Y"),
+            starts_at=starts_at,
+            ends_at=starts_at + timedelta(days=30),
+            location=location,
             link="#"
-        ),
-    ])
+        ))
+    Event.objects.bulk_create(events)
+    bump('events')
+
+
+
+# ---------- Условный GET для страниц пользователя ----------
+# Страница зависит от версии смотрящего (шапка с монетами) и владельца профиля.
+# 304 отдаётся по таблице версий, до скоринга и рендера шаблона.
+
+def user_page_state(request, user_id=None):
+    state = getattr(request, '_user_page_state', None)
+    if state is None:
+        shown_id = user_id or request.user.pk
+        user_ids = sorted({request.user.pk, shown_id})
+        now = timezone.now()
+        refresh_at = dict(UserScore.objects.filter(user_id__in=user_ids).values_list('user_id', 'next_refresh_at'))
+        if shown_id not in refresh_at or any(at and at <= now for at in refresh_at.values()):
+            # GPA страницы ещё не считали или пора пересчитать -> страница точно изменится, валидаторы не отдаём
+            state = (None, None)
+        else:
+            versions = get_versions(*[user_key(pk) for pk in user_ids])
+            etag = "user-" + "-".join(f"{pk}.{versions[user_key(pk)][0]}" for pk in user_ids)
+            # ранг меняется и от чужих GPA - он из памяти, дёшево положить в ETag
+            etag += "-r" + hashlib.md5(repr(page_rank(request, shown_id)).encode()).hexdigest()[:12]
+            stamps = [updated_at for _, updated_at in versions.values() if updated_at]
+            state = (etag, max(stamps) if len(stamps) == len(user_ids) else None)
+        request._user_page_state = state
+    return state
+
+
+def page_rank(request, user_id):
+    ranks = getattr(request, '_page_ranks', None)
+    if ranks is None:
+        ranks = request._page_ranks = {}
+    if user_id not in ranks:
+        summary = rank_summary(user_id)
+        if summary:
+            names = User.objects.in_bulk([other_id for _, other_id, _ in summary['neighbours']])
+            summary['neighbours'] = [
+                {'rank': rank, 'user': names.get(other_id), 'social_gpa': gpa, 'is_me': other_id == user_id}
+                for rank, other_id, gpa in summary['neighbours']
+            ]
+        ranks[user_id] = summary
+    return ranks[user_id]
+
+
+def user_page_etag(request, user_id=None):
+    return user_page_state(request, user_id)[0]
 
 
+def user_page_last_modified(request, user_id=None):
+    return user_page_state(request, user_id)[1]
+
+
+user_page_conditional = condition(etag_func=user_page_etag, last_modified_func=user_page_last_modified)
+
 
 @login_required
+@vary_on_cookie
+@cache_control(private=True, no_cache=True)
+@user_page_conditional
 def dashboard_view(request):
     user = request.user
     achievements = user.achievements.filter(status='approved').order_by('-created_at')
@@ -238,7 +225,8 @@ def dashboard_view(request):
     total_points = achievements.aggregate(total=Sum('total_points'))['total'] or 0
 
 
-    raw_social_score, social_gpa = compute_social_gpa_for_user(user)
+    score = get_user_score(user)
+    raw_social_score, social_gpa = score.raw_score, score.social_gpa
 
 
     max_display_gpa = 40.0
@@ -258,6 +246,7 @@ def dashboard_view(request):
         'raw_social_score': round(raw_social_score, 1),
         'progress_percent': progress_percent,
         'recommendations': recommendations,
+        'rank': page_rank(request, user.pk),
     }
     return render(request, 'achievements/dashboard.html', context)
 
@@ -265,13 +254,24 @@ def dashboard_view(request):
 @login_required
 def add_achievement_view(request):
     if request.method == 'POST':
-        form = AchievementForm(request.POST, request.FILES)
+        form = AchievementForm(
+            request.POST, request.FILES,
+            user=request.user, upload_error=getattr(request, 'proof_upload_error', None),
+        )
         if form.is_valid():
             achievement = form.save(commit=False)
             achievement.user = request.user
             achievement.status = 'pending'
             achievement.save()
 
+            # Скопированное у другого ученика описание или чужой сертификат -> на проверку
+            fingerprint = index_achievement(achievement)
+            proof_hash = index_proof_image(achievement)
+            flagged_duplicate = bool(
+                (fingerprint and fingerprint.near_duplicate_of_id)
+                or (proof_hash and proof_hash.near_duplicate_of_id)
+            )
+
             file_path = achievement.proof_file.path if achievement.proof_file else None
             existing = request.user.achievements.filter(status='approved').exclude(id=achievement.id)
             by_category = {}
@@ -300,21 +300,28 @@ def add_achievement_view(request):
             achievement.ai_raw_response = ai_result
 
 
-            achievement.status = 'approved'
+            needs_review = flagged_duplicate or settings.ACHIEVEMENT_REVIEW_REQUIRED
+            achievement.status = 'pending' if needs_review else 'approved'
 
             achievement.total_points = achievement.calculate_points()
-            achievement.save()
 
+            coins_earned = 0 if needs_review else achievement_coins(achievement)
 
-            total_score = ai_result.get('total_score', achievement.total_points)
-            coins_earned = int(max(total_score, 10))
-            request.user.soc_coins += coins_earned
-            request.user.save()
+            with transaction.atomic():
+                achievement.save()
+                completed_quests = award_quests_for_achievement(achievement)
+                request.user.refresh_from_db(fields=['soc_coins'])
+                request.user.soc_coins += coins_earned
+                request.user.save(update_fields=['soc_coins'])
+            pin_to_primary(request)
 
             return render(request, 'achievements/analysis_result.html', {
                 'achievement': achievement,
                 'ai_result': ai_result,
                 'coins_earned': coins_earned,
+                'flagged_duplicate': flagged_duplicate,
+                'needs_review': needs_review,
+                'completed_quests': completed_quests,
             })
     else:
         form = AchievementForm()
@@ -323,6 +330,7 @@ def add_achievement_view(request):
 
 
 
+@replica_reads
 @login_required
 def leaderboard_view(request):
     users = User.objects.annotate(
@@ -333,7 +341,11 @@ def leaderboard_view(request):
 
 
 
+@replica_reads
 @login_required
+@vary_on_cookie
+@cache_control(private=True, no_cache=True)
+@user_page_conditional
 def profile_view(request, user_id=None):
     if user_id:
         profile_user = get_object_or_404(User, id=user_id)
@@ -343,7 +355,8 @@ def profile_view(request, user_id=None):
     achievements = profile_user.achievements.filter(status='approved')
     total_points = achievements.aggregate(total=Sum('total_points'))['total'] or 0
 
-    raw_social_score, social_gpa = compute_social_gpa_for_user(profile_user)
+    score = get_user_score(profile_user)
+    raw_social_score, social_gpa = score.raw_score, score.social_gpa
 
     milestones = [
         {"threshold": 50, "reward": "100 SocCoins"},
@@ -360,6 +373,7 @@ def profile_view(request, user_id=None):
         'social_gpa': social_gpa,
         'raw_social_score': round(raw_social_score, 1),
         'milestones': milestones,
+        'rank': page_rank(request, profile_user.pk),
     })
 
 
@@ -376,16 +390,24 @@ def shop_view(request):
     if request.method == 'POST':
         item_id = request.POST.get('item_id')
         item = get_object_or_404(ShopItem, id=item_id)
-        if item.id in purchases:
-            error = "You already own this reward."
-        elif request.user.soc_coins < item.price:
-            error = "Not enough SocCoins."
-        else:
-            UserPurchase.objects.create(user=request.user, item=item)
-            request.user.soc_coins -= item.price
-            request.user.save()
-            purchases.add(item.id)
-            message = f"You purchased: {item.name}. {item.discount_info}"
+        with transaction.atomic():
+            # Блокируем строку пользователя: параллельные покупки идут по очереди и
+            # видят и списанные монеты, и уже созданный UserPurchase
+            request.user.soc_coins = (
+                User.objects.select_for_update().filter(pk=request.user.pk).values_list('soc_coins', flat=True).get()
+            )
+            if UserPurchase.objects.filter(user=request.user, item=item).exists():
+                purchases.add(item.id)
+                error = "You already own this reward."
+            elif request.user.soc_coins < item.price:
+                error = "Not enough SocCoins."
+            else:
+                UserPurchase.objects.create(user=request.user, item=item)
+                request.user.soc_coins -= item.price
+                request.user.save(update_fields=['soc_coins'])
+                purchases.add(item.id)
+                pin_to_primary(request)
+                message = f"You purchased: {item.name}. {item.discount_info}"
 
     return render(request, 'achievements/shop.html', {
         'items': items,
@@ -399,7 +421,7 @@ def shop_view(request):
 @login_required
 def quests_view(request):
     ensure_default_quests()
-    quests = Quest.objects.all()
+    quests = list(Quest.objects.all())
     completed_ids = {
         qc.quest_id for qc in QuestCompletion.objects.filter(user=request.user)
     }
@@ -409,12 +431,24 @@ def quests_view(request):
     if request.method == 'POST':
         quest_id = request.POST.get('quest_id')
         quest = get_object_or_404(Quest, id=quest_id)
-        if quest.id not in completed_ids:
-            QuestCompletion.objects.create(user=request.user, quest=quest)
-            request.user.soc_coins += quest.reward_coins
-            request.user.save()
+        if quest.id in completed_ids:
+            pass
+        elif not quest.is_automatic:
+            message = "This quest is confirmed by your school."
+        elif quest_progress(quest, request.user) >= quest.rule_min_count:
+            with transaction.atomic():
+                completed = complete_quests(request.user, [quest])
+            request.user.refresh_from_db(fields=['soc_coins'])
             completed_ids.add(quest.id)
-            message = f"Quest completed! +{quest.reward_coins} SocCoins"
+            pin_to_primary(request)
+            if completed:
+                message = f"Quest completed! +{quest.reward_coins} SocCoins"
+        else:
+            message = "Not yet: upload and get the required achievements approved first."
+
+    for q in quests:
+        if q.is_automatic and q.id not in completed_ids:
+            q.progress = min(quest_progress(q, request.user), q.rule_min_count)
 
     return render(request, 'achievements/quests.html', {
         'quests': quests,
@@ -423,7 +457,118 @@ def quests_view(request):
     })
 
 
+@login_required
+def school_analytics_view(request):
+    if not can_moderate(request.user):
+        raise PermissionDenied
+    return render(request, 'achievements/school_analytics.html', school_analytics(request.user.school_name))
+
 
+@login_required
+def school_feed_view(request):
+    before = cursor_position(decode_cursor(request.GET.get('cursor')))
+    items, next_before = feed_page(request.user.school_name, before=before)
+    for item in items:
+        item['when'] = parse_datetime(item['created_at'])
+    return render(request, 'achievements/feed.html', {
+        'items': items,
+        'next_cursor': encode_cursor(next_before) if next_before else None,
+        'is_first_page': before is None,
+    })
+
+
+def _export_response(queryset, fmt, filename):
+    if fmt not in EXPORT_FORMATS:
+        raise Http404("Unknown export format")
+    content_type, extension = EXPORT_FORMATS[fmt]
+    response = StreamingHttpResponse(iter_export(queryset, fmt), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+    response['Cache-Control'] = 'private, no-store'
+    return response
+
+
+@login_required
+def portfolio_export_view(request, fmt):
+    return _export_response(
+        export_queryset(user=request.user), fmt, f"socgpa-portfolio-{request.user.username}"
+    )
+
+
+@login_required
+def school_export_view(request, fmt):
+    if not can_moderate(request.user):
+        raise PermissionDenied
+    return _export_response(
+        export_queryset(school_name=request.user.school_name), fmt, "socgpa-school-export"
+    )
+
+
+MODERATION_PAGE_SIZE = 50
+
+
+@login_required
+def moderation_view(request):
+    if not can_moderate(request.user):
+        raise PermissionDenied
+
+    message = None
+    if request.method == 'POST':
+        decision = request.POST.get('decision')
+        ids = [int(pk) for pk in request.POST.getlist('achievement_ids') if pk.isdigit()]
+        if decision in DECISIONS and ids:
+            done = moderate(request.user, ids, decision)
+            pin_to_primary(request)
+            message = f"{len(done)} achievement(s) {decision}."
+
+    status = request.GET.get('status', 'pending')
+    if status not in ('pending', *DECISIONS):
+        status = 'pending'
+    queue = moderation_queue(request.user, status)
+
+    return render(request, 'achievements/moderation.html', {
+        'achievements': queue[:MODERATION_PAGE_SIZE],
+        'total': queue.count(),
+        'status': status,
+        'message': message,
+    })
+
+
+
+def _parse_day(value):
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+@replica_reads
+@login_required
+def gpa_history_view(request, user_id=None):
+    profile_user = get_object_or_404(User, id=user_id) if user_id else request.user
+
+    resolution = request.GET.get('resolution', 'day')
+    if resolution not in ('day', 'week', 'month'):
+        resolution = 'day'
+
+    snapshots = ScoreSnapshot.objects.filter(user=profile_user)
+    date_from = _parse_day(request.GET.get('from'))
+    date_to = _parse_day(request.GET.get('to'))
+    if date_from:
+        snapshots = snapshots.filter(day__gte=date_from)
+    if date_to:
+        snapshots = snapshots.filter(day__lte=date_to)
+
+    points = downsample_history(snapshots.values_list('day', 'social_gpa'), resolution)
+
+    return JsonResponse({
+        'user_id': profile_user.id,
+        'resolution': resolution,
+        'points': [{'date': day.isoformat(), 'social_gpa': gpa} for day, gpa in points],
+    })
+
+
+
+@replica_reads
 @login_required
 def search_people_view(request):
     query = request.GET.get('q', '').strip()
@@ -444,10 +589,48 @@ def search_people_view(request):
 
 
 
+@replica_reads
 @login_required
 def extracurriculars_view(request):
     ensure_default_events()
-    events = Event.objects.all()
-    return render(request, 'achievements/extracurriculars.html', {'events': events})
+    category = request.GET.get('category', '').strip()
+    location = request.GET.get('location', '').strip()
+
+    cursor = request.GET.get('after')
+    events, next_cursor = events_page(
+        upcoming_events(category=category, location=location),
+        cursor=cursor,
+    )
+
+    recommended = []
+    if not (cursor or category or location):
+        score = get_user_score(request.user)
+        recommended = recommend_events(request.user, score.computed_at.timestamp(), request=request)
+
+    return render(request, 'achievements/extracurriculars.html', {
+        'recommended': recommended,
+        'events': events,
+        'next_cursor': next_cursor,
+        'category': category,
+        'location': location,
+        'categories': Event.objects.order_by('category').values_list('category', flat=True).distinct(),
+        'locations': Event.objects.order_by('location').values_list('location', flat=True).distinct(),
+    })
+
+
+
+FEED_CONTENT_TYPES = {
+    'ics': 'text/calendar; charset=utf-8',
+    'json': 'application/json',
+}
+
+
+@condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified)
+def events_feed_view(request, fmt):
+    if fmt not in FEED_CONTENT_TYPES:
+        raise Http404
+    response = HttpResponse(catalog_feed(request, fmt), content_type=FEED_CONTENT_TYPES[fmt])
+    response['Cache-Control'] = 'public, max-age=300'
+    return response
 
 
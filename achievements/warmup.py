@@ -0,0 +1,69 @@
+import logging
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+
+logger = logging.getLogger(__name__)
+
+
+# ---------- Прогрев воркера (WARMUP_ON_READY) ----------
+# warm_in_memory() - из AppConfig.ready(), warm_database() - из wsgi.py, когда приложение
+# уже собрано (Django не рекомендует ходить в БД из ready()). Под gunicorn --preload оба
+# выполняются в мастере до fork: воркеры получают всё готовым (copy-on-write), поэтому
+# соединения с БД в конце закрываются - иначе воркеры делили бы один сокет.
+
+def warm_in_memory():
+    # Только память и импорты - безопасно при любом состоянии БД
+    from .analyzers import AI_PROVIDER
+    from .weights import get_weights
+
+    get_weights()
+    if AI_PROVIDER != "LOCAL":
+        import requests  # noqa: F401
+    import PIL.Image  # noqa: F401  (dhash при загрузке пруфов)
+
+
+WARM_TEMPLATES = (
+    'achievements/dashboard.html',
+    'achievements/profile.html',
+    'achievements/leaderboard.html',
+    'achievements/add_achievement.html',
+    'achievements/extracurriculars.html',
+)
+
+
+def warm_urls_and_templates():
+    # URLconf тянет за собой все views; шаблоны компилируются в кэш загрузчика (DEBUG=False)
+    from django.template.loader import get_template
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+    for name in WARM_TEMPLATES:
+        get_template(name)
+
+
+def warm_database():
+    # Сиды каталогов и индекс рангов, которые иначе достаются первым запросам
+    from .ranks import get_rank_index
+    from .recommendations import ensure_event_vectors
+    from .views import ensure_default_events, ensure_default_quests, ensure_default_shop_items
+
+    ensure_default_shop_items()
+    ensure_default_quests()
+    ensure_default_events()
+    ensure_event_vectors()
+    get_rank_index()
+
+
+def warm_up_application():
+    if not settings.WARMUP_ON_READY:
+        return
+    warm_urls_and_templates()
+    try:
+        warm_database()
+    except DatabaseError as e:
+        # БД ещё не смигрирована - прогреется первыми запросами, как без WARMUP_ON_READY
+        logger.warning("Database warm-up skipped: %r", e)
+    finally:
+        connections.close_all()
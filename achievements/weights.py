@@ -0,0 +1,108 @@
+import json
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+
+
+# Все веса скоринга в одном месте: очки ачивки (total_points), оценка локального
+# анализатора и веса Social GPA. Таблицы версионированы в scoring_weights.json,
+# текущая версия - settings.SCORING_VERSION (по умолчанию самая новая).
+
+WEIGHTS_FILE = Path(__file__).resolve().parent / "scoring_weights.json"
+
+CATEGORIES = ('research', 'social', 'creative', 'sports', 'competence', 'other')
+SCALES = ('school', 'city', 'national', 'international')
+ROLES = ('participant', 'winner', 'organizer', 'leader')
+
+CATEGORY_INDEX = {c: i for i, c in enumerate(CATEGORIES)}
+SCALE_INDEX = {s: i for i, s in enumerate(SCALES)}
+ROLE_INDEX = {r: i for i, r in enumerate(ROLES)}
+
+# неизвестные значения считаем как дефолты модели
+DEFAULT_CATEGORY = CATEGORY_INDEX['other']
+DEFAULT_SCALE = SCALE_INDEX['school']
+DEFAULT_ROLE = ROLE_INDEX['participant']
+
+
+def _cell(category, scale, role):
+    return (
+        CATEGORY_INDEX.get(category or 'other', DEFAULT_CATEGORY) * len(SCALES) * len(ROLES)
+        + SCALE_INDEX.get(scale or 'school', DEFAULT_SCALE) * len(ROLES)
+        + ROLE_INDEX.get(role or 'participant', DEFAULT_ROLE)
+    )
+
+
+def _product_table(spec):
+    # плоский массив category x scale x role -> произведение множителей
+    return [
+        spec['category'][c] * spec['scale'][s] * spec['role'][r]
+        for c in CATEGORIES for s in SCALES for r in ROLES
+    ]
+
+
+class WeightTable:
+    def __init__(self, version, spec):
+        self.version = version
+
+        points = spec['points']
+        self.points_cells = _product_table(points)
+        self.points_status = dict(points['status'])
+        self.points_duration_cap = points['duration_cap_months']
+        self.points_duration_divisor = points['duration_divisor']
+
+        gpa = spec['gpa']
+        self.gpa_cells = [gpa['base'] * w for w in _product_table(gpa)]
+        self.gpa_duration_steps = [tuple(step) for step in gpa['duration_steps']]
+        self.gpa_duration_max = gpa['duration_max']
+
+        analysis = spec['analysis']
+        self.analysis_category = [analysis['category'][c] for c in CATEGORIES]
+        self.analysis_scale = [analysis['scale'][s] for s in SCALES]
+        self.analysis_role = [analysis['role'][r] for r in ROLES]
+        self.analysis_duration_cap = analysis['duration_cap_months']
+        self.analysis_duration_max = analysis['duration_max']
+
+    def achievement_points(self, category, scale, role, duration_months, status):
+        duration_mult = 1.0 + min(duration_months or 0, self.points_duration_cap) / self.points_duration_divisor
+        verified_mult = self.points_status.get(status, 1.0)
+        points = self.points_cells[_cell(category, scale, role)]
+        points *= duration_mult * verified_mult
+        return round(points, 2)
+
+    def gpa_duration_weight(self, months):
+        try:
+            m = float(months or 0)
+        except (TypeError, ValueError):
+            m = 0.0
+
+        for upper, weight in self.gpa_duration_steps:
+            if m <= upper:
+                return weight
+        return self.gpa_duration_max
+
+    def gpa_item_score(self, category, scale, role, duration_months):
+        return self.gpa_cells[_cell(category, scale, role)] * self.gpa_duration_weight(duration_months)
+
+    def analysis_scores(self, category, scale, role, duration_months):
+        return {
+            "category": self.analysis_category[CATEGORY_INDEX.get(category, DEFAULT_CATEGORY)],
+            "scale": self.analysis_scale[SCALE_INDEX.get(scale, DEFAULT_SCALE)],
+            "role": self.analysis_role[ROLE_INDEX.get(role, DEFAULT_ROLE)],
+            "duration": min(duration_months, self.analysis_duration_cap)
+            * (self.analysis_duration_max / self.analysis_duration_cap),
+        }
+
+
+@lru_cache(maxsize=None)
+def _load_tables():
+    with open(WEIGHTS_FILE, encoding="utf-8") as f:
+        raw = json.load(f)
+    return {int(version): WeightTable(int(version), spec) for version, spec in raw.items()}
+
+
+def get_weights(version=None):
+    tables = _load_tables()
+    if version is None:
+        version = getattr(settings, "SCORING_VERSION", None) or max(tables)
+    return tables[version]
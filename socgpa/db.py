@@ -0,0 +1,127 @@
+import time
+from contextvars import ContextVar
+from functools import wraps
+from pathlib import Path
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from django.conf import settings
+
+
+# ---------- SQLite: PRAGMA на каждое новое соединение ----------
+
+def sqlite_pragmas():
+    return [
+        ("journal_mode", getattr(settings, "SQLITE_JOURNAL_MODE", "WAL")),
+        ("busy_timeout", getattr(settings, "SQLITE_BUSY_TIMEOUT_MS", 5000)),
+        ("synchronous", getattr(settings, "SQLITE_SYNCHRONOUS", "NORMAL")),
+        ("mmap_size", getattr(settings, "SQLITE_MMAP_SIZE", 134217728)),
+        ("cache_size", getattr(settings, "SQLITE_CACHE_SIZE", -20000)),
+        ("foreign_keys", "ON"),
+    ]
+
+
+def apply_sqlite_pragmas(cursor, pragmas):
+    for name, value in pragmas:
+        cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        apply_sqlite_pragmas(cursor, sqlite_pragmas())
+
+
+# ---------- DATABASE_URL -> settings.DATABASES ----------
+
+URL_ENGINES = {
+    "sqlite": "django.db.backends.sqlite3",
+    "postgres": "django.db.backends.postgresql",
+    "postgresql": "django.db.backends.postgresql",
+    "pgsql": "django.db.backends.postgresql",
+}
+
+
+def database_from_url(url, base_dir, conn_max_age=0, health_checks=False, pool=False, sqlite_options=None):
+    parts = urlsplit(url)
+    engine = URL_ENGINES.get(parts.scheme)
+    if engine is None:
+        raise ValueError(f"Unsupported database scheme: {parts.scheme!r}")
+
+    options = dict(parse_qsl(parts.query))
+
+    if engine == "django.db.backends.sqlite3":
+        # sqlite:///db.sqlite3 -> относительно BASE_DIR, sqlite:////abs/path -> абсолютный
+        name = unquote(parts.path[1:]) if parts.path.startswith("/") else unquote(parts.path)
+        options = {**(sqlite_options or {}), **options}
+        return {
+            "ENGINE": engine,
+            "NAME": Path(base_dir) / name if name and not Path(name).is_absolute() else name,
+            "OPTIONS": options,
+        }
+
+    if pool:
+        # psycopg 3 pool; постоянные соединения с пулом Django не совмещает
+        options["pool"] = True
+        conn_max_age = 0
+
+    return {
+        "ENGINE": engine,
+        "NAME": unquote(parts.path.lstrip("/")),
+        "USER": unquote(parts.username or ""),
+        "PASSWORD": unquote(parts.password or ""),
+        "HOST": parts.hostname or "",
+        "PORT": str(parts.port or ""),
+        "CONN_MAX_AGE": conn_max_age,
+        "CONN_HEALTH_CHECKS": health_checks,
+        "OPTIONS": options,
+    }
+
+
+# ---------- Чтение с реплики для горячих read-only страниц ----------
+
+STICKY_SESSION_KEY = "db_primary_until"
+
+_read_alias = ContextVar("socgpa_read_alias", default=None)
+
+
+def pin_to_primary(request):
+    # read-your-writes: после записи какое-то время читаем только с primary
+    seconds = getattr(settings, "DATABASE_REPLICA_STICKY_SECONDS", 15)
+    request.session[STICKY_SESSION_KEY] = time.time() + seconds
+
+
+def is_pinned_to_primary(request):
+    session = getattr(request, "session", None)
+    if session is None:
+        return False
+    return session.get(STICKY_SESSION_KEY, 0) > time.time()
+
+
+def replica_reads(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        alias = getattr(settings, "DATABASE_READ_REPLICA", None)
+        if request.method not in ("GET", "HEAD") or is_pinned_to_primary(request):
+            alias = None
+        token = _read_alias.set(alias)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
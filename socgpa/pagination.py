@@ -0,0 +1,49 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, QuerySet
+from django.utils.functional import cached_property
+
+
+# ---------- Оценка числа строк вместо COUNT(*) ----------
+
+def estimated_count(queryset):
+    # Дешёвая оценка размера всей таблицы; None - оценки нет, считайте точно
+    model = queryset.model
+    table = model._meta.db_table
+    connection = connections[queryset.db]
+
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+            row = cursor.fetchone()
+        return row[0] if row and row[0] >= 0 else None
+
+    if connection.vendor == "sqlite":
+        row = None
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            if cursor.fetchone():
+                # после ANALYZE первое число stat (любого индекса таблицы) - количество строк
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+                row = cursor.fetchone()
+        if row:
+            return int(row[0].split()[0])
+        if model._meta.pk.get_internal_type() in ("AutoField", "BigAutoField"):
+            # по индексу первичного ключа: O(log n), переоценивает на число удалённых строк
+            return model._default_manager.using(queryset.db).aggregate(m=Max("pk"))["m"] or 0
+
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    # Для нефильтрованного списка большой таблицы COUNT(*) заменяется оценкой
+    exact_threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = estimated_count(queryset)
+            if estimate is not None and estimate > self.exact_threshold:
+                return estimate
+        return super().count
@@ -5,6 +5,7 @@ from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
 
 from accounts.views import register_view
+from achievements import api
 from achievements.views import (
     dashboard_view,
     add_achievement_view,
@@ -14,6 +15,13 @@ from achievements.views import (
     quests_view,
     search_people_view,
     extracurriculars_view,
+    gpa_history_view,
+    events_feed_view,
+    moderation_view,
+    school_analytics_view,
+    portfolio_export_view,
+    school_export_view,
+    school_feed_view,
 )
 
 urlpatterns = [
@@ -28,8 +36,26 @@ urlpatterns = [
     path('leaderboard/', leaderboard_view, name='leaderboard'),
     path('profile/', profile_view, name='my_profile'),
     path('profile/<int:user_id>/', profile_view, name='profile'),
+    path('profile/gpa-history/', gpa_history_view, name='my_gpa_history'),
+    path('profile/export.<str:fmt>', portfolio_export_view, name='portfolio_export'),
+    path('profile/<int:user_id>/gpa-history/', gpa_history_view, name='gpa_history'),
     path('shop/', shop_view, name='shop'),
     path('quests/', quests_view, name='quests'),
+    path('moderation/', moderation_view, name='moderation'),
+    path('school/analytics/', school_analytics_view, name='school_analytics'),
+    path('school/export.<str:fmt>', school_export_view, name='school_export'),
+    path('school/feed/', school_feed_view, name='school_feed'),
     path('search-people/', search_people_view, name='search_people'),
     path('extracurriculars/', extracurriculars_view, name='extracurriculars'),
+    path('extracurriculars/feed.<str:fmt>', events_feed_view, name='events_feed'),
+
+    path('api/v1/profile/', api.profile_api, name='api_my_profile'),
+    path('api/v1/profile/<int:user_id>/', api.profile_api, name='api_profile'),
+    path('api/v1/profile/achievements/', api.profile_achievements_api, name='api_my_achievements'),
+    path('api/v1/profile/<int:user_id>/achievements/', api.profile_achievements_api, name='api_achievements'),
+    path('api/v1/leaderboard/', api.leaderboard_api, name='api_leaderboard'),
+    path('api/v1/events/', api.events_api, name='api_events'),
+    path('api/v1/shop/', api.shop_api, name='api_shop'),
+    path('api/v1/quests/', api.quests_api, name='api_quests'),
+    path('api/v1/feed/', api.feed_api, name='api_feed'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT) + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'socgpa.settings')
 
 application = get_wsgi_application()
+
+# WARMUP_ON_READY: сиды, индекс рангов и шаблоны - до первого запроса (и до fork при --preload)
+from achievements.warmup import warm_up_application  # noqa: E402
+
+warm_up_application()